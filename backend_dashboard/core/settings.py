@@ -82,6 +82,23 @@ DATABASES = {
 }
 
 
+# Cache
+# Rendered dashboard pages are cached per version (size + mtime) of vehicle_log.json,
+# so new events from the CV engine invalidate them immediately.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'campusguard-dashboard',
+    }
+}
+
+DASHBOARD_CACHE = True
+DASHBOARD_CACHE_TIMEOUT = 600   # Seconds; stale versions simply age out
+DASHBOARD_PAGE_SIZE = 100       # Entries per page on the All Entries / Violations tabs
+DASHBOARD_INGEST_INTERVAL = 30  # Seconds between background ingests started by requests (0 = never)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -106,7 +123,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 LANGUAGE_CODE = 'en-us'
 
-TIME_ZONE = 'UTC'
+TIME_ZONE = 'Asia/Kolkata'   # Campus local time: the CV engine logs naive local timestamps
 
 USE_I18N = True
 
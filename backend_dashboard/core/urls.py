@@ -14,7 +14,14 @@ urlpatterns = [
     path('rewards/', views.tab_rewards, name='tab_rewards'),
     
     # API endpoint for the button
-    path('send_alert/<int:track_id>/', views.send_alert, name='send_alert'),
+    path('send_alert/<str:plate>/', views.send_alert, name='send_alert'),
+
+    # JSON analytics over pre-aggregated rollups
+    path('api/analytics/', views.analytics_api, name='analytics_api'),
+
+    # Plate identity index (links vehicles across runs and cameras)
+    path('api/plates/<str:plate>/events/', views.plate_events_api, name='plate_events_api'),
+    path('api/repeat_offenders/', views.repeat_offenders_api, name='repeat_offenders_api'),
 ]
 
 # This magic line allows Django to serve your violation images locally
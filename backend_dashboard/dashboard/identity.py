@@ -0,0 +1,303 @@
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+from .models import Vehicle, PlateKey, PlateEvent
+from .rollups import parse_timestamp
+from .registry import MOCK_REGISTRY
+
+# Plate texts the CV engine logs when no plate was read
+NO_PLATE = {"", "N/A", "UNREADABLE", "PENDINGOCR"}
+PENDING_PLATE = "Pending OCR"
+
+MIN_PLATE_LENGTH = 6
+
+# Characters OCR commonly confuses on plates, folded to one representative before matching.
+# Two readings are the same vehicle only if they differ solely in these characters
+# (equal folded forms): GJ05AB1234 / GJO5A81234 match, GJ05AB1234 / GJ05AB1235 do not.
+CONFUSABLES = str.maketrans({
+    'O': '0', 'D': '0', 'Q': '0',
+    'I': '1', 'L': '1',
+    'Z': '2',
+    'S': '5',
+    'G': '6',
+    'B': '8',
+})
+
+
+def normalize_plate(text):
+    """
+    Upper-case alphanumerics only ("gj 27-tf 3843" -> "GJ27TF3843"); None if not a usable plate.
+    """
+    if not text:
+        return None
+    plate = re.sub(r'[^A-Z0-9]', '', str(text).upper())
+    if plate in NO_PLATE or len(plate) < MIN_PLATE_LENGTH:
+        return None
+    return plate
+
+
+def fold(plate):
+    return plate.translate(CONFUSABLES)
+
+
+def confusable_differences(a, b):
+    """
+    Number of differing characters if `a` and `b` differ only at OCR-confusable positions, else None.
+    """
+    if len(a) != len(b) or fold(a) != fold(b):
+        return None
+    return sum(ca != cb for ca, cb in zip(a, b))
+
+
+def _create_key(vehicle):
+    PlateKey.objects.create(key=fold(vehicle.plate), vehicle=vehicle)
+
+
+# --- MATCHING ---
+
+def exact_vehicle(plate_text):
+    """
+    Vehicle whose identity plate is exactly `plate_text` (after normalisation), or None.
+    Used wherever a wrong match has consequences (owner lookup, SMS alerts).
+    """
+    plate = normalize_plate(plate_text)
+    if plate is None:
+        return None
+    return Vehicle.objects.filter(plate=plate).first()
+
+
+def lookup_vehicle(plate_text):
+    """
+    Vehicle whose plate equals `plate_text` or differs from it only in OCR-confusable
+    characters. Returns (vehicle, differing characters) or (None, None).
+    """
+    plate = normalize_plate(plate_text)
+    if plate is None:
+        return None, None
+
+    vehicle = Vehicle.objects.filter(plate=plate).first()
+    if vehicle is not None:
+        return vehicle, 0
+
+    best = None
+    for key in PlateKey.objects.filter(key=fold(plate)).select_related('vehicle'):
+        candidate = key.vehicle
+        distance = confusable_differences(candidate.plate, plate)
+        if distance is None:
+            continue
+        # Fewest confusions first, then the vehicle seen most often
+        rank = (distance, -candidate.event_count, candidate.pk)
+        if best is None or rank < best[0]:
+            best = (rank, candidate)
+    if best is None:
+        return None, None
+    return best[1], best[0][0]
+
+
+def match_or_create(plate_text, seen_at, cache=None):
+    """
+    lookup_vehicle(), creating a new identity (with its lookup key) when nothing matches.
+    cache: optional { normalized_plate: (vehicle, distance) } shared across a batch.
+    """
+    plate = normalize_plate(plate_text)
+    if plate is None:
+        return None, None
+    if cache is not None and plate in cache:
+        return cache[plate]
+
+    vehicle, distance = lookup_vehicle(plate)
+    if vehicle is None:
+        vehicle = Vehicle.objects.create(plate=plate, first_seen=seen_at, last_seen=seen_at)
+        _create_key(vehicle)
+        distance = 0
+
+    if cache is not None:
+        cache[plate] = (vehicle, distance)
+    return vehicle, distance
+
+
+# --- INDEXING ---
+
+def event_key(record):
+    return (record.get('camera_id') or "", record.get('run_id') or "", record.get('entry_id') or "")
+
+
+def index_records(records):
+    """
+    Creates a PlateEvent per log record and links it to a vehicle identity. Call inside a transaction.
+    """
+    cache = {}
+    events = []
+    for record in records:
+        try:
+            timestamp = parse_timestamp(record['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        plate_read = str(record.get('plate_number') or "N/A")
+        vehicle, distance = match_or_create(plate_read, timestamp, cache)
+        camera_id, run_id, entry_id = event_key(record)
+        speed = record.get('speed_kmh')
+        image_path = record.get('image_path')
+        events.append(PlateEvent(
+            vehicle=vehicle,
+            camera_id=camera_id,
+            run_id=run_id,
+            entry_id=entry_id,
+            track_id=int(record.get('track_id') or 0),
+            timestamp=timestamp,
+            plate_read=plate_read[:32],
+            match_distance=distance,
+            vehicle_class=record.get('class') or 'unknown',
+            speed_kmh=speed if isinstance(speed, (int, float)) else None,
+            violations=record.get('violations') or [],
+            is_violation=bool(record.get('is_violation')),
+            image_path=image_path if image_path and image_path != "N/A" else "",
+            thumb_path=record.get('thumb_path') or "",
+        ))
+
+    # A record is only indexed once, even if a log is ingested again
+    PlateEvent.objects.bulk_create(events, batch_size=500, ignore_conflicts=True)
+    refresh_vehicle_stats({vehicle.pk for vehicle, _ in cache.values() if vehicle is not None})
+
+
+def resolve_pending(records):
+    """
+    Links events logged as "Pending OCR" whose plate the CV engine filled in later.
+    """
+    pending = {
+        (e.camera_id, e.run_id, e.entry_id): e
+        for e in PlateEvent.objects.filter(plate_read=PENDING_PLATE)
+    }
+    if not pending:
+        return
+
+    cache = {}
+    resolved = []
+    for record in records:
+        event = pending.get(event_key(record))
+        plate_read = record.get('plate_number')
+        if event is None or not plate_read or plate_read == PENDING_PLATE:
+            continue
+        event.plate_read = str(plate_read)[:32]
+        event.vehicle, event.match_distance = match_or_create(plate_read, event.timestamp, cache)
+        resolved.append(event)
+
+    PlateEvent.objects.bulk_update(resolved, ['plate_read', 'vehicle', 'match_distance'], batch_size=500)
+    refresh_vehicle_stats({vehicle.pk for vehicle, _ in cache.values() if vehicle is not None})
+
+
+def _majority_plates(vehicle_ids):
+    """
+    { vehicle_id: Counter(normalized plate read -> events) }
+    """
+    reads = defaultdict(Counter)
+    rows = (
+        PlateEvent.objects.filter(vehicle_id__in=vehicle_ids)
+        .values('vehicle_id', 'plate_read').annotate(n=Count('id'))
+        .values_list('vehicle_id', 'plate_read', 'n')
+    )
+    for vehicle_id, plate_read, n in rows:
+        plate = normalize_plate(plate_read)
+        if plate is not None:
+            reads[vehicle_id][plate] += n
+    return reads
+
+
+def _rename(vehicle, plate):
+    vehicle.plate = plate
+    vehicle.plate_keys.all().delete()
+    _create_key(vehicle)
+
+
+def _canonical_plate(vehicle, counts):
+    """
+    The plate an identity should carry, given its readings:
+    - a plate with a registered owner is kept once attached (owner lookups are exact);
+    - otherwise a registered plate among the readings wins (e.g. "GJ27TF3843" over a
+      first-seen "GJZ7TF3843");
+    - otherwise the most frequent reading (ties keep the current plate).
+    """
+    if vehicle.plate in MOCK_REGISTRY:
+        return vehicle.plate
+    registered = [plate for plate in counts if plate in MOCK_REGISTRY]
+    candidates = registered or counts
+    return max(candidates, key=lambda p: (counts[p], p == vehicle.plate))
+
+
+def refresh_vehicle_stats(vehicle_ids):
+    """
+    Recomputes event/violation counts and first/last seen of the given vehicles from their
+    events, and moves each identity to its canonical plate (see _canonical_plate).
+    """
+    if not vehicle_ids:
+        return
+    stats = (
+        PlateEvent.objects.filter(vehicle_id__in=vehicle_ids)
+        .values('vehicle_id')
+        .annotate(events=Count('id'), violations=Count('id', filter=Q(is_violation=True)),
+                  first=Min('timestamp'), last=Max('timestamp'))
+    )
+    by_id = {row['vehicle_id']: row for row in stats}
+    reads = _majority_plates(vehicle_ids)
+    vehicles = list(Vehicle.objects.filter(pk__in=vehicle_ids))
+    claimed = set()
+    for vehicle in vehicles:
+        row = by_id.get(vehicle.pk)
+        if row is None:
+            continue
+        vehicle.event_count = row['events']
+        vehicle.violation_count = row['violations']
+        vehicle.first_seen = row['first']
+        vehicle.last_seen = row['last']
+
+        counts = reads.get(vehicle.pk)
+        if counts:
+            plate = _canonical_plate(vehicle, counts)
+            if plate != vehicle.plate and plate not in claimed and not Vehicle.objects.filter(plate=plate).exists():
+                claimed.add(plate)
+                _rename(vehicle, plate)
+    Vehicle.objects.bulk_update(
+        vehicles, ['plate', 'event_count', 'violation_count', 'first_seen', 'last_seen'], batch_size=500
+    )
+
+
+def event_identities():
+    """
+    { (camera_id, run_id, entry_id): vehicle plate } for every linked event.
+    """
+    return {
+        (camera_id, run_id, entry_id): plate
+        for camera_id, run_id, entry_id, plate in
+        PlateEvent.objects.filter(vehicle__isnull=False)
+        .values_list('camera_id', 'run_id', 'entry_id', 'vehicle__plate')
+    }
+
+
+# --- QUERIES ---
+
+def events_for_plate(plate_text, limit=200):
+    """
+    (vehicle, distance, events newest first) for a plate; (None, None, []) if unknown.
+    """
+    vehicle, distance = lookup_vehicle(plate_text)
+    if vehicle is None:
+        return None, None, []
+    events = list(vehicle.events.order_by('-timestamp')[:limit])
+    return vehicle, distance, events
+
+
+def repeat_offenders(days=30, min_violations=2, limit=100):
+    """
+    Vehicles with at least `min_violations` violating events in the last `days` days.
+    """
+    since = timezone.now() - timedelta(days=days)
+    return list(
+        PlateEvent.objects.filter(is_violation=True, timestamp__gte=since, vehicle__isnull=False)
+        .values('vehicle_id', 'vehicle__plate')
+        .annotate(violations=Count('id'), cameras=Count('camera_id', distinct=True),
+                  first_violation=Min('timestamp'), last_violation=Max('timestamp'))
+        .filter(violations__gte=min_violations)
+        .order_by('-violations', '-last_violation')[:limit]
+    )
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection, transaction
+from .models import (
+    TrafficRollup, ViolationRollup, SpeedHistogram, IngestCursor, Vehicle, PlateKey, PlateEvent
+)
+from .rollups import aggregate, apply
+from .identity import index_records, resolve_pending, event_key
+
+# One ingest per log at a time within a process (SQLite has no row locks: concurrent
+# writers fail with "database is locked"); select_for_update covers other processes.
+_source_locks = defaultdict(threading.Lock)
+_source_locks_guard = threading.Lock()
+
+# Background ingest started by dashboard requests (per process)
+_background = {'thread': None, 'started': None}
+_background_lock = threading.Lock()
+
+
+def default_log_path():
+    return os.path.join(settings.MEDIA_ROOT, 'output', 'vehicle_log.json')
+
+
+def ingest(path=None, force=False):
+    """
+    Feeds records appended to a vehicle log since the last call into the analytics
+    rollups and the plate identity index. Returns the number of new records.
+    Cheap when nothing changed (only a stat of the file).
+    """
+    path = os.path.abspath(path or default_log_path())
+    if not os.path.exists(path):
+        return 0
+
+    stat = os.stat(path)
+    if not force and _unchanged(IngestCursor.objects.filter(source=path).first(), stat):
+        return 0
+
+    with _source_locks_guard:
+        lock = _source_locks[path]
+    with lock:
+        return _ingest(path, force)
+
+
+def ingest_in_background(interval=None):
+    """
+    Starts ingest() of the live log on a background thread and returns without waiting, at most
+    once every `interval` seconds per process (default settings.DASHBOARD_INGEST_INTERVAL;
+    0 disables it). Returns True if an ingest was started.
+    """
+    interval = settings.DASHBOARD_INGEST_INTERVAL if interval is None else interval
+    if not interval:
+        return False
+    now = time.monotonic()
+    with _background_lock:
+        thread = _background['thread']
+        if thread is not None and thread.is_alive():
+            return False
+        if _background['started'] is not None and now - _background['started'] < interval:
+            return False
+        _background['started'] = now
+        thread = _background['thread'] = threading.Thread(
+            target=_ingest_quietly, name="dashboard-ingest", daemon=True
+        )
+    thread.start()
+    return True
+
+
+def _ingest_quietly():
+    try:
+        ingest()
+    except Exception as e:
+        print(f"Background ingest error: {e}")
+    finally:
+        # Django opens one connection per thread: do not leak this one
+        connection.close()
+
+
+def _unchanged(cursor, stat):
+    return cursor is not None and cursor.file_size == stat.st_size and cursor.file_mtime == stat.st_mtime
+
+
+def _ingest(path, force):
+    stat = os.stat(path)
+    try:
+        with open(path, 'r') as f:
+            content = f.read()
+        data = json.loads(content) if content else []
+    except (OSError, ValueError) as e:
+        # The CV engine may be mid-write: try again on the next call
+        print(f"Error reading JSON for ingest: {e}")
+        return 0
+
+    first_entry_id = data[0].get('entry_id', '') if data else ''
+
+    with transaction.atomic():
+        # Read under the lock: another ingest may have moved the cursor meanwhile
+        cursor, _ = IngestCursor.objects.select_for_update().get_or_create(source=path)
+        if not force and _unchanged(cursor, stat):
+            return 0
+        start = cursor.records
+        if len(data) < start or (cursor.first_entry_id and first_entry_id != cursor.first_entry_id):
+            # Log was cleared or replaced: earlier data stays, the new file is read from the top
+            start = 0
+        new_records = _unseen(data[start:])
+
+        # Plates filled in after logging ("Pending OCR" records are updated in place);
+        # resolved first so identities are created in log order
+        resolve_pending(data)
+        if new_records:
+            apply(*aggregate(new_records))
+            index_records(new_records)
+        cursor.records = len(data)
+        cursor.first_entry_id = first_entry_id
+        cursor.file_size = stat.st_size
+        cursor.file_mtime = stat.st_mtime
+        cursor.save()
+    return len(new_records)
+
+
+def _unseen(records):
+    """
+    Records whose event (camera, run, entry) is not indexed yet, so a log ingested again
+    (a copy or archive of one already rolled up) does not count its events twice.
+    """
+    runs = {event_key(record)[1] for record in records}
+    seen = set(PlateEvent.objects.filter(run_id__in=runs).values_list('camera_id', 'run_id', 'entry_id'))
+    unseen = []
+    for record in records:
+        key = event_key(record)
+        if key not in seen:
+            seen.add(key)
+            unseen.append(record)
+    return unseen
+
+
+def reset():
+    """
+    Deletes all rollups, identities and ingest cursors (for a full rebuild).
+    """
+    with transaction.atomic():
+        for model in (TrafficRollup, ViolationRollup, SpeedHistogram, PlateEvent, PlateKey, Vehicle, IngestCursor):
+            model.objects.all().delete()
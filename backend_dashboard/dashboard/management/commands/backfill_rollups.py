@@ -0,0 +1,40 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.ingest import ingest, reset, default_log_path
+
+
+class Command(BaseCommand):
+    help = "Build analytics rollups and plate identities from vehicle logs (the live log by default, or archived/replay logs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='*',
+                            help="vehicle_log.json files to roll up (default: the live log)")
+        parser.add_argument('--reset', action='store_true',
+                            help="Delete all rollups, identities and ingest cursors first (full rebuild)")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Keep running and roll up new records every INTERVAL seconds (e.g. for the live log)")
+
+    def handle(self, *args, **options):
+        paths = options['logs'] or [default_log_path()]
+        missing = [p for p in paths if not os.path.exists(p)]
+        if missing:
+            raise CommandError(f"Log not found: {', '.join(missing)}")
+
+        if options['reset']:
+            reset()
+            self.stdout.write("Cleared existing rollups and identities.")
+
+        self._ingest(paths, force=True)
+        while options['interval']:
+            time.sleep(options['interval'])
+            self._ingest(paths, force=False)
+
+    def _ingest(self, paths, force):
+        for path in paths:
+            start = time.perf_counter()
+            # Cursors make this incremental: records already rolled up are skipped
+            count = ingest(path, force=force)
+            elapsed = time.perf_counter() - start
+            if force or count:
+                self.stdout.write(self.style.SUCCESS(f"{path}: {count} new records rolled up in {elapsed:.2f}s"))
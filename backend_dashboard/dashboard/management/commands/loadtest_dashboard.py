@@ -0,0 +1,280 @@
+import contextlib
+import io
+import itertools
+import json
+import os
+import random
+import shutil
+import string
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import mock
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from dashboard.ingest import ingest, reset
+from dashboard.utils import invalidate_cache, MOCK_REGISTRY
+
+# --- SYNTHETIC LOG SETTINGS ---
+CLASSES = ["car", "motorcycle", "bus", "truck"]
+CLASS_WEIGHTS = [45, 40, 5, 10]
+CAMERAS = ["gate-1", "gate-2"]
+STATES = ["GJ", "MH", "KA", "DL", "RJ"]
+SPEED_LIMIT = 40
+EVENTS_PER_RUN = 5000
+MISREAD_RATE = 0.05       # Plates with one OCR confusion (O for 0, B for 8, ...)
+UNREADABLE_RATE = 0.03
+MISREADS = {'0': 'O', '1': 'I', '2': 'Z', '5': 'S', '8': 'B'}
+
+VIEWS = ["tab_all", "tab_violations", "tab_rewards", "send_alert"]
+ALERT_PLATE = next(iter(MOCK_REGISTRY))
+
+
+def _random_plate(rng):
+    return (rng.choice(STATES) + f"{rng.randint(1, 40):02d}"
+            + "".join(rng.choices(string.ascii_uppercase, k=2)) + f"{rng.randint(1, 9999):04d}")
+
+
+def _misread(plate, rng):
+    positions = [i for i, c in enumerate(plate) if c in MISREADS]
+    if not positions:
+        return plate
+    i = rng.choice(positions)
+    return plate[:i] + MISREADS[plate[i]] + plate[i + 1:]
+
+
+def generate_log(path, events, seed=0):
+    """
+    Writes a synthetic vehicle_log.json with `events` records spread over the last 30 days.
+    """
+    rng = random.Random(seed)
+    plates = list(MOCK_REGISTRY) + [_random_plate(rng) for _ in range(max(events // 20, 50))]
+    end = datetime.now().replace(microsecond=0)
+    step = timedelta(days=30) / events
+    start = end - step * events
+
+    records = []
+    for i in range(events):
+        event_time = start + step * i
+        track_id = i % EVENTS_PER_RUN + 1
+        vehicle_class = rng.choices(CLASSES, CLASS_WEIGHTS)[0]
+        speed = rng.randrange(10, 75, 5) if rng.random() < 0.8 else None
+        pax_count = rng.choices([1, 2, 3], [70, 25, 5])[0] if vehicle_class == "motorcycle" else 0
+
+        violations = []
+        if speed and speed > SPEED_LIMIT:
+            violations.append("Speeding")
+        if pax_count >= 3:
+            violations.append("Triple Riding")
+
+        plate = rng.choice(plates)
+        roll = rng.random()
+        if roll < UNREADABLE_RATE:
+            plate = "N/A"
+        elif roll < UNREADABLE_RATE + MISREAD_RATE:
+            plate = _misread(plate, rng)
+
+        records.append({
+            "entry_id": f"{track_id}_{event_time:%Y%m%d_%H%M%S}",
+            "camera_id": CAMERAS[i % len(CAMERAS)],
+            "run_id": f"loadtest_{i // EVENTS_PER_RUN}",
+            "track_id": track_id,
+            "timestamp": event_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "class": vehicle_class,
+            "speed_kmh": speed,
+            "passengers": pax_count,
+            "violations": violations,
+            "is_violation": len(violations) > 0,
+            "image_path": "N/A",
+            "thumb_path": None,
+            "plate_number": plate,
+            "zone": None
+        })
+
+    with open(path, 'w') as f:
+        json.dump(records, f)
+    return records
+
+
+class StubSMSClient:
+    """
+    Stands in for twilio.rest.Client: counts messages instead of sending them.
+    """
+    _ids = itertools.count(1)
+    sent = 0
+    _lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        self.messages = self
+
+    def create(self, **kwargs):
+        with StubSMSClient._lock:
+            StubSMSClient.sent += 1
+        return SimpleNamespace(sid=f"SMLOADTEST{next(self._ids)}")
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = ("Load-tests the dashboard views against synthetic logs (10k/100k/1M events) with concurrent "
+            "clients, with and without the page cache. Runs on a throwaway test database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, nargs='+', default=[10000, 100000],
+                            help="Log sizes to test (e.g. 10000 100000 1000000)")
+        parser.add_argument('--clients', type=int, default=8, help="Concurrent clients")
+        parser.add_argument('--requests', type=int, default=48, help="Requests per view and mode")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        workdir = tempfile.mkdtemp(prefix="campusguard_loadtest_")
+        os.makedirs(os.path.join(workdir, 'output'))
+        log_path = os.path.join(workdir, 'output', 'vehicle_log.json')
+
+        # Throwaway database (a file for SQLite, so every client thread sees the same data)
+        if connection.vendor == 'sqlite':
+            connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(workdir, 'loadtest.sqlite3')
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        results = []
+        try:
+            with override_settings(MEDIA_ROOT=workdir), mock.patch('dashboard.views.Client', StubSMSClient):
+                for events in options['events']:
+                    results.append(self._run_size(log_path, events, options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['json']}")
+
+    # --- SCENARIOS ---
+
+    def _run_size(self, log_path, events, options):
+        self.stdout.write(f"\n=== {events} events ===")
+        start = time.perf_counter()
+        generate_log(log_path, events, options['seed'])
+        self.stdout.write(f"{'generate log':>24}: {time.perf_counter() - start:.2f} s "
+                          f"({os.path.getsize(log_path) / 1e6:.1f} MB)")
+
+        # Index the log up front: the test measures serving, not the one-off backfill
+        start = time.perf_counter()
+        reset()
+        ingest(log_path, force=True)
+        self.stdout.write(f"{'build index/rollups':>24}: {time.perf_counter() - start:.2f} s")
+
+        urls = {
+            "tab_all": "/all/",
+            "tab_violations": "/violations/",
+            "tab_rewards": "/rewards/",
+            "send_alert": f"/send_alert/{ALERT_PLATE}/",
+        }
+        report = {'events': events, 'clients': options['clients'], 'modes': {}}
+        pages = {}
+        for mode, enabled in (("uncached", False), ("cached", True)):
+            invalidate_cache()
+            with override_settings(DASHBOARD_CACHE=enabled):
+                report['modes'][mode] = {
+                    view: self._load(urls[view], options['clients'], options['requests'])
+                    for view in VIEWS
+                }
+                pages[mode] = {view: Client().get(urls[view]).content for view in VIEWS[:3]}
+                if enabled:
+                    report['invalidation_ok'] = self._check_invalidation(log_path)
+
+        report['identical_pages'] = pages["uncached"] == pages["cached"]
+        self._print_report(report)
+        return report
+
+    def _load(self, url, clients, requests):
+        """
+        `requests` GETs of `url` spread over `clients` threads, each with its own test client.
+        """
+        latencies, errors = [], []
+        lock = threading.Lock()
+        per_client = [requests // clients + (1 if i < requests % clients else 0) for i in range(clients)]
+
+        def client_loop(count):
+            client = Client()
+            local = []
+            bad = 0
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.get(url)
+                local.append(time.perf_counter() - start)
+                if response.status_code != 200 or b'"status": "error"' in response.content:
+                    bad += 1
+            with lock:
+                latencies.extend(local)
+                errors.append(bad)
+            connections.close_all()
+
+        threads = [threading.Thread(target=client_loop, args=(count,)) for count in per_client if count]
+        start = time.perf_counter()
+        # Views print per request (e.g. "SMS Sent"): keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': sum(errors),
+            'req_per_s': len(latencies) / elapsed if elapsed else 0.0,
+            'mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            'p50_ms': _percentile(latencies, 50) * 1000,
+            'p95_ms': _percentile(latencies, 95) * 1000,
+            'p99_ms': _percentile(latencies, 99) * 1000,
+        }
+
+    def _check_invalidation(self, log_path):
+        """
+        A newly logged event must show up on the (cached) first page right away.
+        """
+        client = Client()
+        client.get("/all/")   # Make sure page 1 is cached
+
+        with open(log_path, 'r') as f:
+            data = json.load(f)
+        marker = "LT00ZZ0001"
+        record = dict(data[-1], entry_id=f"999999_{marker}", track_id=999999, plate_number=marker,
+                      timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        data.append(record)
+        with open(log_path, 'w') as f:
+            json.dump(data, f)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            return marker.encode() in client.get("/all/").content
+
+    def _print_report(self, report):
+        self.stdout.write(f"\n{'view':<16}{'mode':<10}{'req/s':>9}{'mean ms':>10}{'p50 ms':>10}"
+                          f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for view in VIEWS:
+            for mode in ("uncached", "cached"):
+                s = report['modes'][mode][view]
+                self.stdout.write(f"{view:<16}{mode:<10}{s['req_per_s']:>9.1f}{s['mean_ms']:>10.2f}"
+                                  f"{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}{s['errors']:>8}")
+            uncached = report['modes']['uncached'][view]['req_per_s']
+            cached = report['modes']['cached'][view]['req_per_s']
+            if uncached:
+                self.stdout.write(f"{'':<16}speedup x{cached / uncached:.1f}")
+
+        self.stdout.write(f"\n{'identical pages':>24}: {report['identical_pages']}")
+        self.stdout.write(f"{'new event invalidates':>24}: {report['invalidation_ok']}")
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Vehicle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plate', models.CharField(max_length=20, unique=True)),
+                ('first_seen', models.DateTimeField()),
+                ('last_seen', models.DateTimeField(db_index=True)),
+                ('event_count', models.PositiveIntegerField(default=0)),
+                ('violation_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlateKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=20)),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='plate_keys', to='dashboard.vehicle')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('key', 'vehicle'), name='unique_plate_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlateEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('camera_id', models.CharField(max_length=64)),
+                ('run_id', models.CharField(max_length=64)),
+                ('entry_id', models.CharField(max_length=100)),
+                ('track_id', models.IntegerField()),
+                ('timestamp', models.DateTimeField()),
+                ('plate_read', models.CharField(db_index=True, max_length=32)),
+                ('match_distance', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('vehicle_class', models.CharField(max_length=32)),
+                ('speed_kmh', models.FloatField(blank=True, null=True)),
+                ('violations', models.JSONField(default=list)),
+                ('is_violation', models.BooleanField(default=False)),
+                ('image_path', models.CharField(blank=True, max_length=200)),
+                ('thumb_path', models.CharField(blank=True, max_length=200)),
+                ('vehicle', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='events', to='dashboard.vehicle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['vehicle', 'timestamp'], name='dashboard_p_vehicle_86403b_idx'), models.Index(fields=['is_violation', 'timestamp'], name='dashboard_p_is_viol_b971a9_idx')],
+                'constraints': [models.UniqueConstraint(fields=('camera_id', 'run_id', 'entry_id'), name='unique_plate_event')],
+            },
+        ),
+    ]
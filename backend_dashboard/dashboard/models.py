@@ -1,3 +1,157 @@
 from django.db import models
 
-# Create your models here.
+# --- ANALYTICS ROLLUPS ---
+# Pre-aggregated counts per time bucket, maintained incrementally from vehicle_log.json
+# by dashboard/ingest.py, so analytics queries never scan the raw log.
+
+GRANULARITY_CHOICES = [
+    ('minute', 'Minute'),
+    ('hour', 'Hour'),
+    ('day', 'Day'),
+]
+
+
+class TrafficRollup(models.Model):
+    """
+    Vehicles, violating vehicles and speed totals per bucket and vehicle class.
+    """
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()   # Start of the minute/hour/day
+    vehicle_class = models.CharField(max_length=32)
+
+    vehicles = models.PositiveIntegerField(default=0)
+    violations = models.PositiveIntegerField(default=0)   # Vehicles with at least one violation
+    speed_sum = models.FloatField(default=0)
+    speed_count = models.PositiveIntegerField(default=0)
+    speed_max = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'bucket', 'vehicle_class'], name='unique_traffic_rollup'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} {self.vehicle_class}: {self.vehicles}"
+
+
+class ViolationRollup(models.Model):
+    """
+    Violation counts per bucket, vehicle class and violation type ("Speeding", "Triple Riding", ...).
+    """
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    vehicle_class = models.CharField(max_length=32)
+    violation_type = models.CharField(max_length=32)
+
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'bucket', 'vehicle_class', 'violation_type'],
+                name='unique_violation_rollup'
+            ),
+        ]
+
+
+class SpeedHistogram(models.Model):
+    """
+    Speed distribution per bucket and vehicle class; bin_start is the lower edge (km/h).
+    """
+    granularity = models.CharField(max_length=6, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    vehicle_class = models.CharField(max_length=32)
+    bin_start = models.PositiveIntegerField()
+
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'bucket', 'vehicle_class', 'bin_start'],
+                name='unique_speed_histogram'
+            ),
+        ]
+
+
+class IngestCursor(models.Model):
+    """
+    How far each log file has been rolled up (records are only ever appended).
+    """
+    source = models.CharField(max_length=500, unique=True)
+    records = models.PositiveIntegerField(default=0)      # Records already ingested
+    first_entry_id = models.CharField(max_length=100, blank=True)   # Detects a cleared/replaced log
+    file_size = models.BigIntegerField(default=0)
+    file_mtime = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} ({self.records} records)"
+
+
+# --- PLATE IDENTITY ---
+# Persistent, plate-keyed vehicle identities that link events across runs and cameras
+# (track IDs reset every run). Maintained by dashboard/identity.py.
+
+class Vehicle(models.Model):
+    """
+    One physical vehicle. `plate` is its canonical reading: a registered plate once one is
+    attached, otherwise the most frequent reading (see identity.refresh_vehicle_stats).
+    """
+    plate = models.CharField(max_length=20, unique=True)   # Normalised: upper case, alphanumerics only
+    first_seen = models.DateTimeField()
+    last_seen = models.DateTimeField(db_index=True)
+    event_count = models.PositiveIntegerField(default=0)
+    violation_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.plate
+
+
+class PlateKey(models.Model):
+    """
+    Lookup key of a vehicle: its plate with OCR-confusable characters folded (see identity.py),
+    so readings that differ only in confusable characters are an index hit.
+    """
+    key = models.CharField(max_length=20, db_index=True)
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='plate_keys')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'vehicle'], name='unique_plate_key'),
+        ]
+
+
+class PlateEvent(models.Model):
+    """
+    One logged vehicle passage (a vehicle_log.json record), linked to its identity.
+    """
+    vehicle = models.ForeignKey(Vehicle, null=True, blank=True, on_delete=models.SET_NULL,
+                                related_name='events')   # None while the plate is unreadable
+    camera_id = models.CharField(max_length=64)
+    run_id = models.CharField(max_length=64)
+    entry_id = models.CharField(max_length=100)
+    track_id = models.IntegerField()
+    timestamp = models.DateTimeField()
+    plate_read = models.CharField(max_length=32, db_index=True)   # As read by OCR (may differ from vehicle.plate)
+    match_distance = models.PositiveSmallIntegerField(null=True, blank=True)   # Confusable characters differing (0 = exact)
+    vehicle_class = models.CharField(max_length=32)
+    speed_kmh = models.FloatField(null=True, blank=True)
+    violations = models.JSONField(default=list)
+    is_violation = models.BooleanField(default=False)
+    image_path = models.CharField(max_length=200, blank=True)
+    thumb_path = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['camera_id', 'run_id', 'entry_id'], name='unique_plate_event'),
+        ]
+        indexes = [
+            models.Index(fields=['vehicle', 'timestamp']),
+            models.Index(fields=['is_violation', 'timestamp']),
+        ]
+
+    def __str__(self):
+        return f"{self.plate_read} @ {self.camera_id} {self.timestamp:%Y-%m-%d %H:%M:%S}"
@@ -0,0 +1,14 @@
+# Maps vehicle identities (normalised plates, see identity.py) to Real-World Data
+MOCK_REGISTRY = {
+    "GJ27TF3843": {
+        "owner": "Vinit Gupta", 
+        "phone": "+919638460250"
+    },
+    "GJ05AB1234": {
+        "owner": "Anusmita Sen",
+        "phone": "+919106983613"
+    }
+}
+
+# List of authorized plates
+AUTHORIZED_PLATES = ["GJ27TF3843", "MH12AB1234", "KA01MN9999"]
@@ -0,0 +1,203 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Sum, Max
+from django.utils import timezone
+from .models import TrafficRollup, ViolationRollup, SpeedHistogram
+
+GRANULARITIES = ('minute', 'hour', 'day')
+SPEED_BIN_WIDTH = 5   # km/h (line-mode speeds are multiples of 5)
+
+# Range length up to which each granularity is chosen automatically
+AUTO_GRANULARITY = [
+    (timedelta(hours=6), 'minute'),
+    (timedelta(days=7), 'hour'),
+]
+
+
+def bucket_start(dt, granularity):
+    if granularity == 'minute':
+        return dt.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return dt.replace(minute=0, second=0, microsecond=0)
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def parse_timestamp(value):
+    """
+    Log timestamps are the CV engine's naive local time: they are read in TIME_ZONE.
+    """
+    dt = datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    return timezone.make_aware(dt, timezone.get_default_timezone()) if settings.USE_TZ else dt
+
+
+def _local(dt):
+    # Buckets start at local minutes/hours/midnights, whatever zone `dt` comes in
+    return timezone.localtime(dt, timezone.get_default_timezone()) if settings.USE_TZ else dt
+
+
+# --- INGESTION (called by dashboard/ingest.py) ---
+
+def aggregate(records):
+    """
+    Folds log records into rollup deltas: three dicts keyed like the rollup tables.
+    """
+    traffic = defaultdict(lambda: {'vehicles': 0, 'violations': 0, 'speed_sum': 0.0,
+                                   'speed_count': 0, 'speed_max': None})
+    violations = defaultdict(int)
+    histogram = defaultdict(int)
+
+    for record in records:
+        try:
+            event_time = parse_timestamp(record['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        vehicle_class = record.get('class') or 'unknown'
+        speed = record.get('speed_kmh')
+        has_speed = isinstance(speed, (int, float))
+        record_violations = record.get('violations') or []
+
+        for granularity in GRANULARITIES:
+            bucket = bucket_start(event_time, granularity)
+            stats = traffic[(granularity, bucket, vehicle_class)]
+            stats['vehicles'] += 1
+            if record_violations:
+                stats['violations'] += 1
+            if has_speed:
+                stats['speed_sum'] += speed
+                stats['speed_count'] += 1
+                if stats['speed_max'] is None or speed > stats['speed_max']:
+                    stats['speed_max'] = speed
+                bin_start = int(max(speed, 0) // SPEED_BIN_WIDTH) * SPEED_BIN_WIDTH
+                histogram[(granularity, bucket, vehicle_class, bin_start)] += 1
+            for violation_type in record_violations:
+                violations[(granularity, bucket, vehicle_class, violation_type)] += 1
+
+    return traffic, violations, histogram
+
+
+def _existing(model, keys, key_fields):
+    """
+    Existing rows for `keys`, fetched per granularity with chunked bucket__in queries
+    (SQLite limits the number of query parameters).
+    """
+    buckets = defaultdict(set)
+    for key in keys:
+        buckets[key[0]].add(key[1])
+
+    rows = {}
+    for granularity, bucket_set in buckets.items():
+        bucket_list = sorted(bucket_set)
+        for i in range(0, len(bucket_list), 500):
+            queryset = model.objects.filter(granularity=granularity, bucket__in=bucket_list[i:i + 500])
+            for row in queryset:
+                rows[tuple(getattr(row, f) for f in key_fields)] = row
+    return rows
+
+
+def _upsert_counts(model, deltas, key_fields):
+    existing = _existing(model, deltas.keys(), key_fields)
+    to_create, to_update = [], []
+    for key, count in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            to_create.append(model(count=count, **dict(zip(key_fields, key))))
+        else:
+            row.count += count
+            to_update.append(row)
+    model.objects.bulk_create(to_create, batch_size=500)
+    model.objects.bulk_update(to_update, ['count'], batch_size=500)
+
+
+def apply(traffic, violations, histogram):
+    """
+    Adds aggregated deltas to the rollup tables.
+    """
+    key_fields = ('granularity', 'bucket', 'vehicle_class')
+    existing = _existing(TrafficRollup, traffic.keys(), key_fields)
+    to_create, to_update = [], []
+    for key, stats in traffic.items():
+        row = existing.get(key)
+        if row is None:
+            to_create.append(TrafficRollup(**dict(zip(key_fields, key)), **stats))
+            continue
+        row.vehicles += stats['vehicles']
+        row.violations += stats['violations']
+        row.speed_sum += stats['speed_sum']
+        row.speed_count += stats['speed_count']
+        if stats['speed_max'] is not None and (row.speed_max is None or stats['speed_max'] > row.speed_max):
+            row.speed_max = stats['speed_max']
+        to_update.append(row)
+    TrafficRollup.objects.bulk_create(to_create, batch_size=500)
+    TrafficRollup.objects.bulk_update(
+        to_update, ['vehicles', 'violations', 'speed_sum', 'speed_count', 'speed_max'], batch_size=500
+    )
+
+    _upsert_counts(ViolationRollup, violations, key_fields + ('violation_type',))
+    _upsert_counts(SpeedHistogram, histogram, key_fields + ('bin_start',))
+
+
+# --- QUERIES ---
+
+def pick_granularity(start, end):
+    span = end - start
+    for limit, granularity in AUTO_GRANULARITY:
+        if span <= limit:
+            return granularity
+    return 'day'
+
+
+def query_analytics(start, end, granularity=None, vehicle_class=None):
+    """
+    Time series, per-class totals, violation breakdown and speed histogram for
+    [start, end), read only from the rollup tables.
+    """
+    granularity = granularity or pick_granularity(start, end)
+    window = {'granularity': granularity, 'bucket__gte': bucket_start(_local(start), granularity), 'bucket__lt': end}
+    if vehicle_class:
+        window['vehicle_class'] = vehicle_class
+
+    traffic = TrafficRollup.objects.filter(**window)
+    totals = dict(vehicles=Sum('vehicles'), violations=Sum('violations'), speed_sum=Sum('speed_sum'),
+                  speed_count=Sum('speed_count'), speed_max=Max('speed_max'))
+
+    def _with_avg(row):
+        row['avg_speed'] = round(row['speed_sum'] / row['speed_count'], 1) if row['speed_count'] else None
+        del row['speed_sum']
+        return row
+
+    series = [
+        _with_avg(dict(row, bucket=_local(row['bucket']).isoformat()))
+        for row in traffic.values('bucket').annotate(**totals).order_by('bucket')
+    ]
+    by_class = {
+        row.pop('vehicle_class'): _with_avg(row)
+        for row in traffic.values('vehicle_class').annotate(**totals).order_by('vehicle_class')
+    }
+
+    violation_rows = ViolationRollup.objects.filter(**window)
+    violations_by_type = {
+        row['violation_type']: row['count']
+        for row in violation_rows.values('violation_type').annotate(count=Sum('count'))
+    }
+    violation_series = defaultdict(dict)
+    for row in violation_rows.values('bucket', 'violation_type').annotate(count=Sum('count')).order_by('bucket'):
+        violation_series[_local(row['bucket']).isoformat()][row['violation_type']] = row['count']
+
+    histogram = [
+        {'bin_start': row['bin_start'], 'bin_end': row['bin_start'] + SPEED_BIN_WIDTH, 'count': row['count']}
+        for row in SpeedHistogram.objects.filter(**window)
+        .values('bin_start').annotate(count=Sum('count')).order_by('bin_start')
+    ]
+
+    return {
+        'granularity': granularity,
+        'start': _local(start).isoformat(),
+        'end': _local(end).isoformat(),
+        'vehicle_class': vehicle_class,
+        'series': series,
+        'by_class': by_class,
+        'violations_by_type': violations_by_type,
+        'violation_series': [{'bucket': b, **counts} for b, counts in violation_series.items()],
+        'speed_histogram': histogram,
+    }
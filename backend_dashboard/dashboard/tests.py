@@ -1,3 +1,275 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from .identity import normalize_plate, lookup_vehicle, exact_vehicle, index_records
+from . import ingest as ingest_module
+from .ingest import ingest, ingest_in_background
+from .utils import invalidate_cache, get_vehicle_data, cache_by_data_version
+from .models import Vehicle, PlateEvent, TrafficRollup
 
-# Create your tests here.
+
+def make_record(entry_id, plate, violations=(), camera_id="gate-1", run_id="run-1",
+                timestamp="2026-09-01 10:00:00"):
+    return {
+        "entry_id": entry_id,
+        "camera_id": camera_id,
+        "run_id": run_id,
+        "track_id": 1,
+        "timestamp": timestamp,
+        "class": "car",
+        "speed_kmh": 25,
+        "passengers": 0,
+        "violations": list(violations),
+        "is_violation": bool(violations),
+        "image_path": "N/A",
+        "thumb_path": None,
+        "plate_number": plate,
+        "zone": None,
+    }
+
+
+class DashboardTestCase(TestCase):
+    """
+    Runs against an empty media dir, so views never ingest the real vehicle log.
+    Requests start no background ingests: tests call ingest() themselves.
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, DASHBOARD_CACHE=False,
+                                              DASHBOARD_INGEST_INTERVAL=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def index(self, *plates, violations=()):
+        index_records([make_record(f"{i}_x", plate, violations) for i, plate in enumerate(plates)])
+
+
+class PlateMatchingTests(DashboardTestCase):
+    def test_normalize_plate(self):
+        self.assertEqual(normalize_plate("gj 05-ab 1234"), "GJ05AB1234")
+        self.assertIsNone(normalize_plate("N/A"))
+        self.assertIsNone(normalize_plate("Pending OCR"))
+        self.assertIsNone(normalize_plate("AB1"))
+
+    def test_confusable_readings_share_an_identity(self):
+        self.index("GJ05AB1234", "GJO5AB1234", "GJ05A81234", "GJ05AB1Z34")
+        self.assertEqual(list(Vehicle.objects.values_list('plate', flat=True)), ["GJ05AB1234"])
+        self.assertEqual(Vehicle.objects.get().event_count, 4)
+
+    def test_near_miss_plates_stay_separate(self):
+        # One non-confusable character apart: different vehicles
+        self.index("GJ05AB1234", "GJ05AB1235", "GJ05AB1284", "GJ05AB123", "GJ05AC1234")
+        self.assertEqual(Vehicle.objects.count(), 5)
+        for plate in ("GJ05AB1235", "GJ05AB1284", "GJ05AB123", "GJ05AC1234"):
+            vehicle, distance = lookup_vehicle(plate)
+            self.assertEqual((vehicle.plate, distance), (plate, 0))
+
+    def test_lookup_of_unknown_near_miss_finds_nothing(self):
+        self.index("GJ05AB1234")
+        self.assertEqual(lookup_vehicle("GJ05AB1239"), (None, None))
+        self.assertEqual(lookup_vehicle("GJ05AB1234")[0].plate, "GJ05AB1234")
+        self.assertEqual(lookup_vehicle("GJO5AB1234")[1], 1)
+
+    def test_exact_vehicle_ignores_confusable_readings(self):
+        self.index("GJ05AB1234")
+        self.assertIsNone(exact_vehicle("GJO5AB1234"))
+        self.assertEqual(exact_vehicle("gj05ab1234").plate, "GJ05AB1234")
+
+
+class CanonicalPlateTests(DashboardTestCase):
+    def test_registered_plate_stays_put_when_misreads_outnumber_it(self):
+        self.index("GJ05AB1234", "GJO5AB1234", "GJO5AB1234", "GJO5AB1234")
+        vehicle = Vehicle.objects.get()
+        self.assertEqual((vehicle.plate, vehicle.event_count), ("GJ05AB1234", 4))
+        self.assertEqual(exact_vehicle("GJ05AB1234"), vehicle)
+
+    def test_misread_first_identity_moves_to_registered_plate(self):
+        self.index("GJ05A81234", "GJ05A81234", "GJ05AB1234")
+        self.assertEqual(Vehicle.objects.get().plate, "GJ05AB1234")
+
+    def test_unregistered_identity_moves_to_majority_reading(self):
+        self.index("MH12A81234", "MH12AB1234", "MH12AB1234")
+        self.assertEqual(Vehicle.objects.get().plate, "MH12AB1234")
+
+
+class PlateApiTests(DashboardTestCase):
+    def test_events_of_near_miss_plate_are_not_returned(self):
+        self.index("GJ05AB1234", "GJ05AB1234")
+        response = self.client.get("/api/plates/GJ05AB1239/events/")
+        self.assertEqual(response.status_code, 404)
+
+        response = self.client.get("/api/plates/GJ05AB1234/events/")
+        self.assertEqual(response.json()['total_events'], 2)
+
+    @mock.patch('dashboard.views.Client')
+    def test_send_alert_requires_exact_identity(self, sms_client):
+        self.index("GJ05AB1234", "GJ05AB1235", violations=["Speeding"])
+        self.assertEqual(PlateEvent.objects.count(), 2)
+
+        # A misread (even a confusable one) must never reach the registered owner
+        for plate in ("GJ05AB1235", "GJ05AB1239", "GJO5AB1234"):
+            response = self.client.get(f"/send_alert/{plate}/")
+            self.assertEqual(response.json()['status'], 'error')
+        sms_client.return_value.messages.create.assert_not_called()
+
+        response = self.client.get("/send_alert/GJ05AB1234/")
+        self.assertEqual(response.json()['status'], 'success')
+        sms_client.return_value.messages.create.assert_called_once()
+        self.assertIn("GJ05AB1234", sms_client.return_value.messages.create.call_args.kwargs['body'])
+
+    def test_misread_resolves_to_registered_identity(self):
+        self.index("GJO5AB1234", "GJO5AB1234", "GJ05AB1234")
+        response = self.client.get("/api/plates/GJO5AB1234/events/")
+        self.assertEqual(response.json()['plate'], "GJ05AB1234")
+
+
+class SnapshotRetentionTests(DashboardTestCase):
+    def test_deleted_snapshots_are_dropped_from_events_and_pages(self):
+        violations = os.path.join(self.media_root, 'output', 'violations')
+        for path in ("images/aa/bb/kept.jpg", "images/cc/dd/gone.jpg"):
+            os.makedirs(os.path.dirname(os.path.join(violations, path)), exist_ok=True)
+            open(os.path.join(violations, path), 'wb').close()
+        records = [make_record(f"{i}_a", "GJ27TF3843", ["Speeding"]) for i in range(2)]
+        for record, path in zip(records, ("images/aa/bb/kept.jpg", "images/cc/dd/gone.jpg")):
+            record["image_path"] = record["thumb_path"] = path
+        log_path = os.path.join(self.media_root, 'output', 'vehicle_log.json')
+        with open(log_path, 'w') as f:
+            json.dump(records, f)
+        ingest(log_path)
+
+        # cv_engine/cleanup.py: deletes the file and touches the stamp, the log is left alone
+        os.remove(os.path.join(violations, "images/cc/dd/gone.jpg"))
+        open(os.path.join(violations, ".last_cleanup"), 'w').close()
+
+        shown = {e['entry_id']: e['display_image'] for e in get_vehicle_data()}
+        self.assertEqual(shown, {"0_a": "output/violations/images/aa/bb/kept.jpg", "1_a": None})
+        paths = dict(PlateEvent.objects.values_list('entry_id', 'image_path'))
+        self.assertEqual(paths, {"0_a": "images/aa/bb/kept.jpg", "1_a": ""})
+        events = self.client.get("/api/plates/GJ27TF3843/events/").json()['events']
+        self.assertEqual(sorted(e['image_path'] or "" for e in events), ["", "images/aa/bb/kept.jpg"])
+
+
+class PageCacheTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        override = override_settings(DASHBOARD_CACHE=True)
+        override.enable()
+        self.addCleanup(override.disable)
+        invalidate_cache()
+        self.addCleanup(invalidate_cache)
+
+    def write_log(self, name, records):
+        path = os.path.join(self.media_root, 'output', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(records, f)
+        return path
+
+    def test_rewards_page_follows_backfilled_logs(self):
+        ingest(self.write_log('vehicle_log.json', [make_record("1_a", "GJ27TF3843")]))
+        self.assertIn(b"+1</td>", self.client.get("/rewards/").content)
+
+        # backfill_rollups of an archived log: the live log is unchanged
+        archive = self.write_log('archive.json', [make_record("1_b", "GJ27TF3843", run_id="run-0")])
+        ingest(archive, force=True)
+        self.assertIn(b"+2</td>", self.client.get("/rewards/").content)
+
+    def test_cached_response_keeps_content_type_and_headers(self):
+        calls = []
+
+        @cache_by_data_version
+        def json_view(request):
+            calls.append(request)
+            response = JsonResponse({'vehicles': 1})
+            response['X-Data-Version'] = "1"
+            return response
+
+        for _ in range(2):
+            response = json_view(RequestFactory().get("/api/example/"))
+            self.assertEqual(response['Content-Type'], "application/json")
+            self.assertEqual(response['X-Data-Version'], "1")
+            self.assertEqual(json.loads(response.content), {'vehicles': 1})
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(DASHBOARD_INGEST_INTERVAL=30)
+    @mock.patch.dict(ingest_module._background, {'thread': None, 'started': None})
+    @mock.patch('dashboard.ingest.ingest')
+    def test_pages_never_ingest_on_the_request_thread(self, ingest_mock):
+        self.write_log('vehicle_log.json', [make_record("1_a", "GJ27TF3843")])
+        with mock.patch('dashboard.ingest.threading.Thread') as thread:
+            self.assertEqual(self.client.get("/all/").status_code, 200)
+        ingest_mock.assert_not_called()
+        self.assertEqual(thread.call_args.kwargs['target'], ingest_module._ingest_quietly)
+
+
+class IngestTests(DashboardTestCase):
+    def write_log(self, name, records):
+        path = os.path.join(self.media_root, name)
+        with open(path, 'w') as f:
+            json.dump(records, f)
+        return path
+
+    def vehicles_rolled_up(self):
+        return sum(TrafficRollup.objects.filter(granularity='day').values_list('vehicles', flat=True))
+
+    def test_archived_copy_of_a_log_is_not_counted_twice(self):
+        records = [make_record("1_a", "GJ27TF3843"), make_record("2_a", "MH12AB1234", ["Speeding"])]
+        self.assertEqual(ingest(self.write_log('vehicle_log.json', records)), 2)
+
+        archive = self.write_log('archive.json', records + [make_record("3_a", "KA01MN9999")])
+        self.assertEqual(ingest(archive, force=True), 1)
+        self.assertEqual(self.vehicles_rolled_up(), 3)
+        self.assertEqual(PlateEvent.objects.count(), 3)
+
+    def test_forced_ingest_of_an_unchanged_log_adds_nothing(self):
+        path = self.write_log('vehicle_log.json', [make_record("1_a", "GJ27TF3843")])
+        ingest(path)
+        self.assertEqual(ingest(path, force=True), 0)
+        self.assertEqual(self.vehicles_rolled_up(), 1)
+
+
+class AnalyticsApiTests(DashboardTestCase):
+    def write_log(self, records):
+        path = os.path.join(self.media_root, 'output', 'vehicle_log.json')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(records, f)
+        return path
+
+    def test_api_reads_only_the_rollups(self):
+        path = self.write_log([make_record("1_a", "GJ27TF3843", ["Speeding"])])
+        url = "/api/analytics/?start=2026-09-01&end=2026-09-01&granularity=day"
+        self.assertEqual(self.client.get(url).json()['series'], [])
+
+        ingest(path)
+        self.assertEqual(self.client.get(url).json()['by_class']['car']['vehicles'], 1)
+
+    @override_settings(TIME_ZONE='Asia/Kolkata')
+    def test_log_times_are_bucketed_in_local_time(self):
+        # 02:00 local is still the previous day in UTC
+        ingest(self.write_log([make_record("1_a", "GJ27TF3843", timestamp="2026-09-01 02:10:00")]))
+
+        day = self.client.get("/api/analytics/?start=2026-09-01&end=2026-09-01&granularity=day").json()
+        self.assertEqual([row['bucket'] for row in day['series']], ["2026-09-01T00:00:00+05:30"])
+        hour = self.client.get("/api/analytics/?start=2026-09-01T02:00&end=2026-09-01T03:00&granularity=hour").json()
+        self.assertEqual([row['bucket'] for row in hour['series']], ["2026-09-01T02:00:00+05:30"])
+        self.assertEqual(PlateEvent.objects.get().timestamp.isoformat(), "2026-08-31T20:40:00+00:00")
+
+    @mock.patch.dict(ingest_module._background, {'thread': None, 'started': None})
+    @mock.patch('dashboard.ingest.connection')
+    @mock.patch('dashboard.ingest.ingest')
+    def test_background_ingest_is_rate_limited(self, ingest_mock, connection):
+        self.assertTrue(ingest_in_background(interval=60))
+        ingest_module._background['thread'].join(5)
+        self.assertFalse(ingest_in_background(interval=60))
+        ingest_mock.assert_called_once_with()
+
+        ingest_module._background['started'] -= 60
+        self.assertTrue(ingest_in_background(interval=60))
+        ingest_module._background['thread'].join(5)
+        self.assertEqual(ingest_mock.call_count, 2)
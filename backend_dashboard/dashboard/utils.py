@@ -1,30 +1,173 @@
+import hashlib
 import json
 import os
+import threading
+from contextlib import contextmanager
+from functools import wraps
 from django.conf import settings
-
-# Maps YOLO Track IDs to Real-World Data
-MOCK_REGISTRY = {
-    212: {
-        "plate": "GJ27TF3843", 
-        "owner": "Vinit Gupta", 
-        "phone": "+919638460250"
-    },
-    150: {
-        "plate": "GJ05AB1234",
-        "owner": "Anusmita Sen",
-        "phone": "+919106983613"
-    }
-}
-
-# List of authorized plates
-AUTHORIZED_PLATES = ["GJ27TF3843", "MH12AB1234", "KA01MN9999"]
+from django.core.cache import cache
+from django.db.models import Count, Max
+from .models import Vehicle, IngestCursor, PlateEvent
+from .ingest import ingest_in_background, default_log_path
+from .identity import event_identities
+from .registry import MOCK_REGISTRY, AUTHORIZED_PLATES
 
 # --- GAMIFICATION SETTINGS ---
 CREDIT_PER_CLEAN_ENTRY = 2   # Rupees earned for safe driving
 RISK_POINTS_PER_VIOLATION = 100 # Points accumulated for bad driving
 
+def refresh_index():
+    """
+    Starts rolling new log records into the identity index / analytics on a background thread
+    (rate-limited, see ingest_in_background) and drops snapshots deleted by cleanup. Never
+    ingests on the request thread: pages follow the index once the ingest is done.
+    """
+    ingest_in_background()
+    prune_missing_snapshots()
+
+# --- SNAPSHOTS ---
+# cv_engine/cleanup.py deletes old snapshots but leaves the vehicle log alone (the engine may be
+# writing it), so log records and PlateEvents can point at files that no longer exist.
+
+CLEANUP_STAMP = ".last_cleanup"   # Touched by the snapshot store after each cleanup
+
+# Cleanup stamp the PlateEvent paths were last checked against (per process)
+_pruned_snapshots = {'version': None}
+_pruned_snapshots_lock = threading.Lock()
+
+def violations_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'output', 'violations')
+
+def snapshot_exists(relative_path):
+    return bool(relative_path) and os.path.exists(os.path.join(violations_dir(), relative_path))
+
+def snapshot_version():
+    """
+    Changes whenever a snapshot cleanup deleted files.
+    """
+    try:
+        return str(os.stat(os.path.join(violations_dir(), CLEANUP_STAMP)).st_mtime_ns)
+    except OSError:
+        return "none"
+
+def prune_missing_snapshots():
+    """
+    Clears the image/thumbnail paths of PlateEvents whose snapshots were deleted.
+    Only scans after a cleanup (cheap otherwise: one stat of the stamp).
+    """
+    version = snapshot_version()
+    with _pruned_snapshots_lock:
+        if _pruned_snapshots['version'] == version:
+            return
+        if version != "none":
+            stale = []
+            for event in PlateEvent.objects.exclude(image_path="", thumb_path="").only('image_path', 'thumb_path'):
+                image_path = event.image_path if snapshot_exists(event.image_path) else ""
+                thumb_path = event.thumb_path if snapshot_exists(event.thumb_path) else ""
+                if (image_path, thumb_path) != (event.image_path, event.thumb_path):
+                    event.image_path, event.thumb_path = image_path, thumb_path
+                    stale.append(event)
+            PlateEvent.objects.bulk_update(stale, ['image_path', 'thumb_path'], batch_size=500)
+        _pruned_snapshots['version'] = version
+
+# --- CACHING ---
+# Everything the dashboard shows is derived from vehicle_log.json, the index built from it and
+# the snapshots that still exist, so their versions are the cache key. The index version lives in the database, so writes from
+# other processes (backfill_rollups, --reset) invalidate pages too.
+
+# Processed entries of the last seen version (reading/processing the log is the expensive part)
+_vehicle_data = {'version': None, 'entries': []}
+_vehicle_data_lock = threading.Lock()
+# Concurrent misses of the same page wait for one render; other pages are not held up
+_rebuild_locks = {}   # { cache key: [lock, waiting requests] }
+_rebuild_locks_guard = threading.Lock()
+
+def log_version():
+    """
+    Changes whenever the CV engine writes to vehicle_log.json.
+    """
+    try:
+        stat = os.stat(default_log_path())
+    except OSError:
+        return "missing"
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+def index_version():
+    """
+    Changes whenever logs are ingested (every ingest saves its cursor) or the index is reset.
+    """
+    cursors = IngestCursor.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    updated = cursors['updated'].timestamp() if cursors['updated'] else 0
+    return f"{cursors['count']}-{updated}"
+
+def data_version():
+    return f"{log_version()}:{index_version()}:{snapshot_version()}"
+
+@contextmanager
+def _rebuild_lock(key):
+    with _rebuild_locks_guard:
+        entry = _rebuild_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _rebuild_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _rebuild_locks[key]
+
+def invalidate_cache():
+    """
+    Drops cached pages and entries (e.g. after editing MOCK_REGISTRY).
+    """
+    cache.clear()
+    _vehicle_data.update(version=None, entries=[])
+
+def cache_by_data_version(view):
+    """
+    Caches a view's response (body, content type and headers) per URL until the log,
+    the index or the snapshots change. Only complete 200 responses without cookies are cached.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.DASHBOARD_CACHE:
+            return view(request, *args, **kwargs)
+
+        refresh_index()
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = f"dashboard:{view.__name__}:{data_version()}:{path}"
+        response = cache.get(key)
+        if response is None:
+            with _rebuild_lock(key):
+                response = cache.get(key)
+                if response is None:
+                    response = view(request, *args, **kwargs)
+                    if response.status_code == 200 and not response.streaming and not response.cookies:
+                        # Pickled by the cache backend: every hit gets its own copy
+                        cache.set(key, response, settings.DASHBOARD_CACHE_TIMEOUT)
+        return response
+    return wrapper
+
 def get_vehicle_data():
-    json_path = os.path.join(settings.MEDIA_ROOT, 'output', 'vehicle_log.json')
+    """
+    All log entries (newest first) with identity, owner and display fields.
+    Shared between requests until the log or the index changes: do not modify the returned entries.
+    """
+    refresh_index()
+    if not settings.DASHBOARD_CACHE:
+        return _load_vehicle_data()
+
+    with _vehicle_data_lock:
+        version = data_version()
+        if _vehicle_data['version'] != version:
+            _vehicle_data.update(version=version, entries=_load_vehicle_data())
+        return _vehicle_data['entries']
+
+def _load_vehicle_data():
+    identities = event_identities()
+
+    json_path = default_log_path()
     data = []
     
     if os.path.exists(json_path):
@@ -38,19 +181,21 @@ def get_vehicle_data():
 
     processed_data = []
     for entry in reversed(data):
-        track_id = entry.get('track_id')
+        # Persistent identity of this event (links OCR variants of a plate across runs/cameras)
+        event_key = (entry.get('camera_id') or "", entry.get('run_id') or "", entry.get('entry_id') or "")
+        vehicle_plate = identities.get(event_key)
+        entry['vehicle_plate'] = vehicle_plate
         
         # Inject Mock Data
-        if track_id in MOCK_REGISTRY:
-            mock_data = MOCK_REGISTRY[track_id]
-            entry['plate_number'] = mock_data['plate']
+        if vehicle_plate in MOCK_REGISTRY:
+            mock_data = MOCK_REGISTRY[vehicle_plate]
             entry['owner_name'] = mock_data['owner']
             entry['phone_number'] = mock_data['phone']
         else:
             entry['owner_name'] = "Unknown"
             entry['phone_number'] = None
 
-        plate = entry.get('plate_number', 'Unreadable')
+        plate = vehicle_plate or entry.get('plate_number', 'Unreadable')
         status = "Unknown"
         status_color = "text-muted"
         
@@ -65,48 +210,40 @@ def get_vehicle_data():
         entry['auth_status'] = status
         entry['auth_color'] = status_color
         
-        if entry.get('image_path') and entry.get('image_path') != "N/A":
+        # Snapshots deleted by the retention policy are not shown
+        if entry.get('image_path') not in (None, "N/A") and snapshot_exists(entry['image_path']):
             entry['display_image'] = f"output/violations/{entry['image_path']}"
         else:
             entry['display_image'] = None
 
+        # Small thumbnail for list views (older entries have none: fall back to the full image)
+        if snapshot_exists(entry.get('thumb_path')):
+            entry['display_thumb'] = f"output/violations/{entry['thumb_path']}"
+        else:
+            entry['display_thumb'] = entry['display_image']
+
         processed_data.append(entry)
         
     return processed_data
 
 def get_rewards_leaderboard():
     """
-    Calculates Wallet Balance and Risk Score.
+    Calculates Wallet Balance and Risk Score per vehicle identity (all runs and cameras).
     """
-    raw_data = get_vehicle_data()
+    refresh_index()
     leaderboard = {}
 
-    for entry in raw_data:
-        plate = entry.get('plate_number', 'Unreadable')
-        
-        if plate in ["Unreadable", "Pending OCR", "N/A"]:
-            continue
-            
-        if plate not in leaderboard:
-            leaderboard[plate] = {
-                'plate': plate,
-                'owner': entry.get('owner_name', 'Unknown'),
-                'total_entries': 0,
-                'violations': 0,
-                'clean_entries': 0,
-                'wallet_balance': 0,    # Earned Credits (₹)
-                'risk_score': 0         # Cumulative Penalty
-            }
-        
-        stats = leaderboard[plate]
-        stats['total_entries'] += 1
-        
-        if entry['is_violation']:
-            stats['violations'] += 1
-            stats['risk_score'] += RISK_POINTS_PER_VIOLATION
-        else:
-            stats['clean_entries'] += 1
-            stats['wallet_balance'] += CREDIT_PER_CLEAN_ENTRY
+    for vehicle in Vehicle.objects.filter(event_count__gt=0):
+        clean_entries = vehicle.event_count - vehicle.violation_count
+        leaderboard[vehicle.plate] = {
+            'plate': vehicle.plate,
+            'owner': MOCK_REGISTRY.get(vehicle.plate, {}).get('owner', 'Unknown'),
+            'total_entries': vehicle.event_count,
+            'violations': vehicle.violation_count,
+            'clean_entries': clean_entries,
+            'wallet_balance': clean_entries * CREDIT_PER_CLEAN_ENTRY,    # Earned Credits (₹)
+            'risk_score': vehicle.violation_count * RISK_POINTS_PER_VIOLATION    # Cumulative Penalty
+        }
 
     # Determine Driver Status based on Risk Score
     results = []
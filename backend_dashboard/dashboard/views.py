@@ -1,28 +1,48 @@
+from datetime import datetime, time, timedelta
+from django.core.paginator import Paginator
 from django.shortcuts import render, redirect
 from django.http import JsonResponse
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from twilio.rest import Client
-from .utils import get_vehicle_data, get_rewards_leaderboard
+from .utils import (
+    get_vehicle_data, get_rewards_leaderboard, refresh_index, cache_by_data_version, snapshot_exists,
+    MOCK_REGISTRY
+)
+from .rollups import query_analytics, GRANULARITIES
+from .ingest import ingest_in_background
+from .identity import exact_vehicle, events_for_plate, repeat_offenders
 
+def _page(request, entries):
+    return Paginator(entries, settings.DASHBOARD_PAGE_SIZE).get_page(request.GET.get('page'))
+
+@cache_by_data_version
 def tab_all_entries(request):
     data = get_vehicle_data()
+    page = _page(request, data)
     context = {
         'active_tab': 'all',
-        'entries': data
+        'entries': page,
+        'page_obj': page
     }
     return render(request, 'dashboard/tab_all.html', context)
 
+@cache_by_data_version
 def tab_violations(request):
     all_data = get_vehicle_data()
     # Filter only violations in Python
     violations = [d for d in all_data if d['is_violation']]
+    page = _page(request, violations)
     
     context = {
         'active_tab': 'violations',
-        'entries': violations
+        'entries': page,
+        'page_obj': page
     }
     return render(request, 'dashboard/tab_violations.html', context)
 
+@cache_by_data_version
 def tab_rewards(request):
     leaderboard = get_rewards_leaderboard()
     context = {
@@ -31,23 +51,26 @@ def tab_rewards(request):
     }
     return render(request, 'dashboard/tab_rewards.html', context)
 
-def send_alert(request, track_id):
+def send_alert(request, plate):
     """
     Sends an SMS via Twilio when the button is clicked.
+    plate: exact identity plate of the vehicle (never fuzzy-matched: a misread must not
+    reach another owner).
     """
-    # 1. Find the vehicle data
-    all_data = get_vehicle_data()
-    vehicle = next((item for item in all_data if item["track_id"] == int(track_id)), None)
+    # 1. Find the vehicle and its latest violation
+    refresh_index()
+    vehicle = exact_vehicle(plate)
+    owner = MOCK_REGISTRY.get(vehicle.plate) if vehicle else None
     
-    if not vehicle or not vehicle.get('phone_number'):
+    if not owner or not owner.get('phone'):
         return JsonResponse({'status': 'error', 'message': 'Phone number not found!'})
 
     # 2. Construct Message
-    plate = vehicle.get('plate_number')
-    violation = ", ".join(vehicle.get('violations', ['Unknown']))
+    event = vehicle.events.filter(is_violation=True).order_by('-timestamp').first()
+    violation = ", ".join(event.violations) if event else "Unknown"
     body_text = (
         f"⚠️ CAMPUS GUARD ALERT ⚠️\n"
-        f"Vehicle {plate} detected violating rules: {violation}.\n"
+        f"Vehicle {vehicle.plate} detected violating rules: {violation}.\n"
         f"Please report to security office immediately."
     )
 
@@ -57,11 +80,127 @@ def send_alert(request, track_id):
         message = client.messages.create(
             body=body_text,
             from_=settings.TWILIO_FROM_NUMBER,
-            to=vehicle['phone_number']
+            to=owner['phone']
         )
         print(f"SMS Sent: {message.sid}")
         return JsonResponse({'status': 'success', 'message': 'SMS Alert Sent!'})
         
     except Exception as e:
         print(f"Twilio Error: {e}")
-        return JsonResponse({'status': 'error', 'message': str(e)})
\ No newline at end of file
+        return JsonResponse({'status': 'error', 'message': str(e)})
+
+def _int_param(request, name, default, minimum=1, maximum=None):
+    value = int(request.GET.get(name, default))
+    if value < minimum or (maximum is not None and value > maximum):
+        raise ValueError(f"'{name}' out of range")
+    return value
+
+def plate_events_api(request, plate):
+    """
+    All events of the vehicle identified by `plate` (exact, or differing only in OCR-confusable
+    characters), newest first.
+    Query params: limit (default 200).
+    """
+    try:
+        limit = _int_param(request, 'limit', 200, maximum=5000)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    refresh_index()
+    vehicle, distance, events = events_for_plate(plate, limit=limit)
+    if vehicle is None:
+        return JsonResponse({'status': 'error', 'message': 'Unknown plate'}, status=404)
+
+    return JsonResponse({
+        'status': 'success',
+        'plate': vehicle.plate,
+        'match_distance': distance,
+        'first_seen': vehicle.first_seen.isoformat(),
+        'last_seen': vehicle.last_seen.isoformat(),
+        'total_events': vehicle.event_count,
+        'total_violations': vehicle.violation_count,
+        'events': [{
+            'timestamp': e.timestamp.isoformat(),
+            'camera_id': e.camera_id,
+            'run_id': e.run_id,
+            'track_id': e.track_id,
+            'plate_read': e.plate_read,
+            'class': e.vehicle_class,
+            'speed_kmh': e.speed_kmh,
+            'violations': e.violations,
+            'image_path': e.image_path if snapshot_exists(e.image_path) else None,
+        } for e in events],
+    })
+
+def repeat_offenders_api(request):
+    """
+    Vehicles with repeated violations. Query params: days (default 30), min (violations, default 2).
+    """
+    try:
+        days = _int_param(request, 'days', 30, maximum=3650)
+        min_violations = _int_param(request, 'min', 2)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    refresh_index()
+    offenders = repeat_offenders(days=days, min_violations=min_violations)
+    return JsonResponse({
+        'status': 'success',
+        'days': days,
+        'min_violations': min_violations,
+        'offenders': [{
+            'plate': row['vehicle__plate'],
+            'violations': row['violations'],
+            'cameras': row['cameras'],
+            'first_violation': row['first_violation'].isoformat(),
+            'last_violation': row['last_violation'].isoformat(),
+        } for row in offenders],
+    })
+
+def _parse_range_param(value):
+    """
+    Accepts YYYY-MM-DD or an ISO datetime; returns an aware datetime (None if invalid).
+    """
+    dt = parse_datetime(value)
+    if dt is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        dt = datetime.combine(day, time.min)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+def analytics_api(request):
+    """
+    JSON analytics over the pre-aggregated rollups.
+    Query params: start, end (YYYY-MM-DD or ISO datetime; default: last 7 days),
+    granularity (minute/hour/day; default: picked from the range), class (e.g. "car").
+    Reads only the rollup tables: new log records are rolled up in the background
+    (see ingest_in_background) or by `manage.py backfill_rollups`.
+    """
+    ingest_in_background()
+
+    end = timezone.now()
+    start = end - timedelta(days=7)
+    try:
+        if request.GET.get('end'):
+            end = _parse_range_param(request.GET['end'])
+            if end is None:
+                raise ValueError("Invalid 'end'")
+            if 'T' not in request.GET['end'] and ' ' not in request.GET['end']:
+                end += timedelta(days=1)   # A date as 'end' includes that whole day
+        if request.GET.get('start'):
+            start = _parse_range_param(request.GET['start'])
+            if start is None:
+                raise ValueError("Invalid 'start'")
+        granularity = request.GET.get('granularity') or None
+        if granularity is not None and granularity not in GRANULARITIES:
+            raise ValueError(f"'granularity' must be one of {', '.join(GRANULARITIES)}")
+        if start >= end:
+            raise ValueError("'start' must be before 'end'")
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    data = query_analytics(start, end, granularity=granularity, vehicle_class=request.GET.get('class') or None)
+    return JsonResponse({'status': 'success', **data})
@@ -0,0 +1,410 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+sys.path.append(os.getcwd())
+
+from cv_engine import config
+from cv_engine.modules.detector import Detector
+from cv_engine.modules.plate_reader import PlateReader
+from cv_engine.modules.vehicle_logger import VehicleLogger
+from cv_engine.modules.profiler import profiler
+from cv_engine.modules.stub_backends import (
+    StubTracker, StubPlateModel, StubOCR, synthetic_stream
+)
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def print_report(title, report):
+    print(f"\n=== {title} ===")
+    for key, value in report.items():
+        if key == "stages":
+            continue
+        print(f"{key:>24}: {value:.2f}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+    stages = report.get("stages")
+    if stages:
+        print(f"\n{'stage':<18}{'calls':>9}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, s in sorted(stages.items(), key=lambda kv: -kv[1]["mean_ms"] * kv[1]["count"]):
+            print(f"{name:<18}{s['count']:>9}{s['mean_ms']:>10.3f}{s['p50_ms']:>10.3f}"
+                  f"{s['p95_ms']:>10.3f}{s['p99_ms']:>10.3f}")
+
+
+# ==============================================================================
+# PIPELINE: replay detections through the non-model parts of Detector
+# ==============================================================================
+def build_stub_detector(stream, output_dir, args):
+    model = StubTracker(stream, latency=args.track_latency_ms / 1000)
+    plate_reader = PlateReader(
+        plate_model=StubPlateModel(latency=args.plate_latency_ms / 1000),
+        ocr=StubOCR(latency=args.ocr_latency_ms / 1000, seed=args.seed)
+    )
+    violations_dir = os.path.join(output_dir, "violations")
+    os.makedirs(violations_dir, exist_ok=True)
+    logger = VehicleLogger(
+        json_db_path=os.path.join(output_dir, "vehicle_log.json"),
+        violations_dir=violations_dir
+    )
+    return Detector(model=model, plate_reader=plate_reader, logger=logger)
+
+
+def run_pipeline(args):
+    width, height = config.PROCESS_RES
+    frame = np.random.default_rng(args.seed).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    stream = synthetic_stream(args.frames, spawn_rate=args.spawn_rate, seed=args.seed)
+
+    profiler.enabled = True
+    profiler.reset()
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        detector = build_stub_detector(stream, output_dir, args)
+
+        start = time.perf_counter()
+        for frame_num in range(args.frames):
+            with profiler.stage("frame_total"):
+                detector.process_frame(frame, frame_num)
+        # Tracks still on screen at the end are logged here
+        detector.close()
+        elapsed = time.perf_counter() - start
+
+    snap = profiler.snapshot()
+    report = {
+        "frames": args.frames,
+        "seconds": elapsed,
+        "frames_per_second": args.frames / elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    if args.tracemalloc:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report["tracemalloc_peak_mb"] = peak / (1024 * 1024)
+    report.update(snap["counters"])
+    report["stages"] = snap["stages"]
+    return report
+
+
+# ==============================================================================
+# BACKENDS: raw model latency per inference backend (needs ultralytics + weights)
+# ==============================================================================
+def _box_iou(a, b):
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def _load_frame(args):
+    import cv2
+
+    if args.video and os.path.exists(args.video):
+        cap = cv2.VideoCapture(args.video)
+        ret, frame = cap.read()
+        cap.release()
+        if ret:
+            return cv2.resize(frame, config.PROCESS_RES)
+    width, height = config.PROCESS_RES
+    return np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+
+def run_backends(args):
+    from cv_engine.modules.inference_backend import load_model
+
+    frame = _load_frame(args)
+    report = {"weights": args.weights, "imgsz": args.imgsz, "threads": args.threads, "stages": {}}
+    reference = None
+
+    for backend in args.backends:
+        model = load_model(args.weights, backend=backend, imgsz=args.imgsz, threads=args.threads)
+        predict = lambda: model.predict(frame, conf=config.CONF_THRESHOLD, imgsz=args.imgsz, verbose=False)
+
+        for _ in range(args.warmup):
+            predict()
+
+        timings = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            results = predict()
+            timings.append(time.perf_counter() - start)
+
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+        timings.sort()
+        report["stages"][backend] = {
+            "count": len(timings),
+            "mean_ms": sum(timings) / len(timings) * 1000,
+            "p50_ms": timings[len(timings) // 2] * 1000,
+            "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+            "p99_ms": timings[int(len(timings) * 0.99) - 1] * 1000,
+        }
+        report[f"{backend}_detections"] = len(boxes)
+
+        # Output agreement with the first backend (normally pytorch)
+        if reference is None:
+            reference = boxes
+        elif len(reference) and len(boxes):
+            matched = (_box_iou(reference, boxes).max(axis=1) > 0.9).mean()
+            report[f"{backend}_matched_boxes"] = f"{matched:.0%} (IoU > 0.9 vs {args.backends[0]})"
+
+    return report
+
+
+# ==============================================================================
+# BATCH: offline batched detection vs frame-by-frame tracking (needs ultralytics + weights)
+# ==============================================================================
+def _load_frames(video, frames):
+    import cv2
+
+    cap = cv2.VideoCapture(video)
+    loaded = []
+    while len(loaded) < frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        loaded.append(cv2.resize(frame, config.PROCESS_RES))
+    cap.release()
+    return loaded
+
+
+def _run_detector(frames, args, output_dir, batch_size):
+    """
+    Runs a fresh Detector over in-memory frames; batch_size None = process_frame().
+    Returns (seconds, logged records).
+    """
+    from cv_engine.modules.inference_backend import load_model
+
+    # A fresh model per run: model.track() keeps its tracker on the model
+    model = load_model(args.weights, imgsz=args.imgsz, threads=args.threads)
+    log_path = os.path.join(output_dir, f"log_{batch_size or 'frame'}.json")
+    violations_dir = os.path.join(output_dir, "violations")
+    os.makedirs(violations_dir, exist_ok=True)
+    detector = Detector(
+        model=model,
+        plate_reader=PlateReader(plate_model=StubPlateModel(), ocr=StubOCR(seed=args.seed)),
+        logger=VehicleLogger(json_db_path=log_path, violations_dir=violations_dir, autoflush=False),
+        record=False
+    )
+
+    start = time.perf_counter()
+    if batch_size is None:
+        for frame_num, frame in enumerate(frames):
+            detector.process_frame(frame, frame_num)
+    else:
+        for first in range(0, len(frames), batch_size):
+            for _ in detector.process_batch(frames[first:first + batch_size], first):
+                pass
+    detector.close()
+    elapsed = time.perf_counter() - start
+
+    with open(log_path) as f:
+        return elapsed, json.load(f)
+
+
+def _comparable(records):
+    # Timestamps/entry IDs come from the wall clock
+    keys = ("track_id", "class", "speed_kmh", "passengers", "violations", "plate_number", "zone")
+    return sorted(tuple(json.dumps(r.get(k)) for k in keys) for r in records)
+
+
+def run_batch(args):
+    from cv_engine.modules.inference_backend import configure_threads
+
+    if not args.video or not os.path.exists(args.video):
+        raise SystemExit(f"ERROR: Video not found at {args.video} (batched tracking needs real footage)")
+    configure_threads(args.threads)
+    frames = _load_frames(args.video, args.frames)
+    report = {"video": args.video, "frames": len(frames), "weights": args.weights, "stages": {}}
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        elapsed, reference = _run_detector(frames, args, output_dir, None)
+        report["frame_by_frame_fps"] = len(frames) / elapsed
+        report["vehicles_logged"] = len(reference)
+        expected = _comparable(reference)
+
+        for batch_size in args.batch_sizes:
+            elapsed, records = _run_detector(frames, args, output_dir, batch_size)
+            report[f"batch_{batch_size}_fps"] = len(frames) / elapsed
+            report[f"batch_{batch_size}_speedup"] = report["frame_by_frame_fps"] and (
+                report[f"batch_{batch_size}_fps"] / report["frame_by_frame_fps"]
+            )
+            report[f"batch_{batch_size}_identical"] = _comparable(records) == expected
+
+    return report
+
+
+# ==============================================================================
+# DECODE: per-frame allocations and time, legacy read+resize vs FrameSource
+# ==============================================================================
+def _make_clip(path, frames, size):
+    import cv2
+
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), config.TARGET_FPS, (width, height))
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    for i in range(frames):
+        writer.write(np.roll(base, i * 4, axis=1))
+    writer.release()
+
+
+def _measure_decode(read_frame, frames):
+    """
+    Calls read_frame() `frames` times, recording time and the heap allocation peak
+    of each call (NumPy/OpenCV buffers are traced by tracemalloc).
+    """
+    peaks, timings = [], []
+    tracemalloc.start()
+    for _ in range(frames):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+
+        start = time.perf_counter()
+        frame = read_frame()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        if frame is None:
+            break
+        del frame
+
+        timings.append(elapsed)
+        peaks.append(peak - base)
+    tracemalloc.stop()
+
+    width, height = config.PROCESS_RES
+    frame_bytes = width * height * 3
+
+    timings.sort()
+    return {
+        "count": len(timings),
+        "mean_ms": sum(timings) / len(timings) * 1000,
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+        "p99_ms": timings[int(len(timings) * 0.99) - 1] * 1000,
+        "alloc_peak_kb_per_frame": sum(peaks) / len(peaks) / 1024,
+        # Roughly how many PROCESS_RES-sized buffers each frame allocates
+        "frame_buffers_per_frame": sum(peaks) / len(peaks) / frame_bytes,
+    }
+
+
+def run_decode(args):
+    import cv2
+    from cv_engine.modules.frame_source import FrameSource
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video = args.video
+        if not video or not os.path.exists(video):
+            video = os.path.join(tmp, "clip.mp4")
+            _make_clip(video, args.frames, tuple(args.source_size))
+
+        # Legacy path: fresh decode + fresh resize, then the two copies process_frame used to make
+        cap = cv2.VideoCapture(video)
+        def legacy():
+            ret, frame = cap.read()
+            if not ret:
+                return None
+            frame = cv2.resize(frame, config.PROCESS_RES)
+            raw_frame = frame.copy()
+            overlay = frame.copy()
+            return cv2.addWeighted(overlay, 0.25, raw_frame, 0.75, 0)
+        legacy_stats = _measure_decode(legacy, args.frames)
+        cap.release()
+
+        # Ring-buffer path: decode/resize into reused buffers, blend into a reused canvas
+        source = FrameSource(video, ring_size=args.ring_size)
+        canvas, overlay = None, None
+        def ring():
+            nonlocal canvas, overlay
+            ret, frame = source.read()
+            if not ret:
+                return None
+            if canvas is None:
+                canvas, overlay = np.empty_like(frame), np.empty_like(frame)
+            np.copyto(overlay, frame)
+            return cv2.addWeighted(overlay, 0.25, frame, 0.75, 0, dst=canvas)
+        ring_stats = _measure_decode(ring, args.frames)
+        needs_resize = source.needs_resize
+        source.release()
+
+    report = {
+        "video": args.video or f"synthetic {args.source_size[0]}x{args.source_size[1]}",
+        "resize_skipped": not needs_resize,
+        "stages": {"legacy": legacy_stats, "ring_buffer": ring_stats},
+    }
+    for name, stats in report["stages"].items():
+        report[f"{name}_alloc_peak_kb"] = stats["alloc_peak_kb_per_frame"]
+        report[f"{name}_frame_buffers"] = stats["frame_buffers_per_frame"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CampusGuard CV engine benchmarks (CPU-only; `pipeline` needs no model weights).")
+    parser.add_argument("--json", help="Write the report to this JSON file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("pipeline", help="Replay a synthetic detection stream through Detector")
+    p.add_argument("--frames", type=int, default=3000)
+    p.add_argument("--spawn-rate", type=float, default=0.05, help="New vehicles per frame")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--track-latency-ms", type=float, default=0.0, help="Simulated YOLO.track cost")
+    p.add_argument("--plate-latency-ms", type=float, default=0.0, help="Simulated plate detector cost")
+    p.add_argument("--ocr-latency-ms", type=float, default=0.0, help="Simulated EasyOCR cost")
+    p.add_argument("--tracemalloc", action="store_true", help="Track Python/NumPy heap peak (slower)")
+    p.set_defaults(func=run_pipeline, title="Pipeline (stub backends)")
+
+    p = sub.add_parser("backends", help="Compare YOLO latency across inference backends on this CPU")
+    p.add_argument("--weights", default=config.MODEL_PATH, help="PyTorch weights (e.g. yolov8n.pt, best.pt)")
+    p.add_argument("--backends", nargs="+", default=["pytorch", "onnx", "openvino"])
+    p.add_argument("--imgsz", type=int, default=config.INFERENCE_IMGSZ)
+    p.add_argument("--threads", type=int, default=config.INFERENCE_THREADS)
+    p.add_argument("--iterations", type=int, default=50)
+    p.add_argument("--warmup", type=int, default=5)
+    p.add_argument("--video", default=config.VIDEO_PATH, help="Take the test frame from this video")
+    p.set_defaults(func=run_backends, title="Inference backends (ms per frame)")
+
+    p = sub.add_parser("batch", help="Offline batched detection vs frame-by-frame tracking: frames/s per batch size")
+    p.add_argument("--weights", default=config.MODEL_PATH, help="PyTorch weights (e.g. yolov8n.pt)")
+    p.add_argument("--video", default=config.VIDEO_PATH)
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    p.add_argument("--imgsz", type=int, default=config.INFERENCE_IMGSZ)
+    p.add_argument("--threads", type=int, default=config.INFERENCE_THREADS)
+    p.add_argument("--seed", type=int, default=0)
+    p.set_defaults(func=run_batch, title="Batched tracking (frames/s, output vs frame by frame)")
+
+    p = sub.add_parser("decode", help="Per-frame decode/resize time and allocations")
+    p.add_argument("--video", help="Video to decode (default: a generated clip)")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--source-size", type=int, nargs=2, default=[1920, 1080], metavar=("W", "H"),
+                   help="Size of the generated clip")
+    p.add_argument("--ring-size", type=int, default=config.FRAME_RING_SIZE)
+    p.set_defaults(func=run_decode, title="Decode path (ms per frame)")
+
+    args = parser.parse_args()
+    report = args.func(args)
+    print_report(args.title, report)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
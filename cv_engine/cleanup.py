@@ -0,0 +1,66 @@
+import os
+import sys
+import shutil
+import argparse
+
+sys.path.append(os.getcwd())
+
+from cv_engine import config
+from cv_engine.modules.snapshot_store import SnapshotStore
+
+
+def clear_all():
+    """
+    Wipes processed video frames, violation snapshots and the vehicle log.
+    """
+    frames_dir = os.path.dirname(config.OUTPUT_PATH)
+    for folder in (frames_dir, config.OUTPUT_VIOLATIONS_DIR):
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder, exist_ok=True)
+    if os.path.exists(config.OUTPUT_LOGS_DIR):
+        os.remove(config.OUTPUT_LOGS_DIR)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply the snapshot retention policy (or clear all outputs with --all)."
+    )
+    parser.add_argument("--all", action="store_true",
+                        help="Delete processed frames, all snapshots and the vehicle log")
+    parser.add_argument("--days", type=float, default=config.SNAPSHOT_RETENTION_DAYS,
+                        help="Delete snapshots older than this (default: SNAPSHOT_RETENTION_DAYS)")
+    parser.add_argument("--max-mb", type=float, default=config.SNAPSHOT_MAX_MB,
+                        help="Then delete the oldest snapshots beyond this total size (default: SNAPSHOT_MAX_MB)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+    args = parser.parse_args()
+
+    if args.all:
+        if args.dry_run:
+            print("Dry run: --all would delete frames, violations and the vehicle log.")
+            return
+        print("Clearing output folders...")
+        clear_all()
+        print("Done.")
+        return
+
+    store = SnapshotStore()
+    files = list(store.files())
+    total_mb = sum(size for _, size, _ in files) / (1024 * 1024)
+    print(f"Snapshot store: {len(files)} files, {total_mb:.1f} MB in {store.root}")
+
+    deleted = store.cleanup(max_age_days=args.days, max_mb=args.max_mb, dry_run=args.dry_run)
+    freed_mb = total_mb - sum(size for _, size, _ in store.files()) / (1024 * 1024)
+
+    if args.dry_run:
+        print(f"Dry run: would delete {len(deleted)} files")
+        for path in deleted[:20]:
+            print(f"  {path}")
+        return
+
+    # The vehicle log is left alone (the engine may be writing it): the dashboard skips
+    # snapshots that no longer exist
+    print(f"Deleted {len(deleted)} files ({freed_mb:.1f} MB freed).")
+
+
+if __name__ == "__main__":
+    main()
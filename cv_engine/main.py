@@ -1,21 +1,124 @@
 import os
 import cv2
 import sys
+import time
+import numpy as np
 
 sys.path.append(os.getcwd())
 
 from cv_engine import config
 from cv_engine.modules.detector import Detector
+from cv_engine.modules.profiler import profiler
+from cv_engine.modules.stream_reader import LiveStreamReader
+from cv_engine.modules.frame_source import FrameSource, resize_into
+
+# How long a live read waits before handing control back to the display loop
+LIVE_POLL_SECONDS = 0.1
+
+def read_file_frames(source):
+    """
+    Yields (frame, capture_time) from a finite video file; timing comes from frame numbers.
+    Frames arrive already at PROCESS_RES, in FrameSource's reused ring buffers.
+    """
+    while source.isOpened():
+        with profiler.stage("decode"):
+            ret, frame = source.read()
+        if not ret:
+            print("End of video reached.")
+            return
+        yield frame, None
+
+def read_file_batches(source, batch_size):
+    """
+    Yields lists of up to batch_size frames (offline batched mode). The ring must hold a
+    whole batch, see main().
+    """
+    while source.isOpened():
+        batch = []
+        with profiler.stage("decode"):
+            while len(batch) < batch_size:
+                ret, frame = source.read()
+                if not ret:
+                    break
+                batch.append(frame)
+        if batch:
+            yield batch
+        if len(batch) < batch_size:
+            print("End of video reached.")
+            return
+
+def process_frames(detector, frames):
+    """
+    Yields annotated frames, one model call per frame (None while a live source stalls).
+    """
+    frame_count = 0
+    for frame, capture_time in frames:
+        if frame is None:
+            yield None
+            continue
+        # Process Frame (Detection + Speed + Drawing)
+        # We pass frame_count so speed estimator can calculate time delta
+        # (live sources also pass the capture time, since frames may be dropped)
+        with profiler.stage("frame_total"):
+            processed_frame = detector.process_frame(frame, frame_count, capture_time)
+
+        if capture_time is not None:
+            profiler.gauge("capture_latency_ms", round((time.monotonic() - capture_time) * 1000, 1))
+        frame_count += 1
+        yield processed_frame
+
+def process_batches(detector, batches):
+    """
+    Yields annotated frames, detecting a whole batch per model call (offline files).
+    """
+    frame_count = 0
+    for batch in batches:
+        yield from detector.process_batch(batch, frame_count)
+        frame_count += len(batch)
+
+def read_live_frames(reader):
+    """
+    Yields the newest (frame, capture_time) from a live source; never ends on its own.
+    While no frame arrives, yields (None, None) every LIVE_POLL_SECONDS so the display
+    loop keeps handling the window (and 'q').
+    """
+    width, height = config.PROCESS_RES
+    resize_buffer = np.empty((height, width, 3), dtype=np.uint8)
+    last_frame_at = time.monotonic()
+    last_report_at = last_frame_at
+    while True:
+        with profiler.stage("wait_frame"):
+            ret, frame, capture_time = reader.read(timeout=LIVE_POLL_SECONDS)
+        if not ret:
+            now = time.monotonic()
+            if now - last_report_at >= config.STREAM_READ_TIMEOUT:
+                print(f"No frame from {reader.source} for {now - last_frame_at:.0f}s, still waiting...")
+                last_report_at = now
+            yield None, None
+            continue
+        last_frame_at = last_report_at = time.monotonic()
+        with profiler.stage("resize"):
+            frame = resize_into(frame, config.PROCESS_RES, dst=resize_buffer)
+        yield frame, capture_time
 
 def main():
-    if not os.path.exists(config.VIDEO_PATH):
-        print(f"ERROR: Video not found at {config.VIDEO_PATH}")
-        return
+    start_time = time.perf_counter()
 
-    cap = cv2.VideoCapture(config.VIDEO_PATH)
+    live = config.LIVE_SOURCE is not None
+    batched = not live and config.BATCH_SIZE > 1
+    if live:
+        reader = LiveStreamReader(config.LIVE_SOURCE).start()
+        frames = read_live_frames(reader)
+    else:
+        if not os.path.exists(config.VIDEO_PATH):
+            print(f"ERROR: Video not found at {config.VIDEO_PATH}")
+            return
+        # A batch is held in the frame ring until it has been processed
+        ring_size = max(config.FRAME_RING_SIZE, config.BATCH_SIZE) if batched else None
+        source = FrameSource(config.VIDEO_PATH, ring_size=ring_size)
+        frames = read_file_batches(source, config.BATCH_SIZE) if batched else read_file_frames(source)
     
     width, height = config.PROCESS_RES
-    fps = cap.get(cv2.CAP_PROP_FPS)
     
     output_path = config.OUTPUT_PATH
     fourcc = cv2.VideoWriter_fourcc(*'mp4v') 
@@ -27,35 +130,53 @@ def main():
     # 3. Initialize Detector
     detector = Detector()
 
+    if config.METRICS_PORT:
+        profiler.serve(config.METRICS_PORT)
+
     frame_count = 0
+    processed_frames = process_batches(detector, frames) if batched else process_frames(detector, frames)
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            print("End of video reached.")
-            break
+    try:
+        for processed_frame in processed_frames:
+            if processed_frame is None:
+                # Live source stalled: keep the window responsive
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                continue
 
-        frame = cv2.resize(frame, config.PROCESS_RES)
-        
-        # Process Frame (Detection + Speed + Drawing)
-        # We pass frame_count so speed estimator can calculate time delta
-        processed_frame = detector.process_frame(frame, frame_count)
-        
-        # Show the output window
-        cv2.imshow("CampusGuard AI - Monitor", processed_frame)
-        out.write(processed_frame)
+            # Show the output window
+            with profiler.stage("display"):
+                cv2.imshow("CampusGuard AI - Monitor", processed_frame)
+            with profiler.stage("encode"):
+                out.write(processed_frame)
         
-        frame_count += 1
+            if frame_count == 0:
+                time_to_first_frame = time.perf_counter() - start_time
+                profiler.gauge("time_to_first_frame_seconds", round(time_to_first_frame, 3))
+                print(f"Time to first frame: {time_to_first_frame:.2f}s")
 
-        # Press 'q' to quit
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            break
+            frame_count += 1
+            profiler.tick()
 
-    # 7. Cleanup
-    cap.release()
-    out.release()
-    cv2.destroyAllWindows()
+            # Press 'q' to quit
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    except KeyboardInterrupt:
+        print("Interrupted, logging active tracks...")
+    finally:
+        # 7. Cleanup (also after Ctrl-C or an error, so tracks still pending are logged)
+        try:
+            processed_frames.close()
+            detector.close()
+        finally:
+            if live:
+                reader.stop()
+            else:
+                source.release()
+            out.release()
+            cv2.destroyAllWindows()
+            profiler.close()
     print("--- PROCESS COMPLETED ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
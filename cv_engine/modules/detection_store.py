@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import numpy as np
+from cv_engine import config
+
+# Column name -> (dtype, values per row)
+COLUMNS = {
+    "boxes": (np.float32, 4),   # x1, y1, x2, y2
+    "cls": (np.int16, 1),
+    "ids": (np.int32, 1),
+    "conf": (np.float32, 1),
+}
+# Per-frame index: (frame_num, first_row, row_count)
+INDEX_DTYPE = np.int64
+# Per-frame capture time (time.monotonic() of live sources, NaN for files), since version 2
+TIMES_DTYPE = np.float64
+FORMAT_VERSION = 2
+READABLE_VERSIONS = (1, 2)
+
+
+class DetectionRecorder:
+    """
+    Appends per-frame tracker outputs to flat column files (one file per column),
+    so a run can be re-analysed later without re-running YOLO. meta.json is checkpointed
+    every `meta_interval` frames, so a killed run can still be replayed up to its last frame.
+    """
+    def __init__(self, directory, fps, resolution, names, plates=None, meta_interval=None):
+        """
+        plates: live { track_id: plate_text } dict, saved with every checkpoint.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.plates = plates
+        self.meta_interval = config.RECORD_META_INTERVAL if meta_interval is None else meta_interval
+        self.meta = {
+            "version": FORMAT_VERSION,
+            "fps": fps,
+            "resolution": list(resolution),
+            "names": {int(k): v for k, v in dict(names).items()},
+            "started_at": time.time(),
+            "started_at_monotonic": time.monotonic(),   # Maps capture times to wall-clock time
+            "frames": 0,
+            "rows": 0,
+            "plates": {},
+        }
+        self._index = open(os.path.join(directory, "index.bin"), 'wb')
+        self._times = open(os.path.join(directory, "times.bin"), 'wb')
+        self._columns = {
+            name: open(os.path.join(directory, f"{name}.bin"), 'wb') for name in COLUMNS
+        }
+        self.checkpoint()
+
+    def write(self, frame_num, detections, capture_time=None):
+        """
+        detections: (boxes, class_ids, track_ids, confidences) or None for an empty frame.
+        capture_time: capture timestamp of live frames (see LiveStreamReader), so replays time
+        speeds like the live run did; frame numbers of live runs skip dropped frames.
+        """
+        count = 0 if detections is None else len(detections[2])
+        np.array([frame_num, self.meta["rows"], count], dtype=INDEX_DTYPE).tofile(self._index)
+        np.array([np.nan if capture_time is None else capture_time], dtype=TIMES_DTYPE).tofile(self._times)
+
+        if count:
+            for name, values in zip(COLUMNS, detections):
+                dtype, _ = COLUMNS[name]
+                np.ascontiguousarray(values, dtype=dtype).tofile(self._columns[name])
+
+        self.meta["frames"] += 1
+        self.meta["rows"] += count
+        if self.meta_interval and self.meta["frames"] % self.meta_interval == 0:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """
+        Flushes the data files and atomically rewrites meta.json.
+        Columns are flushed before the index, so the index never points past written rows.
+        """
+        for f in self._columns.values():
+            f.flush()
+        self._times.flush()
+        self._index.flush()
+        self._write_meta()
+
+    def _write_meta(self):
+        if self.plates:
+            self.meta["plates"] = {str(int(k)): v for k, v in self.plates.items()}
+        meta_path = os.path.join(self.directory, "meta.json")
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f, indent=4)
+        os.replace(tmp_path, meta_path)
+
+    def close(self, plates=None):
+        """
+        plates: { track_id: plate_text } read during the run, kept so replays don't need OCR
+        (default: the dict given to __init__).
+        """
+        if self._index.closed:
+            return
+        self._index.close()
+        self._times.close()
+        for f in self._columns.values():
+            f.close()
+
+        if plates is not None:
+            self.plates = plates
+        self._write_meta()
+        print(f"Detections recorded: {self.meta['frames']} frames, {self.meta['rows']} rows -> {self.directory}")
+
+
+class DetectionStore:
+    """
+    Read-only, memory-mapped view over a recording made by DetectionRecorder.
+    """
+    def __init__(self, directory):
+        meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No detection recording found at {directory}")
+
+        with open(meta_path, 'r') as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") not in READABLE_VERSIONS:
+            raise ValueError(f"Unsupported recording version: {self.meta.get('version')}")
+
+        self.directory = directory
+        self.fps = self.meta["fps"]
+        self.names = {int(k): v for k, v in self.meta["names"].items()}
+        self.plates = {int(k): v for k, v in self.meta.get("plates", {}).items()}
+        self.started_at = self.meta["started_at"]
+        self.started_at_monotonic = self.meta.get("started_at_monotonic")
+
+        frames, rows = self._recorded_extent()
+        if frames < self.meta["frames"]:
+            raise ValueError(f"Recording at {directory} is truncated ({frames} of {self.meta['frames']} frames)")
+        if frames > self.meta["frames"]:
+            # Run ended without close() (crash / kill): replay everything written to disk
+            print(f"Recording was not closed: replaying {frames} frames (last checkpoint: {self.meta['frames']})")
+
+        self.index = self._map("index", INDEX_DTYPE, (frames, 3))
+        self.capture_times = self._map("times", TIMES_DTYPE, (frames,)) if self.meta["version"] >= 2 else None
+        self.columns = {
+            name: self._map(name, dtype, (rows, width) if width > 1 else (rows,))
+            for name, (dtype, width) in COLUMNS.items()
+        }
+
+    def _rows_on_disk(self, name, dtype, width):
+        path = os.path.join(self.directory, f"{name}.bin")
+        return os.path.getsize(path) // (np.dtype(dtype).itemsize * width) if os.path.exists(path) else 0
+
+    def _recorded_extent(self):
+        """
+        (frames, rows) fully written to the data files: the index may be ahead of the columns
+        (or end mid-entry) if the recording process was killed.
+        """
+        frames = self._rows_on_disk("index", INDEX_DTYPE, 3)
+        if self.meta["version"] >= 2:
+            frames = min(frames, self._rows_on_disk("times", TIMES_DTYPE, 1))
+        if frames == 0:
+            return 0, 0
+        index = np.fromfile(os.path.join(self.directory, "index.bin"), dtype=INDEX_DTYPE, count=frames * 3)
+        ends = index.reshape(frames, 3)[:, 1:].sum(axis=1)
+        rows = min(self._rows_on_disk(name, dtype, width) for name, (dtype, width) in COLUMNS.items())
+        # Frames are written in order, so complete frames are a prefix of the index
+        frames = int(np.searchsorted(ends, rows, side='right'))
+        return frames, int(ends[frames - 1]) if frames else 0
+
+    def _map(self, name, dtype, shape):
+        path = os.path.join(self.directory, f"{name}.bin")
+        if shape[0] == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+    def __len__(self):
+        return len(self.index)
+
+    def frames(self, skip_empty=True):
+        """
+        Yields (frame_num, capture_time, detections) with detections as zero-copy views into the
+        mapped columns. capture_time is None for file sources (and recordings made before it was stored).
+        """
+        boxes = self.columns["boxes"]
+        cls = self.columns["cls"]
+        ids = self.columns["ids"]
+        conf = self.columns["conf"]
+        times = self.capture_times.tolist() if self.capture_times is not None else [None] * len(self.index)
+
+        for (frame_num, start, count), capture_time in zip(self.index.tolist(), times):
+            if capture_time is not None and np.isnan(capture_time):
+                capture_time = None
+            if count == 0:
+                if not skip_empty:
+                    yield frame_num, capture_time, None
+                continue
+            end = start + count
+            yield frame_num, capture_time, (boxes[start:end], cls[start:end], ids[start:end], conf[start:end])
+
+    def wall_time(self, frame_num, capture_time=None):
+        """
+        Wall-clock time (epoch seconds) of a recorded frame: from its capture time when the
+        run recorded one, else from its frame number at the recorded fps.
+        """
+        if capture_time is not None and self.started_at_monotonic is not None:
+            return self.started_at + (capture_time - self.started_at_monotonic)
+        return self.started_at + frame_num / self.fps
+
+
+class RecordedPlateReader:
+    """
+    Stands in for PlateReader during replays: plates come from the recording, never from OCR.
+    """
+    def read_plate(self, frame):
+        return "Unreadable"
+
+    def request_plate(self, track_id, frame):
+        return "Unreadable"
+
+    def poll_results(self):
+        return []
+
+
+class ReplayModel:
+    """
+    Carries the recorded class names for Detector during replays; there is no model to run.
+    """
+    def __init__(self, names):
+        self.names = names
+
+    def track(self, frame, **kwargs):
+        raise RuntimeError("Replays have no model; feed recorded detections to Detector.analyze()")
@@ -1,27 +1,76 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from datetime import datetime
 from cv_engine import config
 from cv_engine.modules.speed_estimator import SpeedEstimator
+from cv_engine.modules.ground_plane import GroundPlaneSpeedEstimator
+from cv_engine.modules.keyframe import KeyframeSelector
 from cv_engine.modules.vehicle_logger import VehicleLogger
 from cv_engine.modules.plate_reader import PlateReader
+from cv_engine.modules.profiler import profiler
+from cv_engine.modules.detection_store import DetectionRecorder
+from cv_engine.modules.inference_backend import load_model
+from cv_engine.modules.tracker import create_tracker, update_tracker
 
 class Detector:
-    def __init__(self):
-        print(f"Loading YOLO model from {config.MODEL_PATH}...")
-        self.model = YOLO(config.MODEL_PATH)
+    def __init__(self, model=None, plate_reader=None, logger=None, record=True):
+        """
+        model / plate_reader / logger can be injected (e.g. stub backends for benchmarks);
+        by default the real YOLO tracker, plate reader and JSON logger are created.
+        record=False disables config.RECORD_DETECTIONS_DIR (e.g. while replaying a recording).
+        """
+        # Plate/OCR models load in the background (see PlateReader) while YOLO loads here
+        self.plate_reader = plate_reader if plate_reader is not None else PlateReader()
+
+        if model is None:
+            model = load_model(config.MODEL_PATH)
+        self.model = model
+        
+        # Tracker state for process_batch() (process_frame() uses the one inside model.track)
+        self.batch_tracker = None
         
         self.speed_estimator = SpeedEstimator()
-        self.logger = VehicleLogger()
-        self.plate_reader = PlateReader()
+        self.ground_plane = None
+        if config.SPEED_MODE == "homography":
+            self.ground_plane = GroundPlaneSpeedEstimator()
+        elif config.SPEED_MODE != "lines":
+            raise ValueError(f"Unknown SPEED_MODE '{config.SPEED_MODE}' (expected 'lines' or 'homography')")
+        self.logger = logger if logger is not None else VehicleLogger()
         self.vehicle_plate_cache = {}  
 
         self.vehicle_max_passengers = {}
+
+        # Vehicles are logged when their track ends, with the best evidence crop seen
+        self.keyframes = KeyframeSelector()
+        # Stores { track_id: last_frame_seen } for active vehicle tracks
+        self.track_last_seen = {}
+        # Stores { track_id: {...} } latest loggable state of tracks with a known speed
+        self.pending_logs = {}
+
+        # Optional per-frame tracker output recording (see modules/detection_store.py)
+        self.recorder = None
+        if record and config.RECORD_DETECTIONS_DIR:
+            self.recorder = DetectionRecorder(
+                config.RECORD_DETECTIONS_DIR, config.TARGET_FPS, config.PROCESS_RES, self.model.names,
+                plates=self.vehicle_plate_cache
+            )
         
         # Colors
         self.COLOR_LINE = (255, 0, 0)
         self.COLOR_BOX = (0, 255, 0)
         self.SPEED_TRAP = (0, 0, 255)
+
+        # Zone polygons/labels for drawing (all zones, computed once; none in homography mode)
+        zones = self.speed_estimator.zones if self.ground_plane is None else []
+        self._zones_drawn = zones
+        self._zone_polygons = [np.array(z.polygon, dtype=np.int32) for z in zones]
+        self._zone_labels = [
+            ("LINE A", "LINE B") if len(zones) == 1 else (f"{z.name} A", f"{z.name} B") for z in zones
+        ]
+
+        # Reused drawing buffers (allocated on the first frame / resolution change)
+        self._canvas = None
+        self._overlay = None
         
     def _get_passengers(self, bike_box, all_persons):
         passenger_count = 0
@@ -34,122 +83,335 @@ class Detector:
                 passenger_count += 1
         return passenger_count
         
-    def process_frame(self, frame, frame_num):
-        raw_frame = frame.copy()    # Needed for OCR
-        
-        results = self.model.track(frame, persist=True, verbose=False, conf=config.CONF_THRESHOLD)
+    def process_frame(self, frame, frame_num, capture_time=None):
+        """
+        capture_time: capture timestamp in seconds for live sources (see LiveStreamReader).
+        The input frame is never modified. The returned frame is an internal buffer that
+        is overwritten by the next call, so display/encode it before processing another.
+        """
+        with profiler.stage("track"):
+            results = self.model.track(
+                frame, persist=True, verbose=False, conf=config.CONF_THRESHOLD, imgsz=config.INFERENCE_IMGSZ,
+                tracker=config.TRACKER_CONFIG
+            )
+        return self._process_detections(frame, frame_num, self._unpack(results), capture_time)
+
+    def process_batch(self, frames, first_frame_num):
+        """
+        Offline mode: detects a whole batch of frames in one model call, then updates the
+        tracker frame by frame, so tracks/speeds/logs are the same as with process_frame().
+        Yields the annotated frame for each input frame; like process_frame()'s return value
+        it is overwritten by the next one. Use either this or process_frame() on a Detector.
+        """
+        if self.batch_tracker is None:
+            self.batch_tracker = create_tracker(config.TRACKER_CONFIG)
+
+        with profiler.stage("detect_batch"):
+            results = self.model.predict(
+                list(frames), verbose=False, conf=config.CONF_THRESHOLD, imgsz=config.INFERENCE_IMGSZ
+            )
+
+        for i, (frame, result) in enumerate(zip(frames, results)):
+            with profiler.stage("track"):
+                detections = update_tracker(self.batch_tracker, result, frame)
+            yield self._process_detections(frame, first_frame_num + i, detections)
+
+    def _process_detections(self, frame, frame_num, detections, capture_time=None):
+        """
+        Everything after tracking: speed, passengers, OCR, logging and drawing.
+        """
+        raw_frame = frame    # Kept clean for OCR/snapshots: all drawing goes to self._canvas
+        profiler.incr("frames")
+
+        if self.recorder is not None:
+            self.recorder.write(frame_num, detections, capture_time)
+
+        self._apply_plate_results()
         
         # --- STATIC VISUALS ---
-        overlay = frame.copy()
-        speed_zone = [config.LINE_A[0], config.LINE_A[1], config.LINE_B[1], config.LINE_B[0]]
-        cv2.fillPoly(overlay, [np.array(speed_zone, dtype=np.int32)], color=self.SPEED_TRAP)
-        frame = cv2.addWeighted(overlay, 0.25, frame, 0.75, 0)
-        
-        cv2.line(frame, config.LINE_A[0], config.LINE_A[1], self.COLOR_LINE, 1)
-        cv2.line(frame, config.LINE_B[0], config.LINE_B[1], self.COLOR_LINE, 1)
-        cv2.putText(frame, "LINE A", config.LINE_A[0], cv2.FONT_HERSHEY_SIMPLEX, 0.5, self.COLOR_LINE, 2)
-        cv2.putText(frame, "LINE B", config.LINE_B[0], cv2.FONT_HERSHEY_SIMPLEX, 0.5, self.COLOR_LINE, 2)
+        with profiler.stage("draw"):
+            if self._canvas is None or self._canvas.shape != frame.shape:
+                self._canvas = np.empty_like(frame)
+                self._overlay = np.empty_like(frame)
 
-        if results[0].boxes.id is not None:
-            boxes = results[0].boxes.xyxy.cpu().numpy()
-            class_ids = results[0].boxes.cls.cpu().numpy().astype(int)
-            track_ids = results[0].boxes.id.cpu().numpy().astype(int)
+            if self._zone_polygons:
+                overlay = self._overlay
+                np.copyto(overlay, frame)
+                cv2.fillPoly(overlay, self._zone_polygons, color=self.SPEED_TRAP)
+                frame = cv2.addWeighted(overlay, 0.25, raw_frame, 0.75, 0, dst=self._canvas)
+            else:
+                np.copyto(self._canvas, raw_frame)
+                frame = self._canvas
+            
+            for zone, (label_a, label_b) in zip(self._zones_drawn, self._zone_labels):
+                cv2.line(frame, zone.line_a[0], zone.line_a[1], self.COLOR_LINE, 1)
+                cv2.line(frame, zone.line_b[0], zone.line_b[1], self.COLOR_LINE, 1)
+                cv2.putText(frame, label_a, zone.line_a[0], cv2.FONT_HERSHEY_SIMPLEX, 0.5, self.COLOR_LINE, 2)
+                cv2.putText(frame, label_b, zone.line_b[0], cv2.FONT_HERSHEY_SIMPLEX, 0.5, self.COLOR_LINE, 2)
 
-            person_boxes = [boxes[i] for i, cls in enumerate(class_ids) if cls == config.PERSON_CLASS]
+        if detections is None:
+            self.finalize_tracks(frame_num)
+        else:
+            # Drawing happens per vehicle, interleaved with analysis (OCR sees earlier boxes, as before)
+            for vehicle in self.analyze(detections, frame_num, frame=frame, raw_frame=raw_frame,
+                                        capture_time=capture_time):
+                with profiler.stage("draw"):
+                    self._draw_vehicle(frame, vehicle)
 
-            for i, (box, cls_id, track_id) in enumerate(zip(boxes, class_ids, track_ids)):
-                if cls_id not in config.VEHICLE_CLASSES:
-                    continue
+        return frame
 
-                x1, y1, x2, y2 = map(int, box)
-                cx = int((x1 + x2) / 2)
-                tracking_point = (cx, y2)
-                
-                # --- SPEED ---
-                raw_speed = self.speed_estimator.estimate_speed(
-                    vehicle_id=track_id, 
-                    track_point=tracking_point, 
-                    current_frame_num=frame_num, 
-                    fps=config.TARGET_FPS
+    def _apply_plate_results(self):
+        """
+        Applies plates read from frames queued while the OCR models were warming up.
+        """
+        for track_id, plate in self.plate_reader.poll_results():
+            if track_id in self.vehicle_plate_cache:
+                continue
+            pending = self.pending_logs.get(track_id)
+            if pending is None:
+                # Track already logged as "Pending OCR": fill in the answer, even "Unreadable"
+                self.vehicle_plate_cache[track_id] = plate
+                self.logger.update_plate(track_id, plate)
+            elif plate != "Unreadable":
+                self.vehicle_plate_cache[track_id] = plate
+            elif pending["plate"] == "Pending OCR":
+                # Still active: OCR is retried on its next frames, like any unreadable plate
+                pending["plate"] = plate
+
+    def _unpack(self, results):
+        """
+        Converts tracker results to (boxes, class_ids, track_ids, confidences), or None if nothing is tracked.
+        """
+        if results[0].boxes.id is None:
+            return None
+        boxes = results[0].boxes.xyxy.cpu().numpy()
+        class_ids = results[0].boxes.cls.cpu().numpy().astype(int)
+        track_ids = results[0].boxes.id.cpu().numpy().astype(int)
+        confs = results[0].boxes.conf.cpu().numpy()
+        return boxes, class_ids, track_ids, confs
+
+    def analyze(self, detections, frame_num, frame=None, raw_frame=None, timestamp=None, capture_time=None):
+        """
+        Speed, passenger, OCR and logging logic for one frame of tracker output.
+        Yields one dict per vehicle. Without a frame (replays), OCR and snapshots are skipped.
+        timestamp: datetime written to the log (default: now); capture_time: see process_frame.
+        """
+        self.finalize_tracks(frame_num)
+
+        boxes, class_ids, track_ids, _ = detections
+        class_ids = np.asarray(class_ids).astype(int)
+        track_ids = np.asarray(track_ids).astype(int)
+        profiler.incr("tracks", len(track_ids))
+        profiler.gauge("active_tracks", len(track_ids))
+
+        person_boxes = [boxes[i] for i, cls in enumerate(class_ids) if cls == config.PERSON_CLASS]
+
+        # Homography mode: project and fit every vehicle track of this frame in one go
+        ground_speeds = {}
+        if self.ground_plane is not None:
+            with profiler.stage("ground_plane"):
+                is_vehicle = np.isin(class_ids, config.VEHICLE_CLASSES)
+                int_boxes = np.asarray(boxes)[is_vehicle].astype(int)
+                points = np.stack([(int_boxes[:, 0] + int_boxes[:, 2]) // 2, int_boxes[:, 3]], axis=1)
+                ground_speeds = self.ground_plane.update(
+                    track_ids[is_vehicle], points, frame_num, config.TARGET_FPS, capture_time
                 )
+
+        for i, (box, cls_id, track_id) in enumerate(zip(boxes, class_ids, track_ids)):
+            if cls_id not in config.VEHICLE_CLASSES:
+                continue
+
+            x1, y1, x2, y2 = map(int, box)
+            cx = int((x1 + x2) / 2)
+            tracking_point = (cx, y2)
+            self.track_last_seen[track_id] = frame_num
+            
+            # --- SPEED ---
+            if self.ground_plane is not None:
+                # Metric ground-plane speed: no per-class correction needed
+                speed = ground_speeds.get(track_id)
+            else:
+                with profiler.stage("crossing"):
+                    raw_speed = self.speed_estimator.estimate_speed(
+                        vehicle_id=track_id, 
+                        track_point=tracking_point, 
+                        current_frame_num=frame_num, 
+                        fps=config.TARGET_FPS,
+                        capture_time=capture_time
+                    )
                 
                 speed = None
                 if raw_speed is not None:
                     factor = config.SPEED_CORRECTION.get(cls_id, 1.0) 
                     speed = int(raw_speed * factor)
 
-                # --- PASSENGERS ---
-                is_two_wheeler = (cls_id == 1 or cls_id == 3)
-                final_pax_count = 0
-                box_color = self.COLOR_BOX
-
-                if is_two_wheeler:
-                    current_pax = self._get_passengers(box, person_boxes)
-                    prev_max = self.vehicle_max_passengers.get(track_id, 0)
-                    final_pax_count = max(prev_max, current_pax)
-                    self.vehicle_max_passengers[track_id] = final_pax_count
-
-                # --- LOGGING ---
-                violation_list = []
-                if speed and speed > config.SPEED_LIMIT:
-                    violation_list.append("Speeding")
-                if is_two_wheeler and final_pax_count > 2:
-                    violation_list.append("Triple Riding")
-
-                if speed is not None:
-                    log_pax = final_pax_count if is_two_wheeler else "N/A"
-                    
-                    # --- OCR LOGIC ---
-                    detected_plate = "Unreadable"
-                    
-                    # Running OCR if the vehicle is big enough (width > 80px)
-                    # (saves speed and prevents false positives on tiny distant cars)
-                    box_w = x2 - x1
-                    if track_id not in self.vehicle_plate_cache:
-                        if box_w > 80:
-                            plate = self.plate_reader.read_plate(frame)
-                            if plate != "Unreadable":
-                                self.vehicle_plate_cache[track_id] = plate
-                                detected_plate = plate
-                    else:
-                        detected_plate = self.vehicle_plate_cache[track_id]
-
-
-                    # Log the vehicle (Bike or Car - we read plates for both now!)
-                    self.logger.log_vehicle(
-                        frame=raw_frame,
-                        box=box,
-                        track_id=track_id,
-                        class_name=self.model.names[cls_id],
-                        speed=speed,
-                        pax_count=log_pax,
-                        violations=violation_list,
-                        is_two_wheeler=is_two_wheeler,
-                        plate_text=detected_plate
-                    )
+            # --- PASSENGERS ---
+            is_two_wheeler = (cls_id == 1 or cls_id == 3)
+            final_pax_count = 0
+            current_pax = 0
 
-                # --- VISUALIZATION ---
-                violation_text = ""
-                if len(violation_list) > 0:
-                    box_color = (0, 0, 255)
-                    violation_text = " + ".join(violation_list).upper()
-                    if "SPEEDING" in violation_text: violation_text = "SPEEDING!" 
+            if is_two_wheeler:
+                current_pax = self._get_passengers(box, person_boxes)
+                prev_max = self.vehicle_max_passengers.get(track_id, 0)
+                final_pax_count = max(prev_max, current_pax)
+                self.vehicle_max_passengers[track_id] = final_pax_count
 
-                cv2.rectangle(frame, (x1, y1), (x2, y2), box_color, 2)
+            # --- LOGGING ---
+            violation_list = []
+            if speed and speed > self.speed_estimator.speed_limit_for(track_id):
+                violation_list.append("Speeding")
+            if is_two_wheeler and final_pax_count > 2:
+                violation_list.append("Triple Riding")
 
-                class_name = self.model.names[cls_id].upper()[:4] 
-                label_parts = [f"{class_name}-{track_id}"]
-                if speed: label_parts.append(f"{speed}km/h")
-                if is_two_wheeler and final_pax_count > 0: label_parts.append(f"Pax:{final_pax_count}")
+            if speed is not None:
+                # --- OCR LOGIC ---
+                detected_plate = "Unreadable"
                 
-                label = " | ".join(label_parts)
-                (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-                cv2.rectangle(frame, (x1, y1 - 20), (x1 + w, y1), box_color, -1)
-                cv2.putText(frame, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 2)
+                # Running OCR if the vehicle is big enough (width > 80px)
+                # (saves speed and prevents false positives on tiny distant cars)
+                box_w = x2 - x1
+                if track_id not in self.vehicle_plate_cache:
+                    if box_w > 80 and frame is not None:
+                        profiler.incr("ocr_calls")
+                        plate = self.plate_reader.request_plate(track_id, frame)
+                        if plate == "Pending OCR":
+                            detected_plate = plate
+                        elif plate != "Unreadable":
+                            self.vehicle_plate_cache[track_id] = plate
+                            detected_plate = plate
+                else:
+                    profiler.incr("plate_cache_hits")
+                    detected_plate = self.vehicle_plate_cache[track_id]
 
-                if violation_text:
-                    cv2.putText(frame, violation_text, (x1, y1 - 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-                
-                cv2.circle(frame, tracking_point, 4, (0, 255, 255), -1)
+                # Logged when the track ends (finalize_tracks), with the latest speed/plate
+                pending = self.pending_logs.get(track_id)
+                if pending is None:
+                    pending = self.pending_logs[track_id] = {"timestamp": timestamp or datetime.now()}
+                pending.update(
+                    box=box, cls_id=cls_id, speed=speed, is_two_wheeler=is_two_wheeler,
+                    plate=detected_plate, zone=self._zone_name(track_id),
+                    speed_limit=self.speed_estimator.speed_limit_for(track_id),
+                )
+                if self.ground_plane is not None:
+                    # A new speed every frame: log the track's median rather than its last reading
+                    pending.setdefault("speeds", []).append(speed)
+
+            # --- EVIDENCE ---
+            # Only tracks that will be logged keep crops (a speed is needed to log a track)
+            if raw_frame is not None and track_id in self.pending_logs:
+                with profiler.stage("keyframe"):
+                    self.keyframes.offer(track_id, raw_frame, box, is_two_wheeler, current_pax, frame_num)
+
+            yield {
+                "box": (x1, y1, x2, y2),
+                "cls_id": cls_id,
+                "track_id": track_id,
+                "tracking_point": tracking_point,
+                "speed": speed,
+                "is_two_wheeler": is_two_wheeler,
+                "pax_count": final_pax_count,
+                "violations": violation_list,
+            }
+
+    def finalize_tracks(self, frame_num=None):
+        """
+        Logs and forgets tracks not seen for TRACK_FINALIZE_FRAMES frames
+        (all active tracks when frame_num is None, e.g. at shutdown).
+        """
+        if frame_num is None:
+            finished = list(self.track_last_seen)
+        else:
+            cutoff = frame_num - config.TRACK_FINALIZE_FRAMES
+            finished = [tid for tid, last in self.track_last_seen.items() if last < cutoff]
+
+        for track_id in finished:
+            self._finalize(track_id)
+
+    def _finalize(self, track_id):
+        del self.track_last_seen[track_id]
+        evidence = self.keyframes.pop(track_id)
+        final_pax_count = self.vehicle_max_passengers.pop(track_id, 0)
+        self.speed_estimator.forget(track_id)
+        pending = self.pending_logs.pop(track_id, None)
+        if pending is None:
+            # Speed never measured: not logged (as before)
+            return
+
+        # Violations over the whole track (passengers may peak after the speed was measured)
+        is_two_wheeler = pending["is_two_wheeler"]
+        speed = pending["speed"]
+        if "speeds" in pending:
+            speed = int(round(float(np.median(pending["speeds"]))))
+        violation_list = []
+        if speed and speed > pending["speed_limit"]:
+            violation_list.append("Speeding")
+        if is_two_wheeler and final_pax_count > 2:
+            violation_list.append("Triple Riding")
+
+        # Log the vehicle (Bike or Car - we read plates for both now!)
+        with profiler.stage("logging"):
+            self.logger.log_vehicle(
+                frame=None,
+                box=pending["box"],
+                track_id=track_id,
+                class_name=self.model.names[pending["cls_id"]],
+                speed=speed,
+                pax_count=final_pax_count if is_two_wheeler else "N/A",
+                violations=violation_list,
+                is_two_wheeler=is_two_wheeler,
+                plate_text=self.vehicle_plate_cache.get(track_id, pending["plate"]),
+                timestamp=pending["timestamp"],
+                zone=pending["zone"],
+                snapshot=evidence
+            )
+
+    def _zone_name(self, track_id):
+        if self.ground_plane is not None:
+            return "ground_plane"
+        return self.speed_estimator.vehicle_zones[track_id].name
+
+    def _draw_vehicle(self, frame, vehicle):
+        x1, y1, x2, y2 = vehicle["box"]
+        speed = vehicle["speed"]
+        violation_list = vehicle["violations"]
+        final_pax_count = vehicle["pax_count"]
+
+        # --- VISUALIZATION ---
+        box_color = self.COLOR_BOX
+        violation_text = ""
+        if len(violation_list) > 0:
+            box_color = (0, 0, 255)
+            violation_text = " + ".join(violation_list).upper()
+            if "SPEEDING" in violation_text: violation_text = "SPEEDING!" 
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), box_color, 2)
+
+        class_name = self.model.names[vehicle["cls_id"]].upper()[:4] 
+        label_parts = [f"{class_name}-{vehicle['track_id']}"]
+        if speed: label_parts.append(f"{speed}km/h")
+        if vehicle["is_two_wheeler"] and final_pax_count > 0: label_parts.append(f"Pax:{final_pax_count}")
+        
+        label = " | ".join(label_parts)
+        (w, h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        cv2.rectangle(frame, (x1, y1 - 20), (x1 + w, y1), box_color, -1)
+        cv2.putText(frame, label, (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 2)
+
+        if violation_text:
+            cv2.putText(frame, violation_text, (x1, y1 - 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+        
+        cv2.circle(frame, vehicle["tracking_point"], 4, (0, 255, 255), -1)
 
-        return frame
\ No newline at end of file
+    def close(self):
+        """
+        Logs all still-active tracks, flushes the logger and finalises an active detection recording.
+        """
+        self.finalize_tracks()
+        try:
+            self._apply_plate_results()
+        except RuntimeError as e:
+            # Load failure (already printed by the loader): still flush what was logged
+            print(f"Plate reader: {e}")
+        self.logger.flush()
+        if self.recorder is not None:
+            self.recorder.close(plates=self.vehicle_plate_cache)
+            self.recorder = None
@@ -0,0 +1,85 @@
+import cv2
+import numpy as np
+from cv_engine import config
+
+
+def resize_into(frame, size, dst=None):
+    """
+    Resizes `frame` to `size` (width, height), writing into `dst` when it fits.
+    Returns `frame` untouched if it already has the requested size.
+    """
+    width, height = size
+    if frame.shape[1] == width and frame.shape[0] == height:
+        return frame
+    if dst is None or dst.shape[:2] != (height, width) or dst.dtype != frame.dtype:
+        return cv2.resize(frame, size)
+    return cv2.resize(frame, size, dst=dst)
+
+
+class FrameSource:
+    """
+    Decodes a video into a ring of preallocated buffers at PROCESS_RES.
+
+    read() returns a view of the next ring slot; it stays valid for `ring_size - 1`
+    further reads, which gives downstream stages (OCR queue, evidence crops) slack
+    without a per-frame copy. When the source already matches the target size,
+    frames are decoded straight into the ring and resize is skipped.
+    """
+    def __init__(self, source, size=None, ring_size=None, hw_accel=None):
+        self.source = source
+        self.size = tuple(size or config.PROCESS_RES)
+        self.ring_size = ring_size or config.FRAME_RING_SIZE
+        hw_accel = config.DECODE_HW_ACCEL if hw_accel is None else hw_accel
+
+        params = []
+        if hw_accel and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            params = [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        self.cap = cv2.VideoCapture(source, cv2.CAP_ANY, params) if params else cv2.VideoCapture(source)
+
+        width, height = self.size
+        # Cameras can deliver the processing resolution directly (files ignore this)
+        if not isinstance(source, str):
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+
+        self.source_size = (
+            int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+        self.needs_resize = self.source_size != self.size
+
+        self._ring = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.ring_size)]
+        self._decode_buffer = None
+        if self.needs_resize and self.source_size[0] > 0:
+            src_w, src_h = self.source_size
+            self._decode_buffer = np.empty((src_h, src_w, 3), dtype=np.uint8)
+        self._index = 0
+
+    @property
+    def fps(self):
+        return self.cap.get(cv2.CAP_PROP_FPS)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        """
+        Returns (ok, frame) like cv2.VideoCapture.read, with frame living in the ring.
+        """
+        slot = self._ring[self._index]
+        self._index = (self._index + 1) % self.ring_size
+
+        if not self.needs_resize:
+            ret, frame = self.cap.read(slot)
+            return ret, frame
+
+        ret, decoded = self.cap.read(self._decode_buffer)
+        if not ret:
+            return False, None
+        # Decoder may hand back a differently sized frame (e.g. mid-stream change)
+        if decoded is not self._decode_buffer:
+            self._decode_buffer = decoded
+        return True, resize_into(decoded, self.size, dst=slot)
+
+    def release(self):
+        self.cap.release()
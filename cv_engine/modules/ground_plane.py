@@ -0,0 +1,285 @@
+import os
+import json
+import cv2
+import numpy as np
+from cv_engine import config
+
+
+def compute_homography(image_points, world_points):
+    """
+    Image (px) -> ground plane (metres) homography from 4+ point pairs.
+    Returns (H, mean reprojection error in metres).
+    """
+    image_points = np.asarray(image_points, dtype=np.float64)
+    world_points = np.asarray(world_points, dtype=np.float64)
+    if len(image_points) < 4 or len(image_points) != len(world_points):
+        raise ValueError("Homography needs at least 4 matching image/world points")
+
+    # Plain least squares over all points (no RANSAC: every point was placed by hand)
+    H, _ = cv2.findHomography(image_points, world_points, 0)
+    if H is None:
+        raise ValueError("Degenerate calibration points (are 3 of them on one line?)")
+
+    projected = cv2.perspectiveTransform(image_points.reshape(-1, 1, 2), H).reshape(-1, 2)
+    error = float(np.linalg.norm(projected - world_points, axis=1).mean())
+    return H, error
+
+
+def save_homography(image_points, world_points, path=None):
+    path = path or config.HOMOGRAPHY_CONFIG_PATH
+    H, error = compute_homography(image_points, world_points)
+    with open(path, 'w') as f:
+        json.dump({
+            "image_points": [list(map(float, p)) for p in image_points],
+            "world_points": [list(map(float, p)) for p in world_points],
+            "matrix": H.tolist(),
+            "reprojection_error_m": round(error, 4),
+        }, f, indent=4)
+    return H, error
+
+
+def load_homography(path=None):
+    """
+    Homography from the calibration file written by get_line_coords.py --homography.
+    """
+    return load_calibration(path)[0]
+
+
+def load_calibration(path=None):
+    """
+    (homography, image points, world points) from the calibration file; the points bound
+    the area where the ground-plane model is known to hold.
+    """
+    path = path or config.HOMOGRAPHY_CONFIG_PATH
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"SPEED_MODE is 'homography' but no calibration at {path}. "
+            "Run: python get_line_coords.py --homography"
+        )
+    with open(path, 'r') as f:
+        data = json.load(f)
+    H, error = compute_homography(data["image_points"], data["world_points"])
+    print(f"Loaded ground-plane homography from {path} ({len(data['image_points'])} points, "
+          f"reprojection error {error:.3f} m)")
+    return H, data["image_points"], data["world_points"]
+
+
+class GroundPlaneSpeedEstimator:
+    """
+    Continuous speed for every track: track points are projected to metres on the
+    road plane and speed is the slope of a least-squares line fit over the last
+    `window` samples of each track, smoothed with an exponential moving average.
+
+    Per-track history lives in preallocated (slots x window) ring buffers, so one
+    update() projects and fits all tracks of a frame with a few array operations.
+
+    Points on/beyond the horizon (w <= 0) or projecting outside the calibrated area (the
+    calibration points' hull on the road plus a margin) get no speed, and their track's
+    history restarts: near the horizon a pixel spans metres, which reads as false speeding.
+    """
+    def __init__(self, homography=None, window=None, min_points=None, smoothing=None,
+                 max_age=None, min_speed=None, capacity=64, image_points=None, world_points=None,
+                 region_margin=None):
+        """
+        image_points / world_points: the calibration point pairs (read from the calibration
+        file when homography is None); without world_points there is no area check.
+        region_margin: metres, see config.GROUND_PLANE_REGION_MARGIN.
+        """
+        if homography is None:
+            homography, image_points, world_points = load_calibration()
+        self.H = np.asarray(homography, dtype=np.float64)
+        if image_points is not None:
+            # A homography is defined up to scale: make w positive on the calibrated side
+            center = np.append(np.asarray(image_points, dtype=np.float64).mean(axis=0), 1.0)
+            if (self.H[2] @ center) < 0:
+                self.H = -self.H
+        self.region_margin = config.GROUND_PLANE_REGION_MARGIN if region_margin is None else region_margin
+        self.region = None
+        if world_points is not None:
+            self.region = cv2.convexHull(np.asarray(world_points, dtype=np.float32).reshape(-1, 1, 2))
+            self._region_normals, self._region_limits = self._half_planes(self.region, self.region_margin)
+        self.window = window or config.GROUND_PLANE_WINDOW
+        self.min_points = min(min_points or config.GROUND_PLANE_MIN_POINTS, self.window)
+        self.smoothing = config.GROUND_PLANE_SMOOTHING if smoothing is None else smoothing
+        self.max_age = config.GROUND_PLANE_MAX_AGE if max_age is None else max_age
+        self.min_speed = config.GROUND_PLANE_MIN_SPEED if min_speed is None else min_speed
+
+        # Stores { vehicle_id: slot } into the ring buffers below
+        self.slots = {}
+        self._free = []
+        self._allocate(capacity)
+
+        # Stores { vehicle_id: speed_kmh } (latest smoothed estimate)
+        self.vehicle_speeds = {}
+
+    @staticmethod
+    def _half_planes(hull, margin):
+        """
+        (K, 2) outward unit normals and (K,) limits of the hull's edges pushed out by margin:
+        a point p is inside the expanded region when normals @ p <= limits for every edge.
+        (Pushing the edges out makes the corners square rather than rounded, a little more
+        lenient than a true distance test right at the corners.)
+        """
+        corners = hull.reshape(-1, 2).astype(np.float64)
+        edges = np.roll(corners, -1, axis=0) - corners
+        normals = np.stack([edges[:, 1], -edges[:, 0]], axis=1)
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+        # Point the normals away from the hull's centre, whichever way the hull winds
+        outward = np.einsum("ij,ij->i", normals, corners - corners.mean(axis=0)) >= 0
+        normals[~outward] *= -1
+        limits = np.einsum("ij,ij->i", normals, corners) + margin
+        return normals, limits
+
+    def _allocate(self, capacity):
+        old = getattr(self, "_times", None)
+        old_capacity = 0 if old is None else len(old)
+
+        times = np.zeros((capacity, self.window))
+        xy = np.zeros((capacity, self.window, 2))
+        count = np.zeros(capacity, dtype=np.int64)
+        head = np.zeros(capacity, dtype=np.int64)
+        last_seen = np.full(capacity, -1, dtype=np.int64)
+        smoothed = np.full(capacity, np.nan)
+        if old is not None:
+            times[:old_capacity] = self._times
+            xy[:old_capacity] = self._xy
+            count[:old_capacity] = self._count
+            head[:old_capacity] = self._head
+            last_seen[:old_capacity] = self._last_seen
+            smoothed[:old_capacity] = self._smoothed
+
+        self._times, self._xy = times, xy
+        self._count, self._head = count, head
+        self._last_seen, self._smoothed = last_seen, smoothed
+        self._free.extend(range(capacity - 1, old_capacity - 1, -1))
+
+    def _slot(self, vehicle_id):
+        slot = self.slots.get(vehicle_id)
+        if slot is None:
+            if not self._free:
+                self._allocate(len(self._times) * 2)
+            slot = self._free.pop()
+            self._count[slot] = 0
+            self._head[slot] = 0
+            self._smoothed[slot] = np.nan
+            self.slots[vehicle_id] = slot
+        return slot
+
+    def project(self, points):
+        """
+        (N, 2) image points -> (N, 2) ground-plane points in metres; NaN rows for points
+        with non-positive w (at/above the horizon) or outside the calibrated area.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if len(points) == 0:
+            return np.empty((0, 2))
+
+        homogeneous = points @ self.H[:, :2].T + self.H[:, 2]
+        w = homogeneous[:, 2]
+        valid = w > 1e-9
+        world = np.full((len(points), 2), np.nan)
+        world[valid] = homogeneous[valid, :2] / w[valid, None]
+
+        if self.region is not None:
+            # Horizon rows are NaN: they compare False and simply stay NaN
+            outside = (world @ self._region_normals.T > self._region_limits).any(axis=1)
+            world[outside] = np.nan
+        return world
+
+    def update(self, vehicle_ids, track_points, current_frame_num, fps, capture_time=None):
+        """
+        Adds this frame's track points (Bottom-Center, like SpeedEstimator) and returns
+        { vehicle_id: speed_kmh or None }. None until a track has min_points samples,
+        while it moves slower than min_speed (e.g. parked), or at points outside the calibrated area.
+        capture_time: see SpeedEstimator.estimate_speed.
+        """
+        now = capture_time if capture_time is not None else current_frame_num / fps
+        self._expire(current_frame_num)
+
+        vehicle_ids = [int(v) for v in vehicle_ids]
+        if not vehicle_ids:
+            return {}
+
+        slots = np.fromiter((self._slot(v) for v in vehicle_ids), dtype=np.int64, count=len(vehicle_ids))
+        world = self.project(track_points)
+
+        # --- OUTSIDE THE CALIBRATED REGION: no speed, history restarts ---
+        valid = ~np.isnan(world[:, 0])
+        if not valid.all():
+            off = slots[~valid]
+            self._count[off] = 0
+            self._head[off] = 0
+            self._smoothed[off] = np.nan
+            self._last_seen[off] = current_frame_num
+            for vehicle_id in np.asarray(vehicle_ids)[~valid].tolist():
+                self.vehicle_speeds.pop(vehicle_id, None)
+            result = {vehicle_id: None for vehicle_id in np.asarray(vehicle_ids)[~valid].tolist()}
+            vehicle_ids = [v for v, ok in zip(vehicle_ids, valid.tolist()) if ok]
+            slots, world = slots[valid], world[valid]
+        else:
+            result = {}
+
+        # --- APPEND TO RING BUFFERS ---
+        head = self._head[slots]
+        self._times[slots, head] = now
+        self._xy[slots, head] = world
+        self._head[slots] = (head + 1) % self.window
+        self._count[slots] = np.minimum(self._count[slots] + 1, self.window)
+        self._last_seen[slots] = current_frame_num
+
+        # --- WINDOWED REGRESSION (all ready tracks at once) ---
+        ready = self._count[slots] >= self.min_points
+        speeds = np.full(len(slots), np.nan)
+        if ready.any():
+            fit_slots = slots[ready]
+            mask = np.arange(self.window) < self._count[fit_slots][:, None]
+            n = mask.sum(axis=1)
+
+            # Times relative to now keep the fit well conditioned
+            t = np.where(mask, self._times[fit_slots] - now, 0.0)
+            t_mean = t.sum(axis=1) / n
+            dt = np.where(mask, t - t_mean[:, None], 0.0)
+            var = (dt * dt).sum(axis=1)
+
+            xy = self._xy[fit_slots]
+            xy_mean = (xy * mask[..., None]).sum(axis=1) / n[:, None]
+            cov = (dt[..., None] * (xy - xy_mean[:, None, :])).sum(axis=1)
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                velocity = cov / var[:, None]            # m/s along X and Y
+            raw_kmh = np.hypot(velocity[:, 0], velocity[:, 1]) * 3.6
+
+            prev = self._smoothed[fit_slots]
+            alpha = self.smoothing
+            smoothed = np.where(np.isnan(prev), raw_kmh, alpha * raw_kmh + (1 - alpha) * prev)
+            # Duplicate timestamps (var == 0) give no new information: keep the previous value
+            smoothed = np.where(var > 0, smoothed, prev)
+            self._smoothed[fit_slots] = smoothed
+            speeds[ready] = smoothed
+
+        for vehicle_id, speed in zip(vehicle_ids, speeds.tolist()):
+            if speed != speed or speed < self.min_speed:   # NaN or (nearly) stationary
+                result[vehicle_id] = None
+            else:
+                result[vehicle_id] = int(round(speed))
+                self.vehicle_speeds[vehicle_id] = result[vehicle_id]
+        return result
+
+    def _expire(self, current_frame_num):
+        """
+        Frees the slots of tracks not seen for max_age frames.
+        """
+        if not self.slots:
+            return
+        stale = np.nonzero(
+            (self._last_seen >= 0) & (self._last_seen < current_frame_num - self.max_age)
+        )[0]
+        if len(stale) == 0:
+            return
+        stale = set(stale.tolist())
+        for vehicle_id, slot in list(self.slots.items()):
+            if slot in stale:
+                del self.slots[vehicle_id]
+                self.vehicle_speeds.pop(vehicle_id, None)
+                self._last_seen[slot] = -1
+                self._free.append(slot)
@@ -0,0 +1,138 @@
+import os
+import time
+import numpy as np
+from cv_engine import config
+
+# Backend -> ultralytics export format and the artefact it produces next to the .pt file
+BACKENDS = {
+    "pytorch": {"format": None, "suffix": ".pt"},
+    "onnx": {"format": "onnx", "suffix": ".onnx"},
+    "openvino": {"format": "openvino", "suffix": "_openvino_model"},
+}
+
+
+def _check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+
+
+def exported_path(weights_path, backend):
+    """
+    Where ultralytics writes the exported model for `weights_path` (e.g. yolov8n.onnx).
+    """
+    _check_backend(backend)
+    stem, _ = os.path.splitext(weights_path)
+    return stem + BACKENDS[backend]["suffix"]
+
+
+def export_model(weights_path, backend, imgsz=None):
+    """
+    Exports PyTorch weights to the given backend format and returns the exported path.
+    Bare names like "yolov8n.pt" are downloaded by ultralytics first.
+    """
+    _check_backend(backend)
+    if backend == "pytorch":
+        return weights_path
+    if not os.path.exists(weights_path) and os.path.basename(weights_path) != weights_path:
+        raise FileNotFoundError(f"Cannot export {backend} model: weights not found at {weights_path}")
+
+    from ultralytics import YOLO
+
+    imgsz = imgsz or config.INFERENCE_IMGSZ
+    print(f"Exporting {weights_path} to {backend} (imgsz={imgsz})...")
+    return YOLO(weights_path).export(format=BACKENDS[backend]["format"], imgsz=imgsz)
+
+
+def configure_threads(threads):
+    """
+    Caps CPU threads used by inference. 0 / None keeps each library's default.
+    """
+    if not threads:
+        return
+    # OMP_NUM_THREADS is read when torch/cv2 are imported, i.e. before this runs: set it in the
+    # environment when launching instead. Here torch is capped directly, ONNX Runtime per session.
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _apply_onnx_threads(model, path, threads):
+    """
+    ultralytics creates its ONNX Runtime session without SessionOptions; rebuild it
+    with an explicit intra-op thread count. Needs a predictor, i.e. one warm-up call.
+    """
+    autobackend = getattr(getattr(model, "predictor", None), "model", None)
+    # ultralytics >= 8.4 keeps the session on an inner ONNX backend, older releases on AutoBackend
+    backend = getattr(autobackend, "backend", autobackend)
+    session = getattr(backend, "session", None)
+    if session is None:
+        print(f"Warning: no ONNX Runtime session found on {type(backend).__name__}; INFERENCE_THREADS not applied")
+        return
+    if getattr(backend, "use_io_binding", False):
+        # GPU session with IO bindings tied to it: CPU thread count does not apply
+        return
+
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    backend.session = ort.InferenceSession(path, sess_options=options, providers=session.get_providers())
+
+
+def warmup(model, imgsz=None):
+    """
+    One blank-frame inference so the first real frame doesn't pay for lazy
+    predictor setup, kernel selection and memory allocation.
+    """
+    width, height = config.PROCESS_RES
+    model.predict(np.zeros((height, width, 3), dtype=np.uint8), imgsz=imgsz or config.INFERENCE_IMGSZ, verbose=False)
+
+
+def load_model(weights_path, backend=None, imgsz=None, threads=None, task="detect", warm_up=True):
+    """
+    Loads a YOLO model on the configured backend, exporting the .pt weights on first use.
+    The returned object has the usual ultralytics API (track / predict / names).
+    """
+    backend = backend or config.INFERENCE_BACKEND
+    imgsz = imgsz or config.INFERENCE_IMGSZ
+    threads = config.INFERENCE_THREADS if threads is None else threads
+    _check_backend(backend)
+    configure_threads(threads)
+
+    path = weights_path
+    if backend != "pytorch":
+        path = exported_path(weights_path, backend)
+        if not os.path.exists(path):
+            path = export_model(weights_path, backend, imgsz)
+    elif not os.path.exists(path) and os.path.basename(path) != path:
+        # Bare names like "yolov8n.pt" are downloaded by ultralytics; explicit paths must exist
+        raise FileNotFoundError(f"Model weights not found at {path}")
+
+    from ultralytics import YOLO
+
+    print(f"Loading {task} model from {path} ({backend}, imgsz={imgsz}, threads={threads or 'default'})...")
+    model = YOLO(path, task=task)
+
+    if warm_up or (backend == "onnx" and threads):
+        start = time.perf_counter()
+        warmup(model, imgsz)
+        if backend == "onnx" and threads:
+            _apply_onnx_threads(model, path, threads)
+            warmup(model, imgsz)
+        print(f"Warm-up for {os.path.basename(path)} took {time.perf_counter() - start:.2f}s")
+    return model
+
+
+def ocr_use_gpu():
+    """
+    config.OCR_GPU, or CUDA availability when left as None.
+    """
+    if config.OCR_GPU is not None:
+        return config.OCR_GPU
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
@@ -0,0 +1,95 @@
+import heapq
+import cv2
+from cv_engine import config
+from cv_engine.modules.vehicle_logger import crop_evidence
+
+
+class KeyframeSelector:
+    """
+    Picks the evidence image for each track instead of snapshotting whichever
+    frame the vehicle was in when its speed became known.
+
+    Each offered track keeps at most KEYFRAME_CANDIDATES small crops (longest side
+    <= KEYFRAME_MAX_SIDE), scored by box size, sharpness (variance of Laplacian)
+    and the number of passengers visible in that frame. pop() hands back the best
+    one when the track finalizes, so memory per track is small and fixed. The
+    Detector only offers tracks it will log (those with a measured speed).
+    """
+    def __init__(self, candidates=None, max_side=None, interval=None, weights=None):
+        self.candidates = candidates or config.KEYFRAME_CANDIDATES
+        self.max_side = max_side or config.KEYFRAME_MAX_SIDE
+        self.interval = interval or config.KEYFRAME_INTERVAL
+        weights = weights or config.KEYFRAME_WEIGHTS
+        self.w_size = weights["size"]
+        self.w_sharpness = weights["sharpness"]
+        self.w_passengers = weights["passengers"]
+
+        # Stores { track_id: [(score, frame_num, crop), ...] } as a min-heap (worst candidate first)
+        self.buffers = {}
+
+        # Stores { track_id: (last_offered_frame, max_passengers_offered) }
+        self._last_offer = {}
+
+    def offer(self, track_id, frame, box, is_two_wheeler, pax_count, frame_num):
+        """
+        Considers this frame as evidence for `track_id`. Cheap to call every frame:
+        crops are only taken every `interval` frames (or when more passengers are
+        visible than before) and only if they could beat the current candidates.
+        """
+        last = self._last_offer.get(track_id)
+        if last is not None:
+            last_frame, last_pax = last
+            if frame_num - last_frame < self.interval and pax_count <= last_pax:
+                return
+            self._last_offer[track_id] = (frame_num, max(last_pax, pax_count))
+        else:
+            self._last_offer[track_id] = (frame_num, pax_count)
+
+        x1, y1, x2, y2 = map(int, box)
+        box_w = max(0, x2 - x1)
+        size_term = min(1.0, box_w / self.max_side)
+        base_score = self.w_passengers * pax_count + self.w_size * size_term
+
+        buffer = self.buffers.setdefault(track_id, [])
+        full = len(buffer) >= self.candidates
+        # Even a perfectly sharp crop of this frame could not beat the worst candidate
+        if full and base_score + self.w_sharpness <= buffer[0][0]:
+            return
+
+        crop = crop_evidence(frame, box, is_two_wheeler)
+        if crop.size == 0:
+            return
+        crop = self._shrink(crop)
+
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        sharpness = cv2.Laplacian(gray, cv2.CV_64F).var()
+        score = base_score + self.w_sharpness * min(1.0, sharpness / config.KEYFRAME_SHARPNESS_NORM)
+
+        entry = (score, frame_num, crop)
+        if not full:
+            heapq.heappush(buffer, entry)
+        elif score > buffer[0][0]:
+            heapq.heapreplace(buffer, entry)
+
+    def _shrink(self, crop):
+        """
+        Copy of `crop` with its longest side capped at max_side (frames are reused buffers).
+        """
+        h, w = crop.shape[:2]
+        longest = max(h, w)
+        if longest <= self.max_side:
+            return crop.copy()
+        scale = self.max_side / longest
+        return cv2.resize(crop, (max(1, round(w * scale)), max(1, round(h * scale))),
+                          interpolation=cv2.INTER_AREA)
+
+    def pop(self, track_id):
+        """
+        Best evidence crop for a finished track (None if none was offered); frees its buffer.
+        """
+        self._last_offer.pop(track_id, None)
+        buffer = self.buffers.pop(track_id, None)
+        if not buffer:
+            return None
+        # Highest score wins; on ties the later frame (vehicle closer to the camera)
+        return max(buffer, key=lambda entry: (entry[0], entry[1]))[2]
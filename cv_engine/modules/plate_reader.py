@@ -1,40 +1,170 @@
 import cv2
 import re
 import os
-import easyocr
-from ultralytics import YOLO
+import time
+import threading
+import traceback
+import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from cv_engine import config
+from cv_engine.modules.profiler import profiler
+from cv_engine.modules.inference_backend import load_model, exported_path, ocr_use_gpu
 
 class PlateReader:
-    def __init__(self):
-        # Load your CUSTOM trained plate detector
-        model_path = "best.pt"
-
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(
-                f"Plate detector model not found at {model_path}"
-            )
-
-        print(f"Loading Plate Detector from {model_path}...")
-        self.plate_model = YOLO(model_path)
-
-        print("Loading EasyOCR...")
-        self.ocr = easyocr.Reader(
-            ['en'],
-            gpu=True  # you have CUDA + torch, so use GPU
-        )
+    def __init__(self, plate_model=None, ocr=None, background=None):
+        """
+        plate_model / ocr can be injected (e.g. stub backends for benchmarks).
+        background: load + warm up the plate detector and EasyOCR in parallel on a
+        background thread (default config.OCR_BACKGROUND_LOAD) so tracking can start first.
+        Until they are ready, request_plate() queues frames and answers "Pending OCR".
+        """
+        self.plate_model = plate_model
+        self.ocr = ocr
+
+        if plate_model is None:
+            # Fail fast on missing weights, even when loading in the background
+            model_path = config.PLATE_MODEL_PATH
+            if not os.path.exists(model_path) and not os.path.exists(
+                exported_path(model_path, config.INFERENCE_BACKEND)
+            ):
+                raise FileNotFoundError(
+                    f"Plate detector model not found at {model_path}"
+                )
 
         # Indian plate pattern (strict but realistic)
         self.plate_regex = re.compile(
             r'^[A-Z]{2}[0-9]{1,2}[A-Z]{1,3}[0-9]{3,4}$'
         )
 
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._failed = False
+        # Background load error, re-raised on the caller's thread by the next poll_results()
+        self._error = None
+        # Stores { track_id: frame } waiting for the OCR models (latest frame per track)
+        self._pending = OrderedDict()
+        # Stores (track_id, plate_text) answers to queued requests, collected by poll_results()
+        self._results = []
+
+        background = config.OCR_BACKGROUND_LOAD if background is None else background
+        if plate_model is not None and ocr is not None:
+            self._ready.set()
+        elif background:
+            threading.Thread(target=self._load, name="plate-reader-loader", daemon=True).start()
+        else:
+            self._load()
+            self._raise_load_error()
+
+    # --- MODEL LOADING ---
+    def _load_ocr(self):
+        import easyocr
+
+        use_gpu = ocr_use_gpu()
+        print(f"Loading EasyOCR ({'GPU' if use_gpu else 'CPU'})...")
+        ocr = easyocr.Reader(
+            ['en'],
+            gpu=use_gpu
+        )
+        # Warm-up: first readtext() initialises the detector/recogniser kernels
+        ocr.readtext(np.zeros((64, 256, 3), dtype=np.uint8), detail=0)
+        return ocr
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix="plate-reader") as pool:
+                plate_future = pool.submit(load_model, config.PLATE_MODEL_PATH) if self.plate_model is None else None
+                ocr_future = pool.submit(self._load_ocr) if self.ocr is None else None
+                if plate_future is not None:
+                    self.plate_model = plate_future.result()
+                if ocr_future is not None:
+                    self.ocr = ocr_future.result()
+        except Exception as e:
+            print("=" * 70)
+            print(f"ERROR: plate reader models failed to load, plates will not be read: {e!r}")
+            traceback.print_exc()
+            print("=" * 70)
+            with self._lock:
+                self._failed = True
+                self._error = e
+                # Queued tracks get an answer too, so their "Pending OCR" logs are resolved
+                self._results.extend((track_id, "Unreadable") for track_id in self._pending)
+                self._pending.clear()
+                self._ready.set()
+            return
+
+        elapsed = time.perf_counter() - start
+        profiler.gauge("ocr_ready_seconds", round(elapsed, 3))
+        print(f"Plate reader ready in {elapsed:.1f}s ({len(self._pending)} queued requests)")
+
+        # Serve requests queued during start-up; ready is set once the queue is empty,
+        # so the models are never used from two threads at once.
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._ready.set()
+                    break
+                track_id, frame = self._pending.popitem(last=False)
+                profiler.gauge("ocr_queue_depth", len(self._pending))
+            plate = self.read_plate(frame)
+            with self._lock:
+                self._results.append((track_id, plate))
+
+    @property
+    def ready(self):
+        return self._ready.is_set() and not self._failed
+
+    def request_plate(self, track_id, frame):
+        """
+        Reads the plate now if the models are ready; otherwise queues the frame
+        (bounded by config.OCR_PENDING_LIMIT) and returns "Pending OCR".
+        """
+        if not self._ready.is_set():
+            with self._lock:
+                # Re-check under the lock: the loader may have just finished
+                if not self._ready.is_set():
+                    self._pending[track_id] = frame.copy()
+                    self._pending.move_to_end(track_id)
+                    while len(self._pending) > config.OCR_PENDING_LIMIT:
+                        dropped_id, _ = self._pending.popitem(last=False)
+                        self._results.append((dropped_id, "Unreadable"))
+                    profiler.gauge("ocr_queue_depth", len(self._pending))
+                    return "Pending OCR"
+
+        if self._failed:
+            return "Unreadable"
+        return self.read_plate(frame)
+
+    def _raise_load_error(self):
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise RuntimeError("Plate reader models failed to load") from error
+
+    def poll_results(self):
+        """
+        Returns [(track_id, plate_text)] for queued frames since the last call: one per
+        request, "Unreadable" if no plate was read or the request was dropped.
+        Raises RuntimeError (once, after the answers queued until then were returned)
+        if the models failed to load in the background.
+        """
+        if not self._results:
+            if self._error is not None:
+                self._raise_load_error()
+            return []
+        with self._lock:
+            results, self._results = self._results, []
+        return results
+
     def read_plate(self, frame):
         """
         Runs plate detection on FULL FRAME.
         Returns first valid plate text found, else 'Unreadable'.
         """
 
-        results = self.plate_model(frame, conf=0.3, verbose=False)
+        with profiler.stage("plate_detect"):
+            results = self.plate_model(frame, conf=0.3, verbose=False, imgsz=config.INFERENCE_IMGSZ)
 
         if not results or results[0].boxes is None:
             return "Unreadable"
@@ -64,11 +194,12 @@ class PlateReader:
             # cv2.waitKey(1)
 
             # OCR
-            ocr_results = self.ocr.readtext(
-                plate_crop,
-                detail=0,
-                allowlist='ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-            )
+            with profiler.stage("ocr"):
+                ocr_results = self.ocr.readtext(
+                    plate_crop,
+                    detail=0,
+                    allowlist='ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+                )
 
             if not ocr_results:
                 continue
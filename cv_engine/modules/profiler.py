@@ -0,0 +1,234 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from cv_engine import config
+
+
+class _NullStage:
+    """
+    Shared no-op timer handed out when profiling is disabled.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """
+    Per-stage timers (rolling p50/p95/p99), counters and gauges for the CV engine.
+    When disabled every call returns immediately, so instrumentation can stay in the hot path.
+    """
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, enabled=False, window=1000, prefix="campusguard"):
+        self.enabled = enabled
+        self.window = window
+        self.prefix = prefix
+
+        # Stores { stage: deque of recent durations in seconds }
+        self._timings = {}
+        # Stores { stage: [call_count, total_seconds] } over the whole run
+        self._totals = {}
+        self._counters = {}
+        self._gauges = {}
+
+        self._lock = threading.Lock()
+        self._last_dump = time.monotonic()
+        self._server = None
+
+    # --- RECORDING ---
+    def stage(self, name):
+        """
+        Context manager timing one execution of a pipeline stage.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            samples = self._timings.get(name)
+            if samples is None:
+                samples = self._timings[name] = deque(maxlen=self.window)
+                self._totals[name] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+
+    def incr(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self._timings.clear()
+            self._totals.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    # --- REPORTING ---
+    @staticmethod
+    def _quantile(sorted_samples, q):
+        # Nearest-rank percentile: the ceil(q * n)-th sample (round() would go to even on .5)
+        idx = min(len(sorted_samples) - 1, max(0, math.ceil(q * len(sorted_samples) - 1e-9) - 1))
+        return sorted_samples[idx]
+
+    def snapshot(self):
+        """
+        Returns a JSON-serialisable view of all metrics (durations in milliseconds).
+        """
+        with self._lock:
+            timings = {name: sorted(samples) for name, samples in self._timings.items()}
+            totals = {name: tuple(t) for name, t in self._totals.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        stages = {}
+        for name, samples in timings.items():
+            if not samples:
+                continue
+            count, total = totals[name]
+            stages[name] = {
+                "count": count,
+                "mean_ms": total / count * 1000,
+                "p50_ms": self._quantile(samples, 0.5) * 1000,
+                "p95_ms": self._quantile(samples, 0.95) * 1000,
+                "p99_ms": self._quantile(samples, 0.99) * 1000,
+            }
+
+        return {
+            "timestamp": time.time(),
+            "stages": stages,
+            "counters": counters,
+            "gauges": gauges,
+        }
+
+    def to_prometheus(self):
+        """
+        Renders metrics in the Prometheus text exposition format.
+        """
+        snap = self.snapshot()
+        p = self.prefix
+        lines = []
+
+        if snap["stages"]:
+            lines.append(f"# HELP {p}_stage_seconds Rolling latency of CV pipeline stages.")
+            lines.append(f"# TYPE {p}_stage_seconds summary")
+            for name, s in sorted(snap["stages"].items()):
+                for q, key in zip(self.QUANTILES, ("p50_ms", "p95_ms", "p99_ms")):
+                    lines.append(f'{p}_stage_seconds{{stage="{name}",quantile="{q}"}} {s[key] / 1000:.6f}')
+                lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {s["mean_ms"] * s["count"] / 1000:.6f}')
+                lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {s["count"]}')
+
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=4)
+        os.replace(tmp_path, path)
+
+    def tick(self):
+        """
+        Called once per frame; writes the periodic JSON dump when the interval has elapsed.
+        """
+        if not self.enabled or not config.METRICS_DUMP_PATH:
+            return
+        now = time.monotonic()
+        if now - self._last_dump >= config.METRICS_DUMP_INTERVAL:
+            self._last_dump = now
+            try:
+                self.dump_json(config.METRICS_DUMP_PATH)
+            except OSError as e:
+                print(f"Error writing metrics: {e}")
+
+    def serve(self, port, host="0.0.0.0"):
+        """
+        Starts a background HTTP server exposing /metrics (Prometheus) and /metrics.json.
+        """
+        if not self.enabled or self._server is not None:
+            return
+
+        profiler = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics.json"):
+                    body = json.dumps(profiler.snapshot()).encode()
+                    content_type = "application/json"
+                elif self.path.startswith("/metrics"):
+                    body = profiler.to_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        print(f"Metrics available at http://{host}:{port}/metrics")
+
+    def close(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+        if self.enabled and config.METRICS_DUMP_PATH:
+            self.dump_json(config.METRICS_DUMP_PATH)
+
+
+# Shared instance used by every module (like `config`)
+profiler = Profiler(enabled=config.PROFILING_ENABLED, window=config.PROFILING_WINDOW)
@@ -0,0 +1,161 @@
+import os
+import time
+import hashlib
+import cv2
+from cv_engine import config
+from cv_engine.modules.profiler import profiler
+
+IMAGES_DIR = "images"
+THUMBS_DIR = "thumbs"
+# Touched by every cleanup that deletes files: the dashboard re-checks snapshot paths when it changes
+CLEANUP_STAMP = ".last_cleanup"
+
+
+class SnapshotStore:
+    """
+    Content-addressed violation snapshots:
+
+        <root>/images/ab/cd/abcd1234....jpg   full crop
+        <root>/thumbs/ab/cd/abcd1234....jpg   list-view thumbnail (THUMB_WIDTH px wide)
+
+    Files are named by the hash of the encoded JPEG, so identical crops are stored
+    once, and the two-level shards keep every directory small. Paths returned by
+    save() are relative to `root` (what the JSON log stores).
+    """
+    def __init__(self, root=None, quality=None, thumb_width=None):
+        self.root = root or config.OUTPUT_VIOLATIONS_DIR
+        self.quality = quality or config.SNAPSHOT_JPEG_QUALITY
+        self.thumb_width = thumb_width or config.SNAPSHOT_THUMB_WIDTH
+
+    def _relative_path(self, kind, digest):
+        # Always '/'-separated: the same string is used in dashboard URLs
+        return f"{kind}/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+
+    def _write(self, relative_path, data):
+        """
+        Writes `data` unless the file already exists. Returns True if it was written.
+        """
+        path = os.path.join(self.root, relative_path)
+        try:
+            # Refresh mtime so retention counts from the latest use
+            os.utime(path)
+            return False
+        except FileNotFoundError:
+            # Not stored yet, or deleted by a cleanup() since: (re)write it
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return True
+
+    def _encode(self, image):
+        ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+
+    def save(self, image):
+        """
+        Stores a BGR crop. Returns (image_path, thumb_path), both relative to root.
+        """
+        data = self._encode(image)
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+        image_path = self._relative_path(IMAGES_DIR, digest)
+        if not self._write(image_path, data):
+            profiler.incr("snapshots_deduped")
+
+        # Small crops are their own thumbnail
+        h, w = image.shape[:2]
+        if w <= self.thumb_width:
+            return image_path, image_path
+
+        thumb_path = self._relative_path(THUMBS_DIR, digest)
+        if not os.path.exists(os.path.join(self.root, thumb_path)):
+            thumb_size = (self.thumb_width, max(1, round(h * self.thumb_width / w)))
+            thumb = cv2.resize(image, thumb_size, interpolation=cv2.INTER_AREA)
+            self._write(thumb_path, self._encode(thumb))
+        return image_path, thumb_path
+
+    def files(self):
+        """
+        Yields (relative_path, size_bytes, mtime) for every stored file, including legacy
+        flat v_<id>_<time>.jpg snapshots.
+        """
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if dirpath == self.root and name == CLEANUP_STAMP:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield os.path.relpath(path, self.root).replace(os.sep, "/"), stat.st_size, stat.st_mtime
+
+    def cleanup(self, max_age_days=None, max_mb=None, dry_run=False):
+        """
+        Retention policy: deletes files older than max_age_days, then the oldest files
+        until the store fits in max_mb. None disables a limit. Returns the deleted
+        relative paths (a thumbnail goes together with its image).
+        """
+        entries = sorted(self.files(), key=lambda e: e[2])
+        total_bytes = sum(size for _, size, _ in entries)
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        max_bytes = max_mb * 1024 * 1024 if max_mb is not None else None
+
+        deleted = []
+        seen = set()
+        for relative_path, size, mtime in entries:
+            too_old = cutoff is not None and mtime < cutoff
+            too_big = max_bytes is not None and total_bytes > max_bytes
+            if not (too_old or too_big):
+                # Sorted oldest first: nothing later is older, and the size cap is met
+                break
+
+            for path in self._with_companion(relative_path):
+                if path in seen:
+                    continue
+                seen.add(path)
+                full_path = os.path.join(self.root, path)
+                try:
+                    size = os.path.getsize(full_path)
+                    if not dry_run:
+                        os.remove(full_path)
+                except FileNotFoundError:
+                    # No companion, or removed by a concurrent cleanup
+                    continue
+                total_bytes -= size
+                deleted.append(path)
+
+        if not dry_run:
+            self._remove_empty_dirs()
+            if deleted:
+                self._touch_stamp()
+        return deleted
+
+    def _touch_stamp(self):
+        with open(os.path.join(self.root, CLEANUP_STAMP), 'w') as f:
+            f.write(f"{time.time()}\n")
+
+    def _with_companion(self, relative_path):
+        """
+        [image, thumbnail] for a stored image or thumbnail; [path] for anything else.
+        """
+        parts = relative_path.split("/")
+        if len(parts) == 4 and parts[0] == IMAGES_DIR:
+            return [relative_path, "/".join([THUMBS_DIR] + parts[1:])]
+        if len(parts) == 4 and parts[0] == THUMBS_DIR:
+            return [relative_path, "/".join([IMAGES_DIR] + parts[1:])]
+        return [relative_path]
+
+    def _remove_empty_dirs(self):
+        # Bottom-up, so shards emptied here also free their parent directory
+        for dirpath, _, _ in os.walk(self.root, topdown=False):
+            if dirpath != self.root and not os.listdir(dirpath):
+                try:
+                    os.rmdir(dirpath)
+                except OSError:
+                    pass
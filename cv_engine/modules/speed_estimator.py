@@ -1,22 +1,29 @@
-import time
 from cv_engine import config
+from cv_engine.modules.speed_zones import load_zones, ZoneIndex
 
 class SpeedEstimator:
-    def __init__(self):
-        # Stores { vehicle_id: start_frame_number }
+    def __init__(self, zones=None):
+        """
+        zones: list of SpeedZone (default: load_zones(), i.e. the calibration file or config.SPEED_ZONES).
+        """
+        self.zones = zones if zones is not None else load_zones()
+        self.zone_index = ZoneIndex(self.zones)
+
+        # Per-zone timing state is keyed by (zone_index, vehicle_id)
+        # Stores { key: start_frame_number }
         self.entry_times = {}
+
+        # Stores { key: capture_time_seconds } for live sources that drop frames
+        self.entry_clock = {}
         
-        # Stores { vehicle_id: 'A' or 'B' } to know which line they crossed first
+        # Stores { key: 'A' or 'B' } to know which line they crossed first
         self.entry_lines = {}
         
-        # Stores { vehicle_id: calculated_speed_kmh }
+        # Stores { vehicle_id: calculated_speed_kmh } (latest measurement, any zone)
         self.vehicle_speeds = {}
-        
-        # Cache line coordinates
-        self.line_a_start = config.LINE_A[0]
-        self.line_a_end = config.LINE_A[1]
-        self.line_b_start = config.LINE_B[0]
-        self.line_b_end = config.LINE_B[1]
+
+        # Stores { vehicle_id: SpeedZone } where that speed was measured
+        self.vehicle_zones = {}
 
         # Keep track of previous positions { vehicle_id: (x, y) }
         self.previous_positions = {}
@@ -41,9 +48,11 @@ class SpeedEstimator:
         # We use strict inequality for one to handle exact 0 edge cases
         return (curr_o > 0 and prev_o <= 0) or (curr_o < 0 and prev_o >= 0)
 
-    def estimate_speed(self, vehicle_id, track_point, current_frame_num, fps):
+    def estimate_speed(self, vehicle_id, track_point, current_frame_num, fps, capture_time=None):
         """
         track_point: Should be Bottom-Center (cx, y2) for accuracy
+        capture_time: Frame capture time in seconds (live sources). When given, elapsed
+                      time comes from capture times instead of frame_num / fps.
         """
         if vehicle_id not in self.previous_positions:
             self.previous_positions[vehicle_id] = track_point
@@ -52,42 +61,81 @@ class SpeedEstimator:
         prev_point = self.previous_positions[vehicle_id]
         current_speed = self.vehicle_speeds.get(vehicle_id, None)
 
-        # 1. Check Crossing Line A
-        if self._has_crossed(track_point, prev_point, self.line_a_start, self.line_a_end):
-            if vehicle_id not in self.entry_times:
-                # ENTRY EVENT at A
-                self.entry_times[vehicle_id] = current_frame_num
-                self.entry_lines[vehicle_id] = 'A'
-            elif self.entry_lines.get(vehicle_id) == 'B':
-                # EXIT EVENT at A (Entered at B)
-                current_speed = self._calculate(vehicle_id, current_frame_num, fps)
-
-        # 2. Check Crossing Line B
-        elif self._has_crossed(track_point, prev_point, self.line_b_start, self.line_b_end):
-            if vehicle_id not in self.entry_times:
-                # ENTRY EVENT at B
-                self.entry_times[vehicle_id] = current_frame_num
-                self.entry_lines[vehicle_id] = 'B'
-            elif self.entry_lines.get(vehicle_id) == 'A':
-                # EXIT EVENT at B (Entered at A)
-                current_speed = self._calculate(vehicle_id, current_frame_num, fps)
+        # Only zones near this step are tested (spatial prefilter)
+        for zone_idx in self.zone_index.candidates(prev_point, track_point):
+            zone = self.zones[zone_idx]
+            key = (zone_idx, vehicle_id)
+
+            # 1. Check Crossing Line A
+            if self._has_crossed(track_point, prev_point, zone.line_a[0], zone.line_a[1]):
+                if key not in self.entry_times:
+                    # ENTRY EVENT at A
+                    if zone.accepts_entry('A'):
+                        self._enter(key, 'A', current_frame_num, capture_time)
+                elif self.entry_lines.get(key) == 'B':
+                    # EXIT EVENT at A (Entered at B)
+                    current_speed = self._calculate(key, zone, current_frame_num, fps, capture_time)
+
+            # 2. Check Crossing Line B
+            elif self._has_crossed(track_point, prev_point, zone.line_b[0], zone.line_b[1]):
+                if key not in self.entry_times:
+                    # ENTRY EVENT at B
+                    if zone.accepts_entry('B'):
+                        self._enter(key, 'B', current_frame_num, capture_time)
+                elif self.entry_lines.get(key) == 'A':
+                    # EXIT EVENT at B (Entered at A)
+                    current_speed = self._calculate(key, zone, current_frame_num, fps, capture_time)
 
         # Update position
         self.previous_positions[vehicle_id] = track_point
         return current_speed
 
-    def _calculate(self, vehicle_id, current_frame, fps):
-        start_frame = self.entry_times[vehicle_id]
-        frames_passed = abs(current_frame - start_frame)
+    def _enter(self, key, line, current_frame_num, capture_time):
+        self.entry_times[key] = current_frame_num
+        self.entry_lines[key] = line
+        if capture_time is not None:
+            self.entry_clock[key] = capture_time
+
+    def _calculate(self, key, zone, current_frame, fps, capture_time=None):
+        start_clock = self.entry_clock.get(key)
+        if capture_time is not None and start_clock is not None:
+            # Wall-clock timing: correct even when frames were dropped in between
+            time_seconds = abs(capture_time - start_clock)
+            frames_passed = time_seconds * fps
+        else:
+            start_frame = self.entry_times[key]
+            frames_passed = abs(current_frame - start_frame)
+            time_seconds = frames_passed / fps
         
         # Filter: Ignore impossibly fast teleportation (e.g. < 3 frames)
         if frames_passed > 3:
-            time_seconds = frames_passed / fps
-            speed_mps = config.REAL_DISTANCE_METERS / time_seconds
+            speed_mps = zone.distance_m / time_seconds
             speed_kmh = speed_mps * 3.6
             
             # Speeds appear as: 20, 25, 30, 35 km/h
+            vehicle_id = key[1]
             self.vehicle_speeds[vehicle_id] = int(round(speed_kmh / 5) * 5)
+            self.vehicle_zones[vehicle_id] = zone
             
             return int(round(speed_kmh / 5) * 5)
-        return None
\ No newline at end of file
+        return None
+
+    def forget(self, vehicle_id):
+        """
+        Drops all state of a finished track.
+        """
+        self.previous_positions.pop(vehicle_id, None)
+        self.vehicle_speeds.pop(vehicle_id, None)
+        self.vehicle_zones.pop(vehicle_id, None)
+        for zone_idx in range(len(self.zones)):
+            key = (zone_idx, vehicle_id)
+            self.entry_times.pop(key, None)
+            self.entry_clock.pop(key, None)
+            self.entry_lines.pop(key, None)
+
+    def speed_limit_for(self, vehicle_id):
+        """
+        Limit of the zone where the vehicle's speed was measured (global SPEED_LIMIT otherwise).
+        """
+        zone = self.vehicle_zones.get(vehicle_id)
+        return zone.speed_limit if zone is not None else config.SPEED_LIMIT
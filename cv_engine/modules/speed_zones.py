@@ -0,0 +1,165 @@
+import os
+import json
+from cv_engine import config
+
+DIRECTIONS = ("both", "A->B", "B->A")
+
+
+class SpeedZone:
+    """
+    One calibrated speed trap: two lines a known distance apart on the road.
+    distance_m / speed_limit of None fall back to REAL_DISTANCE_METERS / SPEED_LIMIT.
+    extend_lines: count crossings anywhere along the lines extended to the frame edges
+    (the single-zone LINE_A/LINE_B behaviour); otherwise only near the drawn segments,
+    so neighbouring zones do not pick up each other's traffic.
+    """
+    def __init__(self, name, line_a, line_b, distance_m=None, direction="both", speed_limit=None,
+                 extend_lines=False):
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Zone '{name}': direction must be one of {DIRECTIONS}, got '{direction}'")
+        self.name = name
+        self.line_a = tuple(tuple(map(int, p)) for p in line_a)
+        self.line_b = tuple(tuple(map(int, p)) for p in line_b)
+        self._distance_m = distance_m
+        self.direction = direction
+        self._speed_limit = speed_limit
+        self.extend_lines = extend_lines
+
+        # Bounding box of both lines, used by the spatial index
+        xs = [p[0] for p in self.line_a + self.line_b]
+        ys = [p[1] for p in self.line_a + self.line_b]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+
+    @property
+    def distance_m(self):
+        return config.REAL_DISTANCE_METERS if self._distance_m is None else self._distance_m
+
+    @property
+    def speed_limit(self):
+        return config.SPEED_LIMIT if self._speed_limit is None else self._speed_limit
+
+    @property
+    def polygon(self):
+        return [self.line_a[0], self.line_a[1], self.line_b[1], self.line_b[0]]
+
+    def accepts_entry(self, line):
+        """
+        Whether a vehicle may start timing at `line` ('A' or 'B') given the zone direction.
+        """
+        return self.direction == "both" or self.direction[0] == line
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            name=data["name"],
+            line_a=data["line_a"],
+            line_b=data["line_b"],
+            distance_m=data.get("distance_m"),
+            direction=data.get("direction", "both"),
+            speed_limit=data.get("speed_limit"),
+            extend_lines=data.get("extend_lines", False),
+        )
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "line_a": [list(p) for p in self.line_a],
+            "line_b": [list(p) for p in self.line_b],
+            "distance_m": self._distance_m,
+            "direction": self.direction,
+            "speed_limit": self._speed_limit,
+            "extend_lines": self.extend_lines,
+        }
+
+
+def load_zones(path=None):
+    """
+    Zones from the calibration file (get_line_coords.py --zones) if present,
+    otherwise config.SPEED_ZONES.
+    """
+    path = path or config.ZONES_CONFIG_PATH
+    if path and os.path.exists(path):
+        with open(path, 'r') as f:
+            zones = [SpeedZone.from_dict(z) for z in json.load(f)["zones"]]
+        print(f"Loaded {len(zones)} speed zone(s) from {path}")
+    else:
+        zones = [SpeedZone.from_dict(z) for z in config.SPEED_ZONES]
+
+    names = [z.name for z in zones]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Speed zone names must be unique: {names}")
+    return zones
+
+
+def save_zones(zones, path=None):
+    path = path or config.ZONES_CONFIG_PATH
+    with open(path, 'w') as f:
+        json.dump({"zones": [z.to_dict() for z in zones]}, f, indent=4)
+
+
+def _frame_extent(line, width, height):
+    """
+    Where the line through `line`'s two points meets the frame edges (plus the points themselves).
+    """
+    (x1, y1), (x2, y2) = line
+    dx, dy = x2 - x1, y2 - y1
+    points = [(x1, y1), (x2, y2)]
+    if dx:
+        for x in (0, width - 1):
+            y = y1 + (x - x1) * dy / dx
+            if 0 <= y <= height - 1:
+                points.append((x, y))
+    if dy:
+        for y in (0, height - 1):
+            x = x1 + (y - y1) * dx / dy
+            if 0 <= x <= width - 1:
+                points.append((x, y))
+    return points
+
+
+class ZoneIndex:
+    """
+    Uniform grid over the image: each cell lists the zones whose (padded) bounding
+    box overlaps it, so a track step only tests the zones it is near. Zones with
+    extend_lines cover their lines' full extent inside the frame.
+    """
+    def __init__(self, zones, cell_size=None, margin=None, frame_size=None):
+        self.zones = zones
+        self.cell_size = cell_size or config.ZONE_GRID_CELL
+        margin = config.ZONE_MARGIN if margin is None else margin
+        width, height = frame_size or config.PROCESS_RES
+
+        # Stores { (cell_x, cell_y): (zone_index, ...) }
+        self.cells = {}
+        for idx, zone in enumerate(zones):
+            x1, y1, x2, y2 = zone.bbox
+            if zone.extend_lines:
+                points = _frame_extent(zone.line_a, width, height) + _frame_extent(zone.line_b, width, height)
+                x1, y1 = min(p[0] for p in points), min(p[1] for p in points)
+                x2, y2 = max(p[0] for p in points), max(p[1] for p in points)
+            for cell in self._cells_for(x1 - margin, y1 - margin, x2 + margin, y2 + margin):
+                self.cells.setdefault(cell, []).append(idx)
+        self.cells = {cell: tuple(ids) for cell, ids in self.cells.items()}
+
+    def _cells_for(self, x1, y1, x2, y2):
+        size = self.cell_size
+        for cx in range(int(x1) // size, int(x2) // size + 1):
+            for cy in range(int(y1) // size, int(y2) // size + 1):
+                yield cx, cy
+
+    def candidates(self, p1, p2):
+        """
+        Indices of zones near the movement segment p1 -> p2.
+        """
+        x1, x2 = (p1[0], p2[0]) if p1[0] <= p2[0] else (p2[0], p1[0])
+        y1, y2 = (p1[1], p2[1]) if p1[1] <= p2[1] else (p2[1], p1[1])
+        size = self.cell_size
+
+        # Fast path: both ends in the same cell (the common case at video frame rates)
+        if x1 // size == x2 // size and y1 // size == y2 // size:
+            return self.cells.get((int(x1) // size, int(y1) // size), ())
+
+        found = set()
+        for cell in self._cells_for(x1, y1, x2, y2):
+            found.update(self.cells.get(cell, ()))
+        return sorted(found)
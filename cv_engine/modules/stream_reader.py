@@ -0,0 +1,137 @@
+import os
+import cv2
+import time
+import threading
+from cv_engine import config
+from cv_engine.modules.profiler import profiler
+
+
+class LiveStreamReader:
+    """
+    Reads a live source (RTSP/HTTP URL, camera index, or a local file standing in
+    for one) on its own thread and always hands out the newest frame.
+
+    Frames the processor is too slow for are dropped rather than queued, so
+    latency stays bounded. Each frame carries its capture time (time.monotonic())
+    so speed timing does not depend on frames being contiguous.
+    """
+    def __init__(self, source, pace=None, reconnect_min=None, reconnect_max=None):
+        self.source = source
+        # A file is "live" only if we replay it at its own frame rate (and loop it)
+        self.is_file = isinstance(source, str) and os.path.exists(source)
+        self.pace = self.is_file if pace is None else pace
+        self.reconnect_min = reconnect_min or config.STREAM_RECONNECT_MIN
+        self.reconnect_max = reconnect_max or config.STREAM_RECONNECT_MAX
+
+        self.fps = None
+        self.reconnects = 0
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._capture_time = None
+        self._seq = 0           # Frames captured so far
+        self._last_read = 0     # Sequence number of the last frame handed out
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- CAPTURE THREAD ---
+    def _open(self):
+        params = []
+        if hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+            timeout_ms = int(config.STREAM_READ_TIMEOUT * 1000)
+            params = [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms, cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms]
+        cap = cv2.VideoCapture(self.source, cv2.CAP_ANY, params) if params else cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            cap.release()
+            return None
+
+        # Keep the driver-side buffer minimal (honoured by some backends only)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else config.TARGET_FPS
+        return cap
+
+    def _run(self):
+        backoff = self.reconnect_min
+        # Announce the first connect and recoveries, not every loop of a file source
+        announce = True
+        while not self._stop.is_set():
+            cap = self._open()
+            if cap is None:
+                print(f"Stream unavailable ({self.source}); retrying in {backoff:.1f}s")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, self.reconnect_max)
+                continue
+
+            if announce:
+                print(f"Stream connected: {self.source} @ {self.fps:.1f} FPS")
+                announce = False
+            backoff = self.reconnect_min
+            frame_interval = 1.0 / self.fps
+            next_due = time.monotonic()
+
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                capture_time = time.monotonic()
+                if not ret:
+                    break
+
+                with self._cond:
+                    self._frame = frame
+                    self._capture_time = capture_time
+                    self._seq += 1
+                    self._cond.notify_all()
+
+                if self.pace:
+                    next_due += frame_interval
+                    delay = next_due - time.monotonic()
+                    if delay > 0:
+                        self._stop.wait(delay)
+                    else:
+                        next_due = time.monotonic()
+
+            cap.release()
+            if not self._stop.is_set():
+                self.reconnects += 1
+                profiler.incr("stream_reconnects")
+                if not self.is_file:
+                    announce = True
+                    print(f"Stream lost ({self.source}); reconnecting in {backoff:.1f}s")
+                    self._stop.wait(backoff)
+                    backoff = min(backoff * 2, self.reconnect_max)
+
+    # --- CONSUMER API ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="stream-reader", daemon=True)
+            self._thread.start()
+        return self
+
+    def read(self, timeout=None):
+        """
+        Waits for a frame newer than the last one returned.
+        Returns (ok, frame, capture_time); ok is False on timeout or after stop().
+        """
+        timeout = config.STREAM_READ_TIMEOUT if timeout is None else timeout
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._last_read or self._stop.is_set(), timeout):
+                return False, None, None
+            if self._stop.is_set():
+                return False, None, None
+
+            dropped = self._seq - self._last_read - 1
+            self._last_read = self._seq
+            frame, capture_time = self._frame, self._capture_time
+
+        if dropped > 0:
+            profiler.incr("frames_dropped", dropped)
+        return True, frame, capture_time
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
@@ -0,0 +1,169 @@
+import time
+import numpy as np
+from cv_engine import config
+
+# COCO names for the classes the pipeline cares about
+COCO_NAMES = {0: "person", 1: "bicycle", 2: "car", 3: "motorcycle"}
+
+
+class _Tensor:
+    """
+    Minimal stand-in for a torch tensor: supports .cpu().numpy().
+    """
+    def __init__(self, array):
+        self._array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._array
+
+    def __getitem__(self, idx):
+        return self._array[idx]
+
+
+class StubBoxes:
+    """
+    Mimics `ultralytics.engine.results.Boxes` (xyxy / cls / id / conf).
+    """
+    def __init__(self, xyxy, cls, ids=None, conf=None):
+        self.xyxy = _Tensor(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+        self.cls = _Tensor(np.asarray(cls, dtype=np.float32))
+        self.id = None if ids is None or len(ids) == 0 else _Tensor(np.asarray(ids, dtype=np.float32))
+        if conf is None:
+            conf = np.ones(len(cls), dtype=np.float32)
+        self.conf = _Tensor(np.asarray(conf, dtype=np.float32))
+
+    def __len__(self):
+        return len(self.cls.numpy())
+
+    def __iter__(self):
+        # Iterating real Boxes yields one single-row Boxes per detection
+        xyxy = self.xyxy.numpy()
+        cls = self.cls.numpy()
+        conf = self.conf.numpy()
+        for i in range(len(cls)):
+            yield StubBoxes(xyxy[i:i + 1], cls[i:i + 1], None, conf[i:i + 1])
+
+
+class StubResult:
+    def __init__(self, boxes, names):
+        self.boxes = boxes
+        self.names = names
+
+
+class StubTracker:
+    """
+    Replays a detection stream in place of `YOLO.track`.
+    Each stream item is (boxes, class_ids, track_ids, confidences) for one frame, or None.
+    """
+    def __init__(self, stream, names=None, latency=0.0):
+        self._stream = iter(stream)
+        self.names = names or COCO_NAMES
+        self.latency = latency
+
+    def track(self, frame, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        detections = next(self._stream, None)
+        if detections is None:
+            return [StubResult(StubBoxes(np.empty((0, 4)), np.empty(0)), self.names)]
+        boxes, class_ids, track_ids, confs = detections
+        return [StubResult(StubBoxes(boxes, class_ids, track_ids, confs), self.names)]
+
+
+class StubPlateModel:
+    """
+    Stand-in for the plate detector: reports one plate-sized box near the frame bottom.
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.names = {0: "plate"}
+
+    def __call__(self, frame, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        h, w = frame.shape[:2]
+        box = [[w * 0.45, h * 0.8, w * 0.55, h * 0.85]]
+        return [StubResult(StubBoxes(box, [0]), self.names)]
+
+
+class StubOCR:
+    """
+    Stand-in for `easyocr.Reader`: returns a valid plate for a fraction of calls.
+    """
+    def __init__(self, latency=0.0, hit_rate=0.5, seed=0):
+        self.latency = latency
+        self.hit_rate = hit_rate
+        self._rng = np.random.default_rng(seed)
+
+    def readtext(self, image, detail=0, allowlist=None):
+        if self.latency:
+            time.sleep(self.latency)
+        if self._rng.random() < self.hit_rate:
+            return [f"GJ05AB{self._rng.integers(1000, 9999)}"]
+        return []
+
+
+def synthetic_stream(num_frames, spawn_rate=0.05, seed=0, frame_size=None):
+    """
+    Generates a deterministic detection stream of vehicles driving through the
+    LINE_A / LINE_B speed trap, with riders attached to two-wheelers.
+
+    Yields (boxes, class_ids, track_ids, confidences) per frame.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = frame_size or config.PROCESS_RES
+
+    # Travel from above LINE_A (far end) to below LINE_B (near end)
+    (ax1, ay1), (ax2, ay2) = config.LINE_A
+    (bx1, by1), (bx2, by2) = config.LINE_B
+    start = np.array([(ax1 + ax2) / 2 + 60, min(ay1, ay2) - 60], dtype=np.float32)
+    end = np.array([(bx1 + bx2) / 2 - 60, max(by1, by2) + 80], dtype=np.float32)
+
+    sizes = {1: (40, 70), 2: (140, 90), 3: (55, 75)}
+    next_id = 1
+    active = []  # [track_id, cls, progress, step, n_riders, rider_ids]
+
+    for _ in range(num_frames):
+        if rng.random() < spawn_rate:
+            cls = int(rng.choice([1, 2, 3], p=[0.1, 0.5, 0.4]))
+            frames_to_cross = int(rng.integers(20, 90))
+            riders = int(rng.choice([1, 2, 3], p=[0.5, 0.35, 0.15])) if cls in (1, 3) else 0
+            rider_ids = list(range(next_id + 1, next_id + 1 + riders))
+            active.append([next_id, cls, 0.0, 1.0 / frames_to_cross, riders, rider_ids])
+            next_id += 1 + riders
+
+        boxes, class_ids, track_ids = [], [], []
+        survivors = []
+        for vehicle in active:
+            track_id, cls, progress, step, riders, rider_ids = vehicle
+            if progress > 1.0:
+                continue
+            survivors.append(vehicle)
+
+            bw, bh = sizes[cls]
+            cx, bottom = start + (end - start) * progress
+            x1, y1, x2, y2 = cx - bw / 2, bottom - bh, cx + bw / 2, bottom
+            boxes.append((x1, y1, x2, y2))
+            class_ids.append(cls)
+            track_ids.append(track_id)
+
+            # Riders: person boxes whose centres fall inside the bike box
+            for r, rider_id in enumerate(rider_ids):
+                px = x1 + bw * (r + 1) / (riders + 1)
+                boxes.append((px - 12, y1 - 30, px + 12, y1 + bh * 0.6))
+                class_ids.append(config.PERSON_CLASS)
+                track_ids.append(rider_id)
+
+            vehicle[2] = progress + step
+        active = survivors
+
+        if not track_ids:
+            yield None
+            continue
+
+        boxes = np.clip(np.asarray(boxes, dtype=np.float32), 0, [width - 1, height - 1, width - 1, height - 1])
+        confs = rng.uniform(0.4, 0.95, size=len(track_ids)).astype(np.float32)
+        yield boxes, np.asarray(class_ids, dtype=np.int32), np.asarray(track_ids, dtype=np.int32), confs
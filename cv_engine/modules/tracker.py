@@ -0,0 +1,39 @@
+from cv_engine import config
+
+
+def create_tracker(tracker_config=None):
+    """
+    Builds the same tracker `model.track()` uses (ultralytics tracker YAML, e.g. "botsort.yaml"),
+    for driving it directly with detections from batched `model.predict()` calls.
+    """
+    from ultralytics.trackers.track import TRACKER_MAP
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+    try:
+        from ultralytics.utils import YAML
+        load_yaml = YAML.load
+    except ImportError:  # Older ultralytics releases
+        from ultralytics.utils import yaml_load as load_yaml
+
+    cfg = IterableSimpleNamespace(**load_yaml(check_yaml(tracker_config or config.TRACKER_CONFIG)))
+    if cfg.tracker_type not in TRACKER_MAP:
+        raise ValueError(f"Unsupported tracker_type '{cfg.tracker_type}' in {tracker_config}")
+    if getattr(cfg, "with_reid", False):
+        # ReID features come from a hook inside ultralytics' own track() predictor
+        raise ValueError("Batched tracking does not support with_reid trackers; use process_frame()")
+
+    tracker = TRACKER_MAP[cfg.tracker_type](args=cfg)
+    tracker.reset()   # Track IDs start at 1, as with a fresh model.track()
+    return tracker
+
+
+def update_tracker(tracker, result, frame):
+    """
+    Feeds one frame's detections (an ultralytics Results) to the tracker, like ultralytics'
+    track callback does. Returns (boxes, class_ids, track_ids, confidences), or None if nothing is tracked.
+    """
+    tracks = tracker.update(result.boxes.cpu().numpy(), frame)
+    if len(tracks) == 0:
+        return None
+    # Rows are [x1, y1, x2, y2, track_id, score, cls, detection_index]
+    return tracks[:, :4], tracks[:, 6].astype(int), tracks[:, 4].astype(int), tracks[:, 5]
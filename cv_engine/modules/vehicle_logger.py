@@ -1,87 +1,156 @@
-import cv2
 import os
 import json
 from datetime import datetime
 from cv_engine import config
+from cv_engine.modules.profiler import profiler
+from cv_engine.modules.snapshot_store import SnapshotStore
+
+def crop_evidence(frame, box, is_two_wheeler):
+    """
+    Padded evidence crop around a vehicle box (a view into `frame`).
+    """
+    x1, y1, x2, y2 = map(int, box)
+    h, w, _ = frame.shape
+    
+    # Base Padding
+    pad_x = 20
+    pad_y = 20
+    
+    # --- CROP ADJUSTMENT ---
+    # If Two-Wheeler: Expand TOP crop significantly to catch passenger heads
+    if is_two_wheeler:
+        box_height = y2 - y1
+        extra_head_room = int(box_height * 0.4) # Add 40% height to top
+        y1 = max(0, y1 - extra_head_room)
+        y2 = min(h, y2 + pad_y) # Normal bottom padding
+    else:
+        # Normal Car Padding
+        y1 = max(0, y1 - pad_y)
+        y2 = min(h, y2 + pad_y)
+
+    x1 = max(0, x1 - pad_x)
+    x2 = min(w, x2 + pad_x)
+    
+    return frame[y1:y2, x1:x2]
 
 class VehicleLogger:
-    def __init__(self):
+    def __init__(self, json_db_path=None, violations_dir=None, autoflush=True, camera_id=None, run_id=None):
+        """
+        autoflush=False buffers records in memory until flush() (used by replays,
+        where rewriting the JSON file per vehicle would dominate run time).
+        camera_id / run_id: tag every record, since track IDs (and entry IDs) repeat across runs.
+        """
         self.logged_ids = set()
+        self.autoflush = autoflush
+        self._pending = []
+        self.camera_id = camera_id or config.CAMERA_ID
+        self.run_id = run_id or config.RUN_ID or datetime.now().strftime("%Y%m%d_%H%M%S")
         
         # JSON Database
-        self.json_db_path = config.OUTPUT_LOGS_DIR
+        self.json_db_path = json_db_path or config.OUTPUT_LOGS_DIR
+        self.violations_dir = violations_dir or config.OUTPUT_VIOLATIONS_DIR
+        self.snapshots = SnapshotStore(self.violations_dir)
         
         if not os.path.exists(self.json_db_path):
             with open(self.json_db_path, 'w') as f:
                 json.dump([], f)
 
-    def log_vehicle(self, frame, box, track_id, class_name, speed, pax_count, violations, is_two_wheeler, plate_text="N/A"):
+    def log_vehicle(self, frame, box, track_id, class_name, speed, pax_count, violations, is_two_wheeler, plate_text="N/A", timestamp=None, zone=None, snapshot=None):
         """
         Logs metadata for ALL vehicles.
-        Saves snapshot ONLY if there are violations.
+        Saves snapshot ONLY if there are violations (and a frame is available).
+        timestamp: datetime of the event; defaults to now (replays pass the recorded time).
+        zone: name of the speed zone that measured the vehicle.
+        snapshot: evidence crop chosen by KeyframeSelector; otherwise `frame` is cropped at `box`.
         """
         # Idempotency Check
         if track_id in self.logged_ids:
             return
         
-        timestamp_str = datetime.now().strftime("%Y%m%d_%H%M%S")
+        event_time = timestamp or datetime.now()
+        timestamp_str = event_time.strftime("%Y%m%d_%H%M%S")
         image_filename = "N/A"  # Default if no violation
+        thumb_filename = None
 
         # --- SNAPSHOT LOGIC (Violations Only) ---
         if len(violations) > 0:
-            x1, y1, x2, y2 = map(int, box)
-            h, w, _ = frame.shape
-            
-            # Base Padding
-            pad_x = 20
-            pad_y = 20
-            
-            # --- CROP ADJUSTMENT ---
-            # If Two-Wheeler: Expand TOP crop significantly to catch passenger heads
-            if is_two_wheeler:
-                box_height = y2 - y1
-                extra_head_room = int(box_height * 0.4) # Add 40% height to top
-                y1 = max(0, y1 - extra_head_room)
-                y2 = min(h, y2 + pad_y) # Normal bottom padding
-            else:
-                # Normal Car Padding
-                y1 = max(0, y1 - pad_y)
-                y2 = min(h, y2 + pad_y)
-
-            x1 = max(0, x1 - pad_x)
-            x2 = min(w, x2 + pad_x)
-            
-            vehicle_crop = frame[y1:y2, x1:x2]
+            vehicle_crop = snapshot
+            if vehicle_crop is None and frame is not None:
+                vehicle_crop = crop_evidence(frame, box, is_two_wheeler)
             
-            # Save Image
-            if vehicle_crop.size > 0:
-                image_filename = f"v_{track_id}_{timestamp_str}.jpg"
-                filepath = os.path.join(config.OUTPUT_VIOLATIONS_DIR, image_filename)
-                cv2.imwrite(filepath, vehicle_crop)
+            # Save Image (+ thumbnail) in the snapshot store; paths are relative to violations_dir
+            if vehicle_crop is not None and vehicle_crop.size > 0:
+                with profiler.stage("snapshot_encode"):
+                    image_filename, thumb_filename = self.snapshots.save(vehicle_crop)
                 print(f" VIOLATION SAVED: ID {track_id} | {class_name} | {violations}")
 
         # --- JSON LOGGING (For Every Vehicle) ---
         record = {
             "entry_id": f"{track_id}_{timestamp_str}",
+            "camera_id": self.camera_id,
+            "run_id": self.run_id,
             "track_id": int(track_id),
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp": event_time.strftime("%Y-%m-%d %H:%M:%S"),
             "class": class_name,
             "speed_kmh": speed,
             "passengers": pax_count,
             "violations": violations,
             "is_violation": len(violations) > 0,
             "image_path": image_filename, # "N/A" for normal vehicles
-            "plate_number": plate_text
+            "thumb_path": thumb_filename,
+            "plate_number": plate_text,
+            "zone": zone
         }
         
-        self._append_to_json(record)
+        if self.autoflush:
+            self._append_to_json([record])
+        else:
+            self._pending.append(record)
         self.logged_ids.add(track_id)
 
-    def _append_to_json(self, record):
+        profiler.incr("vehicles_logged")
+        if len(violations) > 0:
+            profiler.incr("violations")
+
+    def update_plate(self, track_id, plate_text):
+        """
+        Fills in the plate of an already-logged vehicle that was logged as "Pending OCR".
+        """
+        track_id = int(track_id)
+        if track_id not in self.logged_ids:
+            return
+
+        for record in reversed(self._pending):
+            if record["track_id"] == track_id and record["plate_number"] == "Pending OCR":
+                record["plate_number"] = plate_text
+                return
+
+        try:
+            with open(self.json_db_path, 'r+') as f:
+                data = json.load(f)
+                for record in reversed(data):
+                    if (record.get("track_id") == track_id and record.get("run_id") in (None, self.run_id)
+                            and record.get("plate_number") == "Pending OCR"):
+                        record["plate_number"] = plate_text
+                        break
+                else:
+                    return
+                f.seek(0)
+                json.dump(data, f, indent=4)
+                f.truncate()
+        except Exception as e:
+            print(f"Error updating JSON: {e}")
+
+    def flush(self):
+        if self._pending:
+            self._append_to_json(self._pending)
+            self._pending = []
+
+    def _append_to_json(self, records):
         try:
             with open(self.json_db_path, 'r+') as f:
                 data = json.load(f)
-                data.append(record)
+                data.extend(records)
                 f.seek(0)
                 json.dump(data, f, indent=4)
         except Exception as e:
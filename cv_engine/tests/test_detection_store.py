@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from cv_engine.modules.detection_store import DetectionRecorder, DetectionStore
+
+
+def detections(count, value=0.0):
+    return (np.full((count, 4), value, np.float32), np.zeros(count), np.arange(1, count + 1), np.ones(count))
+
+
+class DetectionStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def recorder(self, **kwargs):
+        return DetectionRecorder(self.directory, 30, (640, 480), {0: "car"}, **kwargs)
+
+    def test_live_capture_times_are_replayed(self):
+        recorder = self.recorder()
+        start = recorder.meta["started_at_monotonic"]
+        # Live frame numbers count processed frames: frames 1 and 2 were captured 1 s apart
+        recorder.write(0, detections(1), start + 0.5)
+        recorder.write(1, None, start + 1.0)
+        recorder.write(2, detections(2), start + 2.0)
+        recorder.close()
+
+        store = DetectionStore(self.directory)
+        frames = list(store.frames(skip_empty=False))
+        self.assertEqual([(n, t) for n, t, _ in frames], [(0, start + 0.5), (1, start + 1.0), (2, start + 2.0)])
+        self.assertAlmostEqual(store.wall_time(2, start + 2.0), store.started_at + 2.0)
+
+    def test_file_frames_are_timed_by_frame_number(self):
+        recorder = self.recorder()
+        recorder.write(0, detections(1))
+        recorder.write(60, detections(1))
+        recorder.close()
+
+        store = DetectionStore(self.directory)
+        frame_num, capture_time, _ = list(store.frames())[-1]
+        self.assertIsNone(capture_time)
+        self.assertAlmostEqual(store.wall_time(frame_num, capture_time), store.started_at + 2.0)
+
+    def test_recording_of_a_killed_run_is_replayable(self):
+        plates = {}
+        recorder = self.recorder(plates=plates, meta_interval=10)
+        for i in range(25):
+            plates[1] = "GJ05AB1234"
+            recorder.write(i, detections(i % 3, value=i))
+        # Killed: close() never runs, the last checkpoint was at frame 20
+
+        # Last frame with detections (23; frame 24 is empty) only partly written
+        ids_path = os.path.join(self.directory, "ids.bin")
+        with open(ids_path, 'r+b') as f:
+            f.truncate(os.path.getsize(ids_path) - 4)
+
+        store = DetectionStore(self.directory)
+        self.assertEqual(store.meta["frames"], 20)
+        self.assertEqual(store.plates, {1: "GJ05AB1234"})
+        self.assertEqual(len(store), 23)
+        frame_num, _, last = list(store.frames())[-1]
+        self.assertEqual(frame_num, 22)
+        self.assertEqual(last[0][0, 0], 22)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import cv2
+import numpy as np
+from cv_engine.modules.frame_source import FrameSource, resize_into
+
+
+def write_video(path, frames, size):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 20 % 256, dtype=np.uint8))
+    writer.release()
+
+
+class ResizeIntoTests(unittest.TestCase):
+    def test_frame_at_the_target_size_is_returned_as_is(self):
+        frame = np.zeros((48, 64, 3), np.uint8)
+        with mock.patch("cv_engine.modules.frame_source.cv2.resize") as resize:
+            self.assertIs(resize_into(frame, (64, 48), dst=np.empty((24, 32, 3), np.uint8)), frame)
+        resize.assert_not_called()
+
+    def test_resizes_into_a_matching_buffer(self):
+        frame = np.full((48, 64, 3), 9, np.uint8)
+        dst = np.zeros((24, 32, 3), np.uint8)
+        self.assertIs(resize_into(frame, (32, 24), dst=dst), dst)
+        self.assertTrue((dst == 9).all())
+
+        # A buffer of the wrong size is left alone
+        other = np.zeros((10, 10, 3), np.uint8)
+        self.assertEqual(resize_into(frame, (32, 24), dst=other).shape, (24, 32, 3))
+        self.assertFalse(other.any())
+
+
+class FrameSourceTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+
+    def open(self, video_size, frames=6, **kwargs):
+        path = os.path.join(self.tmp, "clip.avi")
+        write_video(path, frames, video_size)
+        source = FrameSource(path, hw_accel=False, **kwargs)
+        self.addCleanup(source.release)
+        self.assertTrue(source.isOpened())
+        return source
+
+    def read_all(self, source):
+        frames = []
+        while True:
+            ok, frame = source.read()
+            if not ok:
+                return frames
+            frames.append(frame)
+
+    def test_frames_are_resized_into_the_reused_ring(self):
+        source = self.open((128, 96), size=(64, 48), ring_size=3)
+        self.assertTrue(source.needs_resize)
+        ring, decode_buffer = list(source._ring), source._decode_buffer
+
+        frames = self.read_all(source)
+
+        self.assertEqual(len(frames), 6)
+        for i, frame in enumerate(frames):
+            self.assertEqual(frame.shape, (48, 64, 3))
+            self.assertIs(frame, ring[i % 3])
+        # The last ring_size frames are still intact (MJPG is lossy: roughly the written values)
+        for frame, value in zip(frames[-3:], [60, 80, 100]):
+            self.assertAlmostEqual(frame.mean(), value, delta=3)
+        self.assertIs(source._decode_buffer, decode_buffer)
+
+    def test_source_at_the_target_size_is_decoded_straight_into_the_ring(self):
+        source = self.open((64, 48), size=(64, 48), ring_size=2)
+        self.assertFalse(source.needs_resize)
+        self.assertIsNone(source._decode_buffer)
+
+        with mock.patch("cv_engine.modules.frame_source.cv2.resize") as resize:
+            frames = self.read_all(source)
+
+        resize.assert_not_called()
+        self.assertEqual(len(frames), 6)
+        for i, frame in enumerate(frames):
+            self.assertEqual(frame.shape, (48, 64, 3))
+            self.assertTrue(np.shares_memory(frame, source._ring[i % 2]))
+
+
+if __name__ == "__main__":
+    unittest.main()
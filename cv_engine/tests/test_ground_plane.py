@@ -0,0 +1,126 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from cv_engine import config
+from cv_engine.modules.detector import Detector
+from cv_engine.modules.ground_plane import GroundPlaneSpeedEstimator, compute_homography, save_homography
+from cv_engine.modules.stub_backends import StubTracker
+from cv_engine.modules.vehicle_logger import VehicleLogger
+
+# A 3.5 m x 25 m stretch of road seen in perspective (lane narrows towards the horizon)
+IMAGE_POINTS = [(280, 300), (360, 300), (520, 470), (120, 470)]
+WORLD_POINTS = [(0, 30), (3.5, 30), (3.5, 5), (0, 5)]
+FPS = 25
+
+
+class GroundPlaneTests(unittest.TestCase):
+    def setUp(self):
+        self.H, _ = compute_homography(IMAGE_POINTS, WORLD_POINTS)
+        self.estimator = GroundPlaneSpeedEstimator(
+            homography=self.H, image_points=IMAGE_POINTS, world_points=WORLD_POINTS, region_margin=5,
+            window=10, min_points=5, smoothing=1.0, min_speed=3
+        )
+        self.Hinv = np.linalg.inv(self.H)
+
+    def image_point(self, x, y):
+        p = self.Hinv @ np.array([x, y, 1.0])
+        return p[:2] / p[2]
+
+    def drive(self, vehicle_id, world_track, first_frame=0):
+        speeds = []
+        for i, (x, y) in enumerate(world_track):
+            point = self.image_point(x, y)
+            speeds.append(self.estimator.update([vehicle_id], [point], first_frame + i, FPS)[vehicle_id])
+        return speeds
+
+    def test_speed_inside_calibrated_region(self):
+        # 10 m/s = 36 km/h along the lane
+        track = [(1.75, 6 + 10 * i / FPS) for i in range(20)]
+        self.assertEqual(self.drive(1, track)[-1], 36)
+
+    def test_points_at_or_beyond_the_horizon_get_no_speed(self):
+        horizon_y = -(self.H[2, 0] * 320 + self.H[2, 2]) / self.H[2, 1]   # w == 0 at x == 320
+        points = [(320, horizon_y - 5), (320, horizon_y), (320, horizon_y + 1)]
+        for i, point in enumerate(points * 4):
+            self.assertIsNone(self.estimator.update([2], [point], i, FPS)[2])
+        self.assertNotIn(2, self.estimator.vehicle_speeds)
+
+    def test_track_leaving_the_region_stops_reporting_speed(self):
+        inside = [(1.75, 20 + 10 * i / FPS) for i in range(8)]
+        self.assertIsNotNone(self.drive(3, inside)[-1])
+
+        # Far beyond the calibrated 30 m: one pixel covers metres, so no speed is trusted
+        far = [(1.75, 200 + 50 * i) for i in range(5)]
+        self.assertEqual(self.drive(3, far, first_frame=8), [None] * 5)
+        self.assertNotIn(3, self.estimator.vehicle_speeds)
+
+    def test_valid_tracks_in_the_same_frame_are_unaffected(self):
+        for i in range(20):
+            near = self.image_point(1.75, 6 + 10 * i / FPS)
+            speeds = self.estimator.update([4, 5], [near, (320, 0)], i, FPS)
+        self.assertEqual(speeds, {4: 36, 5: None})
+
+    def test_region_margin_around_the_calibrated_area(self):
+        # region_margin=5: 4 m beside the lane / before the first calibration row still count
+        points = [self.image_point(x, y) for x, y in [(-4, 15), (7.5, 15), (1.75, 1), (-6, 15), (9.5, 15), (1.75, -1)]]
+        inside = ~np.isnan(self.estimator.project(points)[:, 0])
+        self.assertEqual(inside.tolist(), [True, True, True, False, False, False])
+
+        # Winding order of the calibration points does not matter
+        reversed_estimator = GroundPlaneSpeedEstimator(
+            homography=self.H, image_points=IMAGE_POINTS, world_points=WORLD_POINTS[::-1], region_margin=5
+        )
+        np.testing.assert_array_equal(np.isnan(reversed_estimator.project(points)), np.isnan(self.estimator.project(points)))
+
+
+class HomographyLoggingTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        calibration = os.path.join(self.tmp, "homography.json")
+        self.H, _ = save_homography(IMAGE_POINTS, WORLD_POINTS, calibration)
+        self.log_path = os.path.join(self.tmp, "vehicle_log.json")
+
+        patches = [
+            mock.patch.object(config, "SPEED_MODE", "homography"),
+            mock.patch.object(config, "HOMOGRAPHY_CONFIG_PATH", calibration),
+            mock.patch.object(config, "TARGET_FPS", FPS),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        with mock.patch("builtins.print"):
+            self.detector = Detector(
+                model=StubTracker([]), plate_reader=mock.Mock(poll_results=mock.Mock(return_value=[])),
+                logger=VehicleLogger(json_db_path=self.log_path, violations_dir=self.tmp), record=False
+            )
+
+    def car_box(self, x, y):
+        p = np.linalg.inv(self.H) @ np.array([x, y, 1.0])
+        cx, bottom = p[:2] / p[2]
+        return [cx - 30, bottom - 40, cx + 30, bottom]
+
+    def test_constant_speed_track_logs_its_speed(self):
+        # 25 km/h (under the 30 km/h limit) through the calibrated stretch...
+        track = [(1.75, 6 + 25 / 3.6 * i / FPS) for i in range(60)]
+        # ...then the box jumps ahead on the last frames (e.g. the tracker latching onto the car in front)
+        track += [(1.75, track[-1][1] + 1.5 * i) for i in range(1, 4)]
+        for frame_num, (x, y) in enumerate(track):
+            detections = ([self.car_box(x, y)], [2], [1], [0.9])
+            vehicle, = self.detector.analyze(detections, frame_num)
+        self.assertGreater(vehicle["speed"], config.SPEED_LIMIT)
+
+        with mock.patch("builtins.print"):
+            self.detector.close()
+        with open(self.log_path) as f:
+            record = json.load(f)[0]
+        self.assertEqual(record["speed_kmh"], 25)
+        self.assertEqual(record["violations"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+import numpy as np
+from cv_engine.modules.detector import Detector
+from cv_engine.modules.keyframe import KeyframeSelector
+from cv_engine.modules.stub_backends import StubTracker
+
+WEIGHTS = {"size": 1.0, "sharpness": 1.0, "passengers": 2.0}
+
+
+def flat_frame(value=100):
+    return np.full((240, 320, 3), value, dtype=np.uint8)
+
+
+def sharp_frame(seed=0):
+    return np.random.default_rng(seed).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+
+
+class KeyframeSelectorTests(unittest.TestCase):
+    def setUp(self):
+        self.selector = KeyframeSelector(candidates=2, max_side=64, interval=3, weights=WEIGHTS)
+        self.box = (100, 100, 160, 140)
+
+    def test_sharper_and_fuller_frames_score_higher(self):
+        self.selector.offer(1, flat_frame(), self.box, True, 1, 0)
+        self.selector.offer(1, sharp_frame(), self.box, True, 1, 3)
+        self.assertGreater(np.std(self.selector.pop(1)), 0)   # The sharp crop
+
+        # One more passenger (weight 2) outweighs any sharpness (at most 1)
+        self.selector.offer(2, sharp_frame(), self.box, True, 1, 0)
+        self.selector.offer(2, flat_frame(7), self.box, True, 2, 3)
+        self.assertEqual(self.selector.pop(2).max(), 7)
+
+    def test_crops_are_shrunk_copies(self):
+        frame = flat_frame()
+        self.selector.offer(1, frame, (0, 0, 300, 200), False, 0, 0)
+        frame[:] = 0    # The caller reuses its frame buffer
+        crop = self.selector.pop(1)
+        self.assertEqual(max(crop.shape[:2]), 64)
+        self.assertEqual(crop.min(), 100)
+
+    def test_best_candidates_replace_the_worst(self):
+        for frame_num, value in enumerate([10, 20, 30]):
+            self.selector.offer(1, flat_frame(value), self.box, True, frame_num, frame_num * 3)
+        buffer = self.selector.buffers[1]
+        self.assertEqual(len(buffer), 2)
+        self.assertEqual(sorted(crop.max() for _, _, crop in buffer), [20, 30])
+
+        # Could not beat the worst kept candidate even if perfectly sharp: not even cropped
+        with mock.patch("cv_engine.modules.keyframe.crop_evidence") as crop_evidence:
+            self.selector.offer(1, sharp_frame(), self.box, True, 0, 9)
+        crop_evidence.assert_not_called()
+        self.assertEqual(self.selector.pop(1).max(), 30)
+
+    def test_offers_within_the_interval_are_skipped(self):
+        self.selector.offer(1, flat_frame(10), self.box, True, 1, 0)
+        self.selector.offer(1, sharp_frame(), self.box, True, 1, 2)
+        self.assertEqual(len(self.selector.buffers[1]), 1)
+
+        # ...unless more passengers are visible than before
+        self.selector.offer(1, flat_frame(20), self.box, True, 2, 2)
+        self.assertEqual(len(self.selector.buffers[1]), 2)
+        self.selector.offer(1, flat_frame(30), self.box, True, 2, 3)
+        self.assertEqual(sorted(crop.max() for _, _, crop in self.selector.buffers[1]), [10, 20])
+
+        self.selector.offer(1, flat_frame(40), self.box, True, 2, 5)
+        self.assertEqual(self.selector.pop(1).max(), 40)
+
+    def test_pop_frees_the_track(self):
+        self.selector.offer(1, flat_frame(), self.box, False, 0, 0)
+        self.assertIsNotNone(self.selector.pop(1))
+        self.assertEqual((self.selector.buffers, self.selector._last_offer), ({}, {}))
+        self.assertIsNone(self.selector.pop(1))
+
+        # A reused track ID starts over without waiting for the interval
+        self.selector.offer(1, flat_frame(), self.box, False, 0, 1)
+        self.assertIn(1, self.selector.buffers)
+
+
+class DetectorKeyframeTests(unittest.TestCase):
+    def test_only_tracks_pending_a_log_keep_crops(self):
+        with mock.patch("builtins.print"):
+            detector = Detector(model=StubTracker([]), plate_reader=mock.Mock(poll_results=mock.Mock(return_value=[])),
+                                logger=mock.Mock(), record=False)
+        frame = flat_frame()
+        detections = ([(100, 100, 160, 140), (200, 100, 260, 140)], [2, 2], [1, 2], [0.9, 0.9])
+        detector.pending_logs[2] = {"plate": "Unreadable"}
+        with mock.patch.object(detector.speed_estimator, "estimate_speed", return_value=None):
+            list(detector.analyze(detections, 0, frame=frame, raw_frame=frame))
+        self.assertEqual(list(detector.keyframes.buffers), [2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+import numpy as np
+from cv_engine import config
+from cv_engine.modules.detector import Detector
+from cv_engine.modules.plate_reader import PlateReader
+from cv_engine.modules.stub_backends import StubOCR, StubPlateModel, StubTracker
+from cv_engine.modules.vehicle_logger import VehicleLogger
+
+
+class PlateReaderLoadTests(unittest.TestCase):
+    def setUp(self):
+        # Weights "exist" (the constructor checks), but loading them fails
+        fd, weights = tempfile.mkstemp(suffix=".pt")
+        os.close(fd)
+        self.addCleanup(os.remove, weights)
+        # Loading fails once `load` is set (tests queue requests before that)
+        self.load = threading.Event()
+        self.load.set()
+
+        def load_model(path):
+            self.load.wait(5)
+            raise OSError("corrupt weights")
+
+        patches = [
+            mock.patch.object(config, "PLATE_MODEL_PATH", weights),
+            mock.patch("cv_engine.modules.plate_reader.load_model", side_effect=load_model),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_background_load_error_is_raised_by_poll_results(self):
+        self.load.clear()
+        with mock.patch("builtins.print"):
+            reader = PlateReader(ocr=StubOCR(), background=True)
+            self.assertEqual(reader.request_plate(1, np.zeros((8, 8, 3), np.uint8)), "Pending OCR")
+            self.assertEqual(reader.poll_results(), [])
+            self.load.set()
+            self.assertTrue(reader._ready.wait(5))
+
+        # The queued request is answered first, then the error is raised
+        self.assertEqual(reader.poll_results(), [(1, "Unreadable")])
+        with self.assertRaises(RuntimeError) as raised:
+            reader.poll_results()
+        self.assertIsInstance(raised.exception.__cause__, OSError)
+        self.assertFalse(reader.ready)
+        # Reported once; afterwards plates are simply unreadable
+        self.assertEqual(reader.poll_results(), [])
+        self.assertEqual(reader.request_plate(1, np.zeros((8, 8, 3), np.uint8)), "Unreadable")
+
+    def test_synchronous_load_error_is_raised_by_the_constructor(self):
+        with mock.patch("builtins.print"), self.assertRaises(RuntimeError):
+            PlateReader(ocr=StubOCR(), background=False)
+
+
+
+class QueuedPlateTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.log_path = os.path.join(self.tmp, "vehicle_log.json")
+
+    def test_every_queued_request_is_answered(self):
+        loaded = threading.Event()
+        with mock.patch.object(PlateReader, "_load_ocr", side_effect=lambda: loaded.wait(5) and StubOCR(hit_rate=0)), \
+                mock.patch.object(config, "OCR_PENDING_LIMIT", 1):
+            reader = PlateReader(plate_model=StubPlateModel(), background=True)
+            frame = np.zeros((8, 8, 3), np.uint8)
+            self.assertEqual(reader.request_plate(1, frame), "Pending OCR")
+            self.assertEqual(reader.request_plate(2, frame), "Pending OCR")
+            # Over the queue limit: track 1 is dropped
+            self.assertEqual(reader.poll_results(), [(1, "Unreadable")])
+            loaded.set()
+            self.assertTrue(reader._ready.wait(5))
+        self.assertEqual(reader.poll_results(), [(2, "Unreadable")])
+
+    def test_queued_frames_are_read_once_the_models_load(self):
+        loaded = threading.Event()
+        frame = np.zeros((120, 200, 3), np.uint8)
+        with mock.patch.object(PlateReader, "_load_ocr", side_effect=lambda: loaded.wait(5) and StubOCR(hit_rate=1)), \
+                mock.patch("builtins.print"):
+            reader = PlateReader(plate_model=StubPlateModel(), background=True)
+            self.assertFalse(reader.ready)
+            self.assertEqual(reader.request_plate(1, frame), "Pending OCR")
+            self.assertEqual(reader.request_plate(2, frame), "Pending OCR")
+            # A newer frame of a queued track replaces its older one
+            self.assertEqual(reader.request_plate(1, frame), "Pending OCR")
+            self.assertEqual(list(reader._pending), [2, 1])
+            self.assertIsNot(reader._pending[1], frame)    # Callers reuse their frame buffers
+            self.assertEqual(reader.poll_results(), [])
+
+            loaded.set()
+            self.assertTrue(reader._ready.wait(5))
+
+        results = reader.poll_results()
+        self.assertEqual([track_id for track_id, _ in results], [2, 1])
+        for _, plate in results:
+            self.assertRegex(plate, r"^GJ05AB[0-9]{4}$")
+        self.assertTrue(reader.ready)
+        # Ready: read on the caller's thread, nothing more to poll
+        self.assertRegex(reader.request_plate(3, frame), r"^GJ05AB[0-9]{4}$")
+        self.assertEqual(reader.poll_results(), [])
+
+    def test_unreadable_answer_replaces_pending_ocr(self):
+        reader = mock.Mock(poll_results=mock.Mock(return_value=[(7, "Unreadable"), (8, "Unreadable")]))
+        logger = VehicleLogger(json_db_path=self.log_path, violations_dir=self.tmp)
+        with mock.patch("builtins.print"):
+            detector = Detector(model=StubTracker([]), plate_reader=reader, logger=logger, record=False)
+        logger.log_vehicle(None, (0, 0, 10, 10), 7, "car", 30, "N/A", [], False, plate_text="Pending OCR")
+        detector.pending_logs[8] = {"plate": "Pending OCR"}
+
+        detector._apply_plate_results()
+
+        with open(self.log_path) as f:
+            self.assertEqual(json.load(f)[0]["plate_number"], "Unreadable")
+        self.assertEqual(detector.vehicle_plate_cache, {7: "Unreadable"})
+        # Track 8 is still active: logged as unreadable unless a later frame is read
+        self.assertEqual(detector.pending_logs[8]["plate"], "Unreadable")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from cv_engine.modules.profiler import Profiler, _NULL_STAGE
+
+
+class ProfilerTests(unittest.TestCase):
+    def setUp(self):
+        self.profiler = Profiler(enabled=True, window=100, prefix="test")
+
+    def test_nearest_rank_quantiles(self):
+        samples = list(range(1, 101))
+        self.assertEqual(Profiler._quantile(samples, 0.5), 50)
+        self.assertEqual(Profiler._quantile(samples, 0.95), 95)
+        self.assertEqual(Profiler._quantile(samples, 0.99), 99)
+        self.assertEqual(Profiler._quantile([1, 2, 3, 4, 5], 0.5), 3)
+        self.assertEqual(Profiler._quantile([7], 0.99), 7)
+
+    def test_stage_statistics_over_the_rolling_window(self):
+        for ms in range(1, 201):
+            self.profiler.record("detect", ms / 1000)
+
+        stage = self.profiler.snapshot()["stages"]["detect"]
+        # Quantiles cover the last `window` samples, count and mean the whole run
+        self.assertEqual(stage["count"], 200)
+        self.assertAlmostEqual(stage["mean_ms"], 100.5)
+        self.assertAlmostEqual(stage["p50_ms"], 150)
+        self.assertAlmostEqual(stage["p99_ms"], 199)
+
+    def test_stage_context_manager_records_a_duration(self):
+        with self.profiler.stage("ocr"):
+            pass
+        self.assertEqual(self.profiler.snapshot()["stages"]["ocr"]["count"], 1)
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = Profiler(enabled=False)
+        stage = profiler.stage("detect")
+        self.assertIs(stage, _NULL_STAGE)
+        self.assertIs(profiler.stage("ocr"), stage)
+        with stage:
+            pass
+        profiler.record("detect", 0.1)
+        profiler.incr("frames")
+        profiler.gauge("active_tracks", 3)
+
+        snap = profiler.snapshot()
+        self.assertEqual((snap["stages"], snap["counters"], snap["gauges"]), ({}, {}, {}))
+        self.assertEqual(profiler.to_prometheus(), "\n")
+
+    def test_prometheus_text_format(self):
+        for ms in (10, 20, 30, 40):
+            self.profiler.record("track", ms / 1000)
+        self.profiler.incr("frames", 4)
+        self.profiler.gauge("active_tracks", 2)
+
+        self.assertEqual(self.profiler.to_prometheus().splitlines(), [
+            "# HELP test_stage_seconds Rolling latency of CV pipeline stages.",
+            "# TYPE test_stage_seconds summary",
+            'test_stage_seconds{stage="track",quantile="0.5"} 0.020000',
+            'test_stage_seconds{stage="track",quantile="0.95"} 0.040000',
+            'test_stage_seconds{stage="track",quantile="0.99"} 0.040000',
+            'test_stage_seconds_sum{stage="track"} 0.100000',
+            'test_stage_seconds_count{stage="track"} 4',
+            "# TYPE test_frames_total counter",
+            "test_frames_total 4",
+            "# TYPE test_active_tracks gauge",
+            "test_active_tracks 2",
+        ])
+
+    def test_json_dump(self):
+        tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp, ignore_errors=True)
+        path = os.path.join(tmp, "metrics.json")
+        self.profiler.incr("frames")
+
+        self.profiler.dump_json(path)
+
+        with open(path) as f:
+            self.assertEqual(json.load(f)["counters"], {"frames": 1})
+        self.assertEqual(os.listdir(tmp), ["metrics.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import numpy as np
+from cv_engine.modules.snapshot_store import CLEANUP_STAMP, SnapshotStore
+
+DAY = 86400
+
+
+def crop(seed, width=64, height=48):
+    return np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+class SnapshotStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.store = SnapshotStore(self.root, quality=90, thumb_width=32)
+
+    def path(self, relative_path):
+        return os.path.join(self.root, relative_path)
+
+    def age(self, relative_path, days):
+        mtime = time.time() - days * DAY
+        os.utime(self.path(relative_path), (mtime, mtime))
+
+    def test_identical_crops_are_stored_once(self):
+        image_path, thumb_path = self.store.save(crop(0))
+        self.assertTrue(image_path.startswith("images/") and thumb_path.startswith("thumbs/"))
+        self.age(image_path, 10)
+
+        self.assertEqual(self.store.save(crop(0)), (image_path, thumb_path))
+        self.assertEqual(len(list(self.store.files())), 2)
+        # Re-use counts as a fresh snapshot for retention
+        self.assertGreater(os.path.getmtime(self.path(image_path)), time.time() - DAY)
+
+        self.assertNotEqual(self.store.save(crop(1))[0], image_path)
+
+    def test_small_crops_are_their_own_thumbnail(self):
+        image_path, thumb_path = self.store.save(crop(0, width=32))
+        self.assertEqual(image_path, thumb_path)
+
+    def test_file_deleted_by_cleanup_is_written_again(self):
+        image_path, _ = self.store.save(crop(0))
+        os.remove(self.path(image_path))
+        self.store.save(crop(0))
+        self.assertTrue(os.path.exists(self.path(image_path)))
+
+        # Deleted between the existence check and the mtime refresh
+        with mock.patch("cv_engine.modules.snapshot_store.os.utime", side_effect=FileNotFoundError):
+            self.assertTrue(self.store._write(image_path, b"jpeg"))
+        with open(self.path(image_path), 'rb') as f:
+            self.assertEqual(f.read(), b"jpeg")
+
+    def test_cleanup_by_age(self):
+        old_image, old_thumb = self.store.save(crop(0))
+        new_image, new_thumb = self.store.save(crop(1))
+        self.age(old_image, 100)
+
+        deleted = self.store.cleanup(max_age_days=90)
+
+        # The thumbnail goes with its image, whatever its own age
+        self.assertEqual(sorted(deleted), sorted([old_image, old_thumb]))
+        self.assertEqual(sorted(p for p, _, _ in self.store.files()), sorted([new_image, new_thumb]))
+        self.assertFalse(os.path.exists(os.path.dirname(self.path(old_image))))
+        self.assertTrue(os.path.exists(self.path(CLEANUP_STAMP)))
+
+    def test_cleanup_by_size_deletes_the_oldest_first(self):
+        paths = [self.store.save(crop(seed)) for seed in range(3)]
+        for days, (image_path, thumb_path) in zip([3, 2, 1], paths):
+            self.age(image_path, days)
+            self.age(thumb_path, days)
+        total = sum(size for _, size, _ in self.store.files())
+        newest = sum(os.path.getsize(self.path(p)) for p in paths[2])
+
+        deleted = self.store.cleanup(max_mb=(total - newest / 2) / 1024 / 1024)
+
+        self.assertEqual(sorted(deleted), sorted(paths[0]))
+        self.assertEqual(self.store.cleanup(max_mb=(total - newest / 2) / 1024 / 1024), [])
+
+    def test_dry_run_deletes_nothing(self):
+        image_path, thumb_path = self.store.save(crop(0))
+        self.age(image_path, 100)
+
+        self.assertEqual(sorted(self.store.cleanup(max_age_days=90, dry_run=True)), sorted([image_path, thumb_path]))
+        self.assertEqual(len(list(self.store.files())), 2)
+        self.assertFalse(os.path.exists(self.path(CLEANUP_STAMP)))
+
+    def test_no_limits_keep_everything(self):
+        image_path, _ = self.store.save(crop(0))
+        self.age(image_path, 1000)
+        self.assertEqual(self.store.cleanup(), [])
+        self.assertFalse(os.path.exists(self.path(CLEANUP_STAMP)))
+
+
+if __name__ == "__main__":
+    unittest.main()
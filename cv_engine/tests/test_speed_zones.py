@@ -0,0 +1,30 @@
+import unittest
+from cv_engine import config
+from cv_engine.modules.speed_estimator import SpeedEstimator
+from cv_engine.modules.speed_zones import SpeedZone
+
+
+class SpeedZoneTests(unittest.TestCase):
+    def drive(self, zone):
+        """
+        Crosses LINE_A on its segment, then LINE_B's extension ~90 px past its end point.
+        """
+        estimator = SpeedEstimator(zones=[zone])
+        path = [(350, 370), (350, 385)] + [(x, 385) for x in range(370, 720, 20)]
+        speed = None
+        for frame_num, point in enumerate(path):
+            speed = estimator.estimate_speed(1, point, frame_num, fps=config.TARGET_FPS) or speed
+        return speed
+
+    def test_default_zone_counts_crossings_along_the_extended_lines(self):
+        zone = SpeedZone.from_dict(config.SPEED_ZONES[0])
+        self.assertTrue(zone.extend_lines)
+        self.assertIsNotNone(self.drive(zone))
+
+    def test_calibrated_zone_counts_crossings_near_its_segments_only(self):
+        zone = SpeedZone("lane-1", config.LINE_A, config.LINE_B)
+        self.assertIsNone(self.drive(zone))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import cv2
+import numpy as np
+from cv_engine.main import read_live_frames
+from cv_engine.modules.stream_reader import LiveStreamReader
+
+
+def write_video(path, frames=10, fps=50, size=(64, 48)):
+    """
+    A tiny local video: the loopback stand-in for a camera stream.
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), i * 20 % 256, dtype=np.uint8))
+    writer.release()
+
+
+class LiveStreamReaderTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        self.video = os.path.join(self.tmp, "camera.avi")
+
+    def start(self, source, **kwargs):
+        reader = LiveStreamReader(source, reconnect_min=0.05, reconnect_max=0.2, **kwargs).start()
+        self.addCleanup(reader.stop)
+        return reader
+
+    def read_for(self, reader, seconds):
+        capture_times = []
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            ok, frame, capture_time = reader.read(timeout=1.0)
+            self.assertTrue(ok)
+            self.assertEqual(frame.shape, (48, 64, 3))
+            capture_times.append(capture_time)
+        return capture_times
+
+    def test_file_stream_reconnects_at_end_and_keeps_capture_times_increasing(self):
+        write_video(self.video, frames=10, fps=50)
+        reader = self.start(self.video)
+        capture_times = self.read_for(reader, 0.6)
+
+        # 10 frames at 50 FPS last 0.2 s: the file has looped (reopened) at least twice
+        self.assertGreaterEqual(reader.reconnects, 2)
+        self.assertEqual(capture_times, sorted(set(capture_times)))
+
+    def connect_messages(self, printed):
+        return sum(str(call.args[0]).startswith("Stream connected") for call in printed.call_args_list)
+
+    def test_connect_is_announced_once_for_a_looping_file(self):
+        write_video(self.video, frames=10, fps=50)
+        with mock.patch("builtins.print") as printed:
+            reader = self.start(self.video)
+            self.read_for(reader, 0.6)
+            reader.stop()
+        self.assertGreaterEqual(reader.reconnects, 2)
+        self.assertEqual(self.connect_messages(printed), 1)
+
+    def test_connect_is_announced_again_after_a_disconnect(self):
+        # Not a file when the reader starts: the end of the video is a lost connection
+        with mock.patch("builtins.print") as printed:
+            reader = self.start(self.video, pace=True)
+            write_video(self.video, frames=10, fps=50)
+            deadline = time.monotonic() + 3
+            while reader.reconnects < 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            reader.stop()
+        self.assertGreaterEqual(self.connect_messages(printed), 2)
+
+    def test_stall_is_reported_then_stream_recovers(self):
+        reader = self.start(self.video, pace=True)   # Nothing there yet: camera offline
+
+        ok, frame, capture_time = reader.read(timeout=0.3)
+        self.assertEqual((ok, frame, capture_time), (False, None, None))
+
+        write_video(self.video, frames=10, fps=50)
+        ok, frame, capture_time = reader.read(timeout=2.0)
+        self.assertTrue(ok)
+        self.assertLessEqual(capture_time, time.monotonic())
+
+    def test_read_after_stop_returns_no_frame(self):
+        write_video(self.video)
+        reader = self.start(self.video)
+        self.assertTrue(reader.read(timeout=1.0)[0])
+        reader.stop()
+        self.assertFalse(reader.read(timeout=0.1)[0])
+
+    def test_live_frames_hand_back_control_while_stalled(self):
+        reader = self.start(self.video, pace=True)   # Camera offline
+        frames = read_live_frames(reader)
+        started = time.monotonic()
+        self.assertEqual(next(frames), (None, None))
+        # Well before STREAM_READ_TIMEOUT: the display loop can still handle 'q'
+        self.assertLess(time.monotonic() - started, 1.0)
+
+        write_video(self.video, frames=10, fps=50)
+        frame, capture_time = next(f for f in frames if f[0] is not None)
+        self.assertIsNotNone(capture_time)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,21 +1,27 @@
 import cv2
 import os
+import sys
+import argparse
+
+sys.path.append(os.getcwd())
 
 # PATH to your reference image (The one with yellow lines)
 IMAGE_PATH = "cv_engine/media/input/reference_lines.png"
 
 points = []
+zones = []
+world_points = []
 
 def click_event(event, x, y, flags, params):
     global points, frame
     if event == cv2.EVENT_LBUTTONDOWN:
         points.append((x, y))
-        
+
         # Visual Feedback (Red dot on click)
         cv2.circle(frame, (x, y), 5, (0, 0, 255), -1)
-        cv2.putText(frame, f"P{len(points)}", (x, y-10), 
+        cv2.putText(frame, f"P{len(points)}", (x, y-10),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-        
+
         # Draw line if we have a pair (Green line for confirmation)
         if len(points) == 2:
             cv2.line(frame, points[0], points[1], (0, 255, 0), 2)
@@ -24,34 +30,196 @@ def click_event(event, x, y, flags, params):
             print("\nCOMPLETED! Copy these values:")
             print(f"LINE_A = {points[0]}, {points[1]}  # Top Line (Start, End)")
             print(f"LINE_B = {points[2]}, {points[3]}  # Bottom Line (Start, End)")
-            
+
         cv2.imshow('Calibration - Image', frame)
 
-# Check if file exists
-if not os.path.exists(IMAGE_PATH):
-    print(f"Error: File not found at {IMAGE_PATH}")
-    print("Please make sure you saved the screenshot there.")
-    exit()
+def ask(prompt, cast=str, default=None):
+    while True:
+        raw = input(f"{prompt} [{default}]: ").strip()
+        if not raw:
+            return default
+        try:
+            return cast(raw)
+        except ValueError:
+            print("  Invalid value, try again.")
+
+def zone_click_event(event, x, y, flags, params):
+    """
+    Four clicks per zone (A start, A end, B start, B end), then zone details in the terminal.
+    """
+    global points, frame
+    if event != cv2.EVENT_LBUTTONDOWN or len(points) >= 4:
+        return
+
+    points.append((x, y))
+    cv2.circle(frame, (x, y), 5, (0, 0, 255), -1)
+    cv2.putText(frame, f"Z{len(zones) + 1}-P{len(points)}", (x, y-10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+    if len(points) == 2:
+        cv2.line(frame, points[0], points[1], (0, 255, 0), 2)
+    elif len(points) == 4:
+        cv2.line(frame, points[2], points[3], (0, 255, 0), 2)
+    cv2.imshow('Calibration - Zones', frame)
+
+    if len(points) == 4:
+        from cv_engine.modules.speed_zones import SpeedZone, DIRECTIONS
+
+        print(f"\nZone {len(zones) + 1}: LINE A = {points[0]}, {points[1]} | LINE B = {points[2]}, {points[3]}")
+        name = ask("  Zone name", str, f"zone{len(zones) + 1}")
+        distance = ask("  Real distance between lines (m, blank = REAL_DISTANCE_METERS)", float, None)
+        direction = None
+        while direction not in DIRECTIONS:
+            direction = ask(f"  Direction {DIRECTIONS}", str, "both")
+        limit = ask("  Speed limit (km/h, blank = SPEED_LIMIT)", float, None)
+
+        zones.append(SpeedZone(name, points[:2], points[2:], distance, direction, limit))
+        cv2.putText(frame, name, points[0], cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+        cv2.imshow('Calibration - Zones', frame)
+        points = []
+        print("Click the next zone, 's' to save, 'q' to quit without saving.")
+
+def homography_click_event(event, x, y, flags, params):
+    """
+    Each click is a ground reference point; its real-world position (metres) is typed in the terminal.
+    """
+    global frame
+    if event != cv2.EVENT_LBUTTONDOWN:
+        return
+
+    cv2.circle(frame, (x, y), 5, (0, 0, 255), -1)
+    cv2.putText(frame, f"G{len(points) + 1}", (x, y-10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+    cv2.imshow('Calibration - Ground Plane', frame)
+
+    print(f"\nPoint G{len(points) + 1} at pixel {(x, y)}")
+    world_x = ask("  Ground X (m)", float, None)
+    world_y = ask("  Ground Y (m)", float, None)
+    if world_x is None or world_y is None:
+        print("  Skipped (both X and Y are needed).")
+        return
+
+    points.append((x, y))
+    world_points.append((world_x, world_y))
+    if len(points) >= 4:
+        print(f"{len(points)} points. Click more to improve the fit, 's' to save, 'q' to quit.")
+
+def load_reference_image():
+    # Check if file exists
+    if not os.path.exists(IMAGE_PATH):
+        print(f"Error: File not found at {IMAGE_PATH}")
+        print("Please make sure you saved the screenshot there.")
+        exit()
+
+    # Load Image
+    image = cv2.imread(IMAGE_PATH)
+
+    if image is None:
+        print("Error: Could not load image. Check file format.")
+        exit()
+
+    # CRITICAL: Resize to match the video processing resolution
+    return cv2.resize(image, (1280, 720))
+
+def calibrate_lines():
+    global frame
+    frame = load_reference_image()
+
+    cv2.imshow('Calibration - Image', frame)
+    cv2.setMouseCallback('Calibration - Image', click_event)
+
+    print("--- INSTRUCTIONS ---")
+    print("1. Click LEFT end of the TOP yellow line.")
+    print("2. Click RIGHT end of the TOP yellow line.")
+    print("3. Click LEFT end of the BOTTOM yellow line.")
+    print("4. Click RIGHT end of the BOTTOM yellow line.")
+    print("--------------------")
+
+    cv2.waitKey(0)
+    cv2.destroyAllWindows()
+
+def calibrate_zones(output_path):
+    global frame
+    from cv_engine.modules.speed_zones import save_zones
+
+    frame = load_reference_image()
+
+    cv2.imshow('Calibration - Zones', frame)
+    cv2.setMouseCallback('Calibration - Zones', zone_click_event)
+
+    print("--- INSTRUCTIONS (per zone) ---")
+    print("1-2. Click START and END of the zone's first line (LINE A).")
+    print("3-4. Click START and END of the zone's second line (LINE B).")
+    print("Then enter the zone details in this terminal.")
+    print("Press 's' to save all zones, 'q' to quit without saving.")
+    print("-------------------------------")
+
+    while True:
+        key = cv2.waitKey(50) & 0xFF
+        if key == ord('s'):
+            if not zones:
+                print("No complete zones to save.")
+                continue
+            save_zones(zones, output_path)
+            print(f"Saved {len(zones)} zone(s) to {output_path}")
+            break
+        if key == ord('q'):
+            print("Quit without saving.")
+            break
+
+    cv2.destroyAllWindows()
+
+def calibrate_homography(output_path):
+    global frame
+    from cv_engine.modules.ground_plane import save_homography
+
+    frame = load_reference_image()
 
-# Load Image
-frame = cv2.imread(IMAGE_PATH)
+    cv2.imshow('Calibration - Ground Plane', frame)
+    cv2.setMouseCallback('Calibration - Ground Plane', homography_click_event)
 
-if frame is None:
-    print("Error: Could not load image. Check file format.")
-    exit()
+    print("--- INSTRUCTIONS (ground plane) ---")
+    print("1. Click 4+ points ON THE ROAD whose real positions you know")
+    print("   (e.g. lane marking corners, the ends of the speed trap lines).")
+    print("2. After each click, enter its X / Y position in metres in this terminal,")
+    print("   measured from any fixed origin on the road.")
+    print("Press 's' to save, 'q' to quit without saving.")
+    print("-----------------------------------")
 
-# CRITICAL: Resize to match the video processing resolution
-frame = cv2.resize(frame, (1280, 720))
+    while True:
+        key = cv2.waitKey(50) & 0xFF
+        if key == ord('s'):
+            if len(points) < 4:
+                print(f"Need at least 4 points, have {len(points)}.")
+                continue
+            try:
+                _, error = save_homography(points, world_points, output_path)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
+            print(f"Saved homography ({len(points)} points) to {output_path}")
+            print(f"Mean reprojection error: {error:.3f} m")
+            print('Set SPEED_MODE = "homography" in cv_engine/config.py to use it.')
+            break
+        if key == ord('q'):
+            print("Quit without saving.")
+            break
 
-cv2.imshow('Calibration - Image', frame)
-cv2.setMouseCallback('Calibration - Image', click_event)
+    cv2.destroyAllWindows()
 
-print("--- INSTRUCTIONS ---")
-print("1. Click LEFT end of the TOP yellow line.")
-print("2. Click RIGHT end of the TOP yellow line.")
-print("3. Click LEFT end of the BOTTOM yellow line.")
-print("4. Click RIGHT end of the BOTTOM yellow line.")
-print("--------------------")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate speed trap lines on the reference image.")
+    parser.add_argument("--zones", action="store_true",
+                        help="Calibrate several named speed zones and save them to a config file")
+    parser.add_argument("--homography", action="store_true",
+                        help="Calibrate a ground-plane homography for SPEED_MODE = 'homography'")
+    parser.add_argument("--output", help="File to write (default: config.ZONES_CONFIG_PATH / config.HOMOGRAPHY_CONFIG_PATH)")
+    args = parser.parse_args()
 
-cv2.waitKey(0)
-cv2.destroyAllWindows()
\ No newline at end of file
+    if args.zones:
+        from cv_engine import config
+        calibrate_zones(args.output or config.ZONES_CONFIG_PATH)
+    elif args.homography:
+        from cv_engine import config
+        calibrate_homography(args.output or config.HOMOGRAPHY_CONFIG_PATH)
+    else:
+        calibrate_lines()